@@ -18,6 +18,7 @@ import flask_restful
 from oslo_log import log
 from oslo_serialization import jsonutils
 from oslo_utils import strutils
+import six
 from six.moves import http_client
 from six.moves import urllib
 import werkzeug.exceptions
@@ -242,6 +243,14 @@ class AuthCatalogResource(_AuthFederationWebSSOBase):
                 _('A project-scoped token is required to produce a '
                   'service catalog.'))
 
+        # NOTE: Endpoints are associated with projects without notifying
+        # about it, but that invalidates the computed catalogs.
+        not_modified = self.check_etag(
+            ['endpoint', 'region', 'service'],
+            PROVIDERS.catalog_api.get_computed_catalog_tag())
+        if not_modified:
+            return not_modified
+
         return {
             'catalog': PROVIDERS.catalog_api.get_v3_catalog(
                 user_id, project_id
@@ -331,6 +340,53 @@ class AuthTokenResource(_AuthFederationWebSSOBase):
         return None, http_client.NO_CONTENT
 
 
+class AuthTokenValidateResource(_AuthFederationWebSSOBase):
+    def post(self):
+        """Validate several tokens.
+
+        POST /v3/auth/tokens/validate
+        """
+        ENFORCER.enforce_call(action='identity:validate_tokens')
+        validation.lazy_validate(auth_schema.token_validate,
+                                 self.request_body_json)
+        token_ids = self.request_body_json['tokens']
+        if len(token_ids) > CONF.token.max_validation_batch_size:
+            msg = _('At most %d tokens can be validated with a single '
+                    'request.') % CONF.token.max_validation_batch_size
+            raise exception.ValidationError(message=msg)
+
+        allow_expired = strutils.bool_from_string(
+            flask.request.args.get('allow_expired'))
+        window_secs = CONF.token.allow_expired_window if allow_expired else 0
+        include_catalog = 'nocatalog' not in flask.request.args
+        results = PROVIDERS.token_provider_api.validate_tokens(
+            token_ids, window_seconds=window_secs)
+
+        # Tokens sharing the same scope share the same catalog, so only build
+        # it once per request.
+        shared = {}
+        rendered = {}
+        tokens_resp = []
+        for token_id in token_ids:
+            if token_id not in rendered:
+                result = results[token_id]
+                if isinstance(result, exception.Error):
+                    rendered[token_id] = {
+                        'error': {
+                            'code': result.code,
+                            'title': result.title,
+                            'message': six.text_type(result)
+                        }
+                    }
+                else:
+                    rendered[token_id] = (
+                        render_token.render_token_response_from_model(
+                            result, include_catalog=include_catalog,
+                            shared=shared))
+            tokens_resp.append(rendered[token_id])
+        return {'tokens': tokens_resp}
+
+
 class AuthFederationWebSSOResource(_AuthFederationWebSSOBase):
     @classmethod
     def _perform_auth(cls, protocol_id):
@@ -483,6 +539,12 @@ class AuthAPI(ks_flask.APIBase):
             url='/auth/tokens',
             resource_kwargs={},
             rel='auth_tokens'
+        ),
+        ks_flask.construct_resource_map(
+            resource=AuthTokenValidateResource,
+            url='/auth/tokens/validate',
+            resource_kwargs={},
+            rel='auth_tokens_validate'
         )
     ]
 
@@ -96,18 +96,17 @@ class CredentialResource(ks_flask.ResourceBase):
             target = None
         ENFORCER.enforce_call(action='identity:list_credentials',
                               filters=filters, target_attr=target)
-        hints = self.build_driver_hints(filters)
-        refs = PROVIDERS.credential_api.list_credentials(hints)
+        hints = self.build_driver_hints(filters, paginate=True)
         # If the request was filtered, make sure to return only the
         # credentials specific to that user. This makes it so that users with
-        # roles on projects can't see credentials that aren't theirs.
+        # roles on projects can't see credentials that aren't theirs. The
+        # restriction is a filter of the hints, so that it is applied before
+        # the list is paginated and the marker of the next page never refers
+        # to a credential of another user.
         if (not self.oslo_context.system_scope and
                 CONF.oslo_policy.enforce_scope):
-            filtered_refs = []
-            for ref in refs:
-                if ref['user_id'] == target['credential']['user_id']:
-                    filtered_refs.append(ref)
-            refs = filtered_refs
+            hints.add_filter('user_id', target['credential']['user_id'])
+        refs = PROVIDERS.credential_api.list_credentials(hints)
         refs = [self._blob_to_json(r) for r in refs]
         return self.wrap_collection(refs, hints=hints)
 
@@ -101,6 +101,9 @@ class DomainResource(ks_flask.ResourceBase):
         filters = ['name', 'enabled']
         ENFORCER.enforce_call(action='identity:list_domains',
                               filters=filters)
+        not_modified = self.check_etag(['domain'])
+        if not_modified:
+            return not_modified
         hints = self.build_driver_hints(filters)
         refs = PROVIDERS.resource_api.list_domains(hints=hints)
         return self.wrap_collection(refs, hints=hints)
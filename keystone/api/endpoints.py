@@ -78,6 +78,11 @@ class EndpointResource(ks_flask.ResourceBase):
         filters = ['interface', 'service_id', 'region_id']
         ENFORCER.enforce_call(action='identity:list_endpoints',
                               filters=filters)
+        # NOTE: Deleting a service deletes its endpoints without notifying
+        # about them.
+        not_modified = self.check_etag(['endpoint', 'service'])
+        if not_modified:
+            return not_modified
         hints = self.build_driver_hints(filters)
         refs = PROVIDERS.catalog_api.list_endpoints(hints=hints)
         return self.wrap_collection([_filter_endpoint(r) for r in refs],
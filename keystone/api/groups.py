@@ -80,16 +80,13 @@ class GroupsResource(ks_flask.ResourceBase):
             target = {'group': {'domain_id': self.oslo_context.domain_id}}
         ENFORCER.enforce_call(action='identity:list_groups', filters=filters,
                               target_attr=target)
-        hints = self.build_driver_hints(filters)
+        hints = self.build_driver_hints(filters, paginate=True, stream=True)
         domain = self._get_domain_id_for_list_request()
         refs = PROVIDERS.identity_api.list_groups(domain_scope=domain,
                                                   hints=hints)
         if self.oslo_context.domain_id:
-            filtered_refs = []
-            for ref in refs:
-                if ref['domain_id'] == target['group']['domain_id']:
-                    filtered_refs.append(ref)
-            refs = filtered_refs
+            domain_id = target['group']['domain_id']
+            refs = (ref for ref in refs if ref['domain_id'] == domain_id)
         return self.wrap_collection(refs, hints=hints)
 
     def post(self):
@@ -15,12 +15,17 @@
 import flask
 import flask_restful
 from oslo_utils import timeutils
+from six.moves import http_client
 
 from keystone.api._shared import json_home_relations
 from keystone.common import provider_api
 from keystone.common import rbac_enforcer
+from keystone.common import validation
 from keystone import exception
 from keystone.i18n import _
+from keystone.models import revoke_model
+from keystone import notifications
+from keystone.revoke import schema
 from keystone.server import flask as ks_flask
 
 
@@ -59,6 +64,20 @@ class OSRevokeResource(flask_restful.Resource):
                     }
         return response
 
+    def post(self):
+        ENFORCER.enforce_call(action='identity:create_revoke_events')
+        events = (flask.request.get_json(
+            silent=True, force=True) or {}).get('events', {})
+        validation.lazy_validate(schema.revoke_events_create, events)
+        # events revoked together share the same revocation time
+        revoked_at = timeutils.utcnow().replace(microsecond=0)
+        events = PROVIDERS.revoke_api.revoke_events(
+            [revoke_model.RevokeEvent(revoked_at=revoked_at, **event)
+             for event in events],
+            initiator=notifications.build_audit_initiator())
+        return ({'events': [event.to_dict() for event in events]},
+                http_client.CREATED)
+
 
 class OSRevokeAPI(ks_flask.APIBase):
     _name = 'events'
@@ -120,7 +120,7 @@ class ProjectResource(ks_flask.ResourceBase):
         ENFORCER.enforce_call(action='identity:list_projects',
                               filters=filters,
                               target_attr=target)
-        hints = self.build_driver_hints(filters)
+        hints = self.build_driver_hints(filters, paginate=True, stream=True)
 
         # If 'is_domain' has not been included as a query, we default it to
         # False (which in query terms means '0')
@@ -134,9 +134,9 @@ class ProjectResource(ks_flask.ResourceBase):
         refs = PROVIDERS.resource_api.list_projects(hints=hints)
         if self.oslo_context.domain_id:
             domain_id = self.oslo_context.domain_id
-            filtered_refs = [
+            filtered_refs = (
                 ref for ref in refs if ref['domain_id'] == domain_id
-            ]
+            )
         else:
             filtered_refs = refs
         return self.wrap_collection(filtered_refs, hints=hints)
@@ -38,6 +38,9 @@ class RegionResource(ks_flask.ResourceBase):
     def _list_regions(self):
         filters = ['parent_region_id']
         ENFORCER.enforce_call(action='identity:list_regions', filters=filters)
+        not_modified = self.check_etag(['region'])
+        if not_modified:
+            return not_modified
         hints = self.build_driver_hints(filters)
         refs = PROVIDERS.catalog_api.list_regions(hints)
         return self.wrap_collection(refs, hints=hints)
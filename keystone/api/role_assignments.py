@@ -14,6 +14,7 @@
 
 import flask
 
+from keystone.common import driver_hints
 from keystone.common import provider_api
 from keystone.common import rbac_enforcer
 from keystone import exception
@@ -56,24 +57,12 @@ class RoleAssignmentsResource(ks_flask.ResourceBase):
                               filters=filters,
                               target_attr=target)
 
-        assignments = self._build_role_assignments_list()
-
-        if self.oslo_context.domain_id:
-            domain_assignments = []
-            for assignment in assignments['role_assignments']:
-                domain_id = assignment['scope'].get('domain', {}).get('id')
-                project_id = assignment['scope'].get('project', {}).get('id')
-                if domain_id == self.oslo_context.domain_id:
-                    domain_assignments.append(assignment)
-                    continue
-                elif project_id:
-                    project = PROVIDERS.resource_api.get_project(project_id)
-                    if project.get('domain_id') == self.oslo_context.domain_id:
-                        domain_assignments.append(assignment)
-
-            assignments['role_assignments'] = domain_assignments
-
-        return assignments
+        # NOTE: With a domain scoped token, only the assignments on the
+        # domain and its projects are listed. They are restricted before the
+        # list is paginated, so that the marker of the next page never refers
+        # to an assignment the caller can't see.
+        return self._build_role_assignments_list(
+            restrict_to_domain_id=self.oslo_context.domain_id)
 
     def _list_role_assignments_for_tree(self):
         filters = [
@@ -94,7 +83,8 @@ class RoleAssignmentsResource(ks_flask.ResourceBase):
             raise exception.ValidationError(message=msg)
         return self._build_role_assignments_list(include_subtree=True)
 
-    def _build_role_assignments_list(self, include_subtree=False):
+    def _build_role_assignments_list(self, include_subtree=False,
+                                     restrict_to_domain_id=None):
         """List role assignments to user and groups on domains and projects.
 
         Return a list of all existing role assignments in the system, filtered
@@ -125,6 +115,9 @@ class RoleAssignmentsResource(ks_flask.ResourceBase):
         self._assert_user_nand_group()
         self._assert_effective_filters_if_needed()
 
+        hints = driver_hints.Hints()
+        self.build_pagination_hints(hints)
+
         refs = PROVIDERS.assignment_api.list_role_assignments(
             role_id=params.get('role.id'),
             user_id=params.get('user.id'),
@@ -135,9 +128,19 @@ class RoleAssignmentsResource(ks_flask.ResourceBase):
             include_subtree=include_subtree,
             inherited=self._inherited,
             effective=self._effective,
-            include_names=include_names)
+            include_names=include_names,
+            hints=hints,
+            restrict_to_domain_id=restrict_to_domain_id)
         formatted_refs = [self._format_entity(ref) for ref in refs]
-        return self.wrap_collection(formatted_refs)
+        container = self.wrap_collection(formatted_refs)
+        if hints.limit and hints.limit['truncated']:
+            # NOTE: Role assignments have no ID, so the marker of the next
+            # page is built from the last assignment listed.
+            container['truncated'] = True
+            container['links']['next'] = self.next_page_url(
+                PROVIDERS.assignment_api.get_role_assignment_marker(
+                    refs[-1]))
+        return container
 
     def _assert_domain_nand_project(self):
         if (flask.request.args.get('scope.domain.id') and
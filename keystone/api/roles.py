@@ -86,6 +86,9 @@ class RoleResource(ks_flask.ResourceBase):
         else:
             ENFORCER.enforce_call(action='identity:list_roles',
                                   filters=filters)
+        not_modified = self.check_etag(['role'])
+        if not_modified:
+            return not_modified
 
         hints = self.build_driver_hints(filters)
         if not domain_filter:
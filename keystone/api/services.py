@@ -36,6 +36,9 @@ class ServicesResource(ks_flask.ResourceBase):
     def _list_service(self):
         filters = ['type', 'name']
         ENFORCER.enforce_call(action='identity:list_services', filters=filters)
+        not_modified = self.check_etag(['service'])
+        if not_modified:
+            return not_modified
         hints = self.build_driver_hints(filters)
         refs = PROVIDERS.catalog_api.list_services(hints=hints)
         return self.wrap_collection(refs, hints=hints)
@@ -169,10 +169,10 @@ class UserResource(ks_flask.ResourceBase):
         target = None
         if self.oslo_context.domain_id:
             target = {'domain_id': self.oslo_context.domain_id}
-        hints = self.build_driver_hints(filters)
         ENFORCER.enforce_call(
             action='identity:list_users', filters=filters, target_attr=target
         )
+        hints = self.build_driver_hints(filters, paginate=True, stream=True)
         domain = self._get_domain_id_for_list_request()
         if domain is None and self.oslo_context.domain_id:
             domain = self.oslo_context.domain_id
@@ -187,7 +187,7 @@ class UserResource(ks_flask.ResourceBase):
         # leaking to people who shouldn't see it.
         if self.oslo_context.domain_id:
             domain_id = self.oslo_context.domain_id
-            users = [user for user in refs if user['domain_id'] == domain_id]
+            users = (user for user in refs if user['domain_id'] == domain_id)
         else:
             users = refs
 
@@ -483,7 +483,9 @@ class OAuth1AccessTokenCRUDResource(_OAuth1ResourceBase):
             'accordingly the next time they authenticate or validate a '
             'token.' % {'consumer_id': access_token['consumer_id']}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        notifications.invalidate_token_cache_notification(
+            reason, tags=[('access_token', access_token_id)]
+        )
         PROVIDERS.oauth_api.delete_access_token(
             user_id, access_token_id, initiator=self.audit_initiator)
         return None, http_client.NO_CONTENT
@@ -14,6 +14,7 @@
 
 """Main entry point into the Assignment service."""
 
+import collections
 import copy
 import itertools
 
@@ -110,6 +111,19 @@ class Manager(manager.Manager):
                     notifications.REMOVE_APP_CREDS_FOR_USER, payload
                 )
 
+    def get_computed_assignments_tag(self):
+        """Return a tag identifying the current computed assignments.
+
+        The tag changes whenever a role assignment, role or implied role is
+        changed in a way that could affect computed role assignments. Callers
+        holding on to roles computed earlier can compare the tag they recorded
+        at the time with the current one to know if those roles are stale.
+
+        :returns: an opaque value, or None if it cannot be determined
+
+        """
+        return cache.get_region_id(COMPUTED_ASSIGNMENTS_REGION)
+
     @MEMOIZE_COMPUTED_ASSIGNMENTS
     def get_roles_for_user_and_project(self, user_id, project_id):
         """Get the roles associated with a user within given project.
@@ -300,7 +314,13 @@ class Manager(manager.Manager):
              'actor_id': actor_id, 'target_type': target_type,
              'target_id': target_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        # The tokens of the members of a group can't be tagged with the group,
+        # so invalidate every token carrying the role instead.
+        if group_id:
+            tag = ('role', role_id)
+        else:
+            tag = ('user', user_id)
+        notifications.invalidate_token_cache_notification(reason, tags=[tag])
 
     @notifications.role_assignment('created')
     def create_grant(self, role_id, user_id=None, group_id=None,
@@ -636,46 +656,31 @@ class Manager(manager.Manager):
         caller can determine where the assignment came from.
 
         """
-        def _make_implied_ref_copy(prior_ref, implied_role_id):
-            # Create a ref for an implied role from the ref of a prior role,
-            # setting the new role_id to be the implied role and the indirect
-            # role_id to be the prior role
-            implied_ref = copy.deepcopy(prior_ref)
+        def _make_implied_ref_copy(ref, prior_role_id, implied_role_id):
+            # Create a ref for an implied role from the ref of a role implying
+            # it, directly or not, setting the new role_id to be the implied
+            # role and the indirect role_id to be its prior role
+            implied_ref = dict(ref)
             implied_ref['role_id'] = implied_role_id
-            indirect = implied_ref.setdefault('indirect', {})
-            indirect['role_id'] = prior_ref['role_id']
+            indirect = dict(ref.get('indirect', {}))
+            indirect['role_id'] = prior_role_id
+            implied_ref['indirect'] = indirect
             return implied_ref
 
         if not CONF.token.infer_roles:
             return role_refs
         try:
-            implied_roles_cache = {}
-            role_refs_to_check = list(role_refs)
-            ref_results = list(role_refs)
-            checked_role_refs = list()
-            while(role_refs_to_check):
-                next_ref = role_refs_to_check.pop()
-                checked_role_refs.append(next_ref)
-                next_role_id = next_ref['role_id']
-                if next_role_id in implied_roles_cache:
-                    implied_roles = implied_roles_cache[next_role_id]
-                else:
-                    implied_roles = (
-                        PROVIDERS.role_api.list_implied_roles(next_role_id))
-                    implied_roles_cache[next_role_id] = implied_roles
-                for implied_role in implied_roles:
-                    implied_ref = (
-                        _make_implied_ref_copy(
-                            next_ref, implied_role['implied_role_id']))
-                    if implied_ref in checked_role_refs:
-                        # Avoid traversing a cycle
-                        continue
-                    else:
-                        ref_results.append(implied_ref)
-                        role_refs_to_check.append(implied_ref)
+            closure = PROVIDERS.role_api.get_role_inference_closure()
         except exception.NotImplemented:
             LOG.error('Role driver does not support implied roles.')
+            return role_refs
 
+        ref_results = list(role_refs)
+        for ref in role_refs:
+            for prior_role_id, implied_role_id in closure.get(
+                    ref['role_id'], []):
+                ref_results.append(_make_implied_ref_copy(
+                    ref, prior_role_id, implied_role_id))
         return ref_results
 
     def _filter_by_role_id(self, role_id, ref_results):
@@ -942,7 +947,8 @@ class Manager(manager.Manager):
                               include_subtree=False, inherited=None,
                               effective=None, include_names=False,
                               source_from_group_ids=None,
-                              strip_domain_roles=True):
+                              strip_domain_roles=True, hints=None,
+                              restrict_to_domain_id=None):
         """List role assignments, honoring effective mode and provided filters.
 
         Returns a list of role assignments, where their attributes match the
@@ -979,6 +985,18 @@ class Manager(manager.Manager):
         This stripping can be disabled by specifying strip_domain_roles=False,
         which is useful for internal calls like trusts which need to examine
         the full set of roles.
+
+        restrict_to_domain_id limits the list to assignments on that domain
+        or on projects it owns, such as those visible with a token scoped to
+        the domain. Unlike the domain_id filter, it is applied to the
+        assignments found with the other filters.
+
+        If hints with a marker are provided, the assignments are ordered by
+        their markers (see get_role_assignment_marker), only those after the
+        marker are returned and the list is truncated to the limit of the
+        hints, before any names are looked up. Any restriction to a domain is
+        applied first, so that pages only hold and continue from assignments
+        the caller may see.
         """
         subtree_ids = None
         if project_id and include_subtree:
@@ -1000,72 +1018,168 @@ class Manager(manager.Manager):
                 role_id, user_id, group_id, system, domain_id, project_id,
                 subtree_ids, inherited)
 
+        if restrict_to_domain_id is not None:
+            role_assignments = self._restrict_role_assignments_to_domain(
+                role_assignments, restrict_to_domain_id)
+
+        if hints is not None and hints.marker is not None:
+            role_assignments = self._paginate_role_assignments(
+                role_assignments, hints)
+
         if include_names:
             return self._get_names_from_role_assignments(role_assignments)
         return role_assignments
 
+    def _restrict_role_assignments_to_domain(self, role_assignments,
+                                             domain_id):
+        project_domain_ids = {}
+        restricted = []
+        for ref in role_assignments:
+            if ref.get('domain_id') == domain_id:
+                restricted.append(ref)
+                continue
+            project_id = ref.get('project_id')
+            if not project_id:
+                continue
+            if project_id not in project_domain_ids:
+                project_domain_ids[project_id] = (
+                    PROVIDERS.resource_api.get_project(project_id)[
+                        'domain_id'])
+            if project_domain_ids[project_id] == domain_id:
+                restricted.append(ref)
+        return restricted
+
+    def get_role_assignment_marker(self, role_assignment):
+        """Return the marker of a role assignment, to paginate a list.
+
+        Role assignments have no ID, so they are ordered by a string made of
+        the IDs of their actor, target and role, and of the entities they
+        were inherited or expanded from.
+        """
+        indirect = role_assignment.get('indirect', {})
+        return ':'.join([
+            role_assignment.get('user_id') or
+            role_assignment.get('group_id') or '',
+            role_assignment.get('project_id') or
+            role_assignment.get('domain_id') or
+            role_assignment.get('system') or '',
+            role_assignment['role_id'],
+            'inherited' if role_assignment.get('inherited_to_projects')
+            else '',
+            indirect.get('user_id') or indirect.get('group_id') or '',
+            indirect.get('project_id') or indirect.get('domain_id') or '',
+            indirect.get('role_id') or ''])
+
+    def _paginate_role_assignments(self, role_assignments, hints):
+        marker = hints.marker['marker']
+        role_assignments = sorted(
+            ((self.get_role_assignment_marker(ref), ref)
+             for ref in role_assignments), key=lambda item: item[0])
+        if marker is not None:
+            role_assignments = [
+                item for item in role_assignments if item[0] > marker]
+        hints.marker['ordered'] = True
+        if hints.limit and len(role_assignments) > hints.limit['limit']:
+            role_assignments = role_assignments[:hints.limit['limit']]
+            hints.limit['truncated'] = True
+        return [ref for _marker, ref in role_assignments]
+
     def _get_names_from_role_assignments(self, role_assignments):
-        role_assign_list = []
+        # NOTE: The entities referenced by the assignments are fetched with
+        # one query per kind of entity, rather than one per assignment.
+        ids = collections.defaultdict(set)
+        for role_asgmt in role_assignments:
+            for key in ('domain_id', 'user_id', 'group_id', 'project_id',
+                        'role_id'):
+                if key in role_asgmt:
+                    ids[key].add(role_asgmt[key])
+
+        users = dict(
+            (user['id'], user) for user in
+            PROVIDERS.identity_api.list_users_from_ids(ids['user_id']))
+        groups = dict(
+            (group['id'], group) for group in
+            PROVIDERS.identity_api.list_groups_from_ids(ids['group_id']))
+        projects = dict(
+            (project['id'], project) for project in
+            PROVIDERS.resource_api.list_projects_from_ids(
+                list(ids['project_id'])))
+        roles = dict(
+            (role['id'], role) for role in
+            PROVIDERS.role_api.list_roles_from_ids(list(ids['role_id'])))
+        domain_ids = ids['domain_id'].union(
+            *[[ref['domain_id'] for ref in refs.values()
+               if ref['domain_id'] is not None]
+              for refs in (users, groups, projects, roles)])
+        domains = dict(
+            (domain['id'], domain) for domain in
+            PROVIDERS.resource_api.list_domains_from_ids(list(domain_ids)))
+
+        def _get_domain_name(domain_id):
+            try:
+                return domains[domain_id]['name']
+            except KeyError:
+                raise exception.DomainNotFound(domain_id=domain_id)
 
+        role_assign_list = []
         for role_asgmt in role_assignments:
-            new_assign = copy.deepcopy(role_asgmt)
-            for key, value in role_asgmt.items():
-                if key == 'domain_id':
-                    _domain = PROVIDERS.resource_api.get_domain(value)
-                    new_assign['domain_name'] = _domain['name']
-                elif key == 'user_id':
-                    try:
-                        # Note(knikolla): Try to get the user, otherwise
-                        # if the user wasn't found in the backend
-                        # use empty values.
-                        _user = PROVIDERS.identity_api.get_user(value)
-                    except exception.UserNotFound:
-                        msg = ('User %(user)s not found in the'
-                               ' backend but still has role assignments.')
-                        LOG.warning(msg, {'user': value})
-                        new_assign['user_name'] = ''
-                        new_assign['user_domain_id'] = ''
-                        new_assign['user_domain_name'] = ''
-                    else:
-                        new_assign['user_name'] = _user['name']
-                        new_assign['user_domain_id'] = _user['domain_id']
-                        new_assign['user_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _user['domain_id'])['name'])
-                elif key == 'group_id':
-                    try:
-                        # Note(knikolla): Try to get the group, otherwise
-                        # if the group wasn't found in the backend
-                        # use empty values.
-                        _group = PROVIDERS.identity_api.get_group(value)
-                    except exception.GroupNotFound:
-                        msg = ('Group %(group)s not found in the'
-                               ' backend but still has role assignments.')
-                        LOG.warning(msg, {'group': value})
-                        new_assign['group_name'] = ''
-                        new_assign['group_domain_id'] = ''
-                        new_assign['group_domain_name'] = ''
-                    else:
-                        new_assign['group_name'] = _group['name']
-                        new_assign['group_domain_id'] = _group['domain_id']
-                        new_assign['group_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _group['domain_id'])['name'])
-                elif key == 'project_id':
-                    _project = PROVIDERS.resource_api.get_project(value)
-                    new_assign['project_name'] = _project['name']
-                    new_assign['project_domain_id'] = _project['domain_id']
-                    new_assign['project_domain_name'] = (
-                        PROVIDERS.resource_api.get_domain(
-                            _project['domain_id'])['name'])
-                elif key == 'role_id':
-                    _role = PROVIDERS.role_api.get_role(value)
-                    new_assign['role_name'] = _role['name']
-                    if _role['domain_id'] is not None:
-                        new_assign['role_domain_id'] = _role['domain_id']
-                        new_assign['role_domain_name'] = (
-                            PROVIDERS.resource_api.get_domain(
-                                _role['domain_id'])['name'])
+            new_assign = role_asgmt.copy()
+            if 'domain_id' in role_asgmt:
+                new_assign['domain_name'] = _get_domain_name(
+                    role_asgmt['domain_id'])
+            if 'user_id' in role_asgmt:
+                # Note(knikolla): Try to get the user, otherwise
+                # if the user wasn't found in the backend
+                # use empty values.
+                _user = users.get(role_asgmt['user_id'])
+                if _user is None:
+                    msg = ('User %(user)s not found in the'
+                           ' backend but still has role assignments.')
+                    LOG.warning(msg, {'user': role_asgmt['user_id']})
+                    new_assign['user_name'] = ''
+                    new_assign['user_domain_id'] = ''
+                    new_assign['user_domain_name'] = ''
+                else:
+                    new_assign['user_name'] = _user['name']
+                    new_assign['user_domain_id'] = _user['domain_id']
+                    new_assign['user_domain_name'] = _get_domain_name(
+                        _user['domain_id'])
+            if 'group_id' in role_asgmt:
+                # Note(knikolla): Try to get the group, otherwise
+                # if the group wasn't found in the backend
+                # use empty values.
+                _group = groups.get(role_asgmt['group_id'])
+                if _group is None:
+                    msg = ('Group %(group)s not found in the'
+                           ' backend but still has role assignments.')
+                    LOG.warning(msg, {'group': role_asgmt['group_id']})
+                    new_assign['group_name'] = ''
+                    new_assign['group_domain_id'] = ''
+                    new_assign['group_domain_name'] = ''
+                else:
+                    new_assign['group_name'] = _group['name']
+                    new_assign['group_domain_id'] = _group['domain_id']
+                    new_assign['group_domain_name'] = _get_domain_name(
+                        _group['domain_id'])
+            if 'project_id' in role_asgmt:
+                _project = projects.get(role_asgmt['project_id'])
+                if _project is None:
+                    raise exception.ProjectNotFound(
+                        project_id=role_asgmt['project_id'])
+                new_assign['project_name'] = _project['name']
+                new_assign['project_domain_id'] = _project['domain_id']
+                new_assign['project_domain_name'] = _get_domain_name(
+                    _project['domain_id'])
+            if 'role_id' in role_asgmt:
+                _role = roles.get(role_asgmt['role_id'])
+                if _role is None:
+                    raise exception.RoleNotFound(
+                        role_id=role_asgmt['role_id'])
+                new_assign['role_name'] = _role['name']
+                if _role['domain_id'] is not None:
+                    new_assign['role_domain_id'] = _role['domain_id']
+                    new_assign['role_domain_name'] = _get_domain_name(
+                        _role['domain_id'])
             role_assign_list.append(new_assign)
         return role_assign_list
 
@@ -1274,6 +1388,42 @@ class RoleManager(manager.Manager):
     def get_role(self, role_id):
         return self.driver.get_role(role_id)
 
+    @MEMOIZE_COMPUTED_ASSIGNMENTS
+    def get_role_inference_closure(self):
+        """Get the inference rules that apply to each role.
+
+        A role implies the roles of its own inference rules, as well as those
+        implied by these roles in turn. Since this is stored in the computed
+        assignments cache region, it is rebuilt whenever an implied role is
+        created or deleted.
+
+        :returns: a dictionary mapping the ID of each prior role to a list of
+                  ``[prior_role_id, implied_role_id]`` pairs, one for each
+                  inference rule reachable from the role, in the order they
+                  are reached
+
+        """
+        implied_role_ids = collections.defaultdict(list)
+        for rule in self.driver.list_role_inference_rules():
+            implied_role_ids[rule['prior_role_id']].append(
+                rule['implied_role_id'])
+
+        closure = {}
+        for role_id in implied_role_ids:
+            rules = []
+            reached_role_ids = set([role_id])
+            role_ids_to_check = collections.deque([role_id])
+            while role_ids_to_check:
+                prior_role_id = role_ids_to_check.popleft()
+                for implied_role_id in implied_role_ids.get(prior_role_id, []):
+                    rules.append([prior_role_id, implied_role_id])
+                    # Avoid traversing a cycle
+                    if implied_role_id not in reached_role_ids:
+                        reached_role_ids.add(implied_role_id)
+                        role_ids_to_check.append(implied_role_id)
+            closure[role_id] = rules
+        return closure
+
     def get_unique_role_by_name(self, role_name, hints=None):
         if not hints:
             hints = driver_hints.Hints()
@@ -1310,6 +1460,8 @@ class RoleManager(manager.Manager):
         ret = self.driver.update_role(role_id, role)
         notifications.Audit.updated(self._ROLE, role_id, initiator)
         self.get_role.invalidate(self, role_id)
+        # Role names are part of the roles computed for tokens.
+        COMPUTED_ASSIGNMENTS_REGION.invalidate()
         return ret
 
     def delete_role(self, role_id, initiator=None):
@@ -1326,7 +1478,9 @@ class RoleManager(manager.Manager):
             'enforced accordingly the next time they authenticate or validate '
             'a token' % {'role_id': role_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        notifications.invalidate_token_cache_notification(
+            reason, tags=[('role', role_id)]
+        )
         COMPUTED_ASSIGNMENTS_REGION.invalidate()
 
     # TODO(ayoung): Add notification
@@ -106,6 +106,19 @@ token_issue = {
     'required': ['identity', ],
 }
 
+token_validate = {
+    'type': 'object',
+    'properties': {
+        'tokens': {
+            'type': 'array',
+            'items': {'type': 'string', 'minLength': 1, },
+            'minItems': 1,
+        },
+    },
+    'required': ['tokens', ],
+    'additionalProperties': False,
+}
+
 
 def validate_issue_token_auth(auth=None):
     if auth is None:
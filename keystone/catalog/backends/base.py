@@ -16,6 +16,7 @@ import abc
 
 import six
 
+from keystone.common import driver_hints
 from keystone.common import provider_api
 import keystone.conf
 from keystone import exception
@@ -334,6 +335,21 @@ class CatalogDriverBase(provider_api.ProviderAPIMixin, object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_project_endpoints(self):
+        """List all the endpoint to project associations.
+
+        Drivers should override this to get all the associations in one
+        query.
+
+        :returns: a list of dictionaries with the ``endpoint_id`` and
+                  ``project_id`` of each association.
+
+        """
+        refs = []
+        for endpoint in self.list_endpoints(driver_hints.Hints()):
+            refs.extend(self.list_projects_for_endpoint(endpoint['id']))
+        return refs
+
     @abc.abstractmethod
     def delete_association_by_endpoint(self, endpoint_id):
         """Remove all the endpoints to project association with endpoint.
@@ -471,6 +487,22 @@ class CatalogDriverBase(provider_api.ProviderAPIMixin, object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_project_endpoint_groups(self):
+        """List all the endpoint group to project associations.
+
+        Drivers should override this to get all the associations in one
+        query.
+
+        :returns: a list of dictionaries with the ``endpoint_group_id`` and
+                  ``project_id`` of each association.
+
+        """
+        refs = []
+        for endpoint_group in self.list_endpoint_groups():
+            refs.extend(self.list_projects_associated_with_endpoint_group(
+                endpoint_group['id']))
+        return refs
+
     @abc.abstractmethod
     def remove_endpoint_group_from_project(self, endpoint_group_id,
                                            project_id):
@@ -90,6 +90,12 @@ class Endpoint(sql.ModelBase, sql.ModelDictMixinWithExtras):
 
 
 class Catalog(base.CatalogDriverBase):
+    def __init__(self):
+        super(Catalog, self).__init__()
+        # The last compiled V3 catalog and the catalog tag it was compiled
+        # for, see _get_compiled_v3_catalog().
+        self._compiled_v3_catalog = (None, None)
+
     # Regions
     def list_regions(self, hints):
         with sql.session_for_read() as session:
@@ -322,6 +328,59 @@ class Catalog(base.CatalogDriverBase):
 
             return catalog
 
+    def _compile_v3_catalog(self):
+        """Build the parts of the V3 catalog shared by every user and project.
+
+        Every enabled endpoint is kept with its URL formatted up to the user
+        and project ids, which are left for :meth:`get_v3_catalog` to fill in.
+
+        :returns: A list of services, each with a list of endpoint and URL
+                  rendering function pairs
+
+        """
+        substitutions = dict(
+            itertools.chain(CONF.items(), CONF.eventlet_server.items()))
+        deferred_keys = ['tenant_id', 'project_id', 'user_id']
+
+        def compile_v3_endpoints(endpoints):
+            for endpoint in (ep.to_dict() for ep in endpoints if ep.enabled):
+                del endpoint['service_id']
+                del endpoint['legacy_endpoint_id']
+                del endpoint['enabled']
+                endpoint['region'] = endpoint['region_id']
+                try:
+                    render_url = utils.compile_url(
+                        endpoint.pop('url'), substitutions, deferred_keys)
+                except exception.MalformedEndpoint:  # nosec(tkelsey)
+                    # this failure is already logged in format_url()
+                    continue
+
+                yield endpoint, render_url
+
+        with sql.session_for_read() as session:
+            services = (session.query(Service).filter(
+                Service.enabled == true()).options(
+                    sql.joinedload(Service.endpoints)).all())
+
+            return [{'endpoints': list(compile_v3_endpoints(svc.endpoints)),
+                     'id': svc.id,
+                     'type': svc.type,
+                     'name': svc.extra.get('name', '')}
+                    for svc in services]
+
+    def _get_compiled_v3_catalog(self):
+        # NOTE: The catalog tag changes whenever the catalog is modified, in
+        # this process or any other sharing its cache, so a compiled catalog
+        # can be used for as long as the tag stays the same. The tag is read
+        # before compiling so that a change made in the meantime is never
+        # missed.
+        tag = self.catalog_api.get_computed_catalog_tag()
+        compiled_tag, compiled = self._compiled_v3_catalog
+        if tag is None or compiled is None or tag != compiled_tag:
+            compiled = self._compile_v3_catalog()
+            self._compiled_v3_catalog = (tag, compiled)
+        return compiled
+
     def get_v3_catalog(self, user_id, project_id):
         """Retrieve and format the current V3 service catalog.
 
@@ -335,99 +394,63 @@ class Catalog(base.CatalogDriverBase):
         :returns: A list representing the service catalog or an empty list
 
         """
-        d = dict(
-            itertools.chain(CONF.items(), CONF.eventlet_server.items()))
-        d.update({'user_id': user_id})
-        silent_keyerror_failures = []
+        substitutions = {'user_id': user_id}
         if project_id:
-            d.update({
+            substitutions.update({
                 'tenant_id': project_id,
                 'project_id': project_id,
             })
-        else:
-            silent_keyerror_failures = ['tenant_id', 'project_id']
-
-        with sql.session_for_read() as session:
-            services = (session.query(Service).filter(
-                Service.enabled == true()).options(
-                    sql.joinedload(Service.endpoints)).all())
 
-            def make_v3_endpoints(endpoints):
-                for endpoint in (ep.to_dict()
-                                 for ep in endpoints if ep.enabled):
-                    del endpoint['service_id']
-                    del endpoint['legacy_endpoint_id']
-                    del endpoint['enabled']
-                    endpoint['region'] = endpoint['region_id']
-                    try:
-                        formatted_url = utils.format_url(
-                            endpoint['url'], d,
-                            silent_keyerror_failures=silent_keyerror_failures)
-                        if formatted_url:
-                            endpoint['url'] = formatted_url
-                        else:
-                            continue
-                    except exception.MalformedEndpoint:  # nosec(tkelsey)
-                        # this failure is already logged in format_url()
-                        continue
-
-                    yield endpoint
-
-            # TODO(davechen): If there is service with no endpoints, we should
-            # skip the service instead of keeping it in the catalog,
-            # see bug #1436704.
-            def make_v3_service(svc):
-                eps = list(make_v3_endpoints(svc.endpoints))
-                service = {'endpoints': eps, 'id': svc.id, 'type': svc.type}
-                service['name'] = svc.extra.get('name', '')
-                return service
-
-            # Build the unfiltered catalog, this is the catalog that is
-            # returned if endpoint filtering is not performed and the
-            # option of `return_all_endpoints_if_no_filter` is set to true.
-            catalog_ref = [make_v3_service(svc) for svc in services]
-
-            # Filter the `catalog_ref` above by any project-endpoint
-            # association configured by endpoint filter.
-            filtered_endpoints = {}
-            if project_id:
-                filtered_endpoints = (
-                    self.catalog_api.list_endpoints_for_project(project_id))
-            # endpoint filter is enabled, only return the filtered endpoints.
-            if filtered_endpoints:
-                filtered_ids = list(filtered_endpoints.keys())
-                # This is actually working on the copy of `catalog_ref` since
-                # the index will be shifted if remove/add any entry for the
-                # original one.
-                for service in catalog_ref[:]:
-                    endpoints = service['endpoints']
-                    for endpoint in endpoints[:]:
-                        endpoint_id = endpoint['id']
-                        # remove the endpoint that is not associated with
-                        # the project.
-                        if endpoint_id not in filtered_ids:
-                            service['endpoints'].remove(endpoint)
-                            continue
-                        # remove the disabled endpoint from the list.
-                        if not filtered_endpoints[endpoint_id]['enabled']:
-                            service['endpoints'].remove(endpoint)
-                    # NOTE(davechen): The service will not be included in the
-                    # catalog if the service doesn't have any endpoint when
-                    # endpoint filter is enabled, this is inconsistent with
-                    # full catalog that is returned when endpoint filter is
-                    # disabled.
-                    if not service.get('endpoints'):
-                        catalog_ref.remove(service)
-            # When it arrives here it means it's domain scoped token (
-            # `project_id` is not set) or it's a project scoped token
-            # but the endpoint filtering is not performed.
-            # Both of them tell us the endpoint filtering is not enabled, so
-            # check the option of `return_all_endpoints_if_no_filter`, it will
-            # judge whether a full unfiltered catalog or a empty service
-            # catalog will be returned.
-            elif not CONF.endpoint_filter.return_all_endpoints_if_no_filter:
-                return []
+        def make_v3_endpoints(endpoints):
+            for endpoint, render_url in endpoints:
+                url = render_url(substitutions)
+                if url:
+                    yield dict(endpoint, url=url)
+
+        # TODO(davechen): If there is service with no endpoints, we should
+        # skip the service instead of keeping it in the catalog,
+        # see bug #1436704.
+        def make_v3_service(svc):
+            service = dict(svc)
+            service['endpoints'] = list(make_v3_endpoints(svc['endpoints']))
+            return service
+
+        services = self._get_compiled_v3_catalog()
+
+        # Filter the catalog by any project-endpoint association configured
+        # by endpoint filter.
+        endpoint_ids = frozenset()
+        if project_id:
+            endpoint_ids = self.catalog_api.get_endpoint_ids_for_project(
+                project_id)
+        # endpoint filter is enabled, only return the filtered endpoints.
+        if endpoint_ids:
+            catalog_ref = []
+            for svc in services:
+                service = make_v3_service(dict(
+                    svc, endpoints=[(endpoint, render_url)
+                                    for endpoint, render_url
+                                    in svc['endpoints']
+                                    if endpoint['id'] in endpoint_ids]))
+                # NOTE(davechen): The service will not be included in the
+                # catalog if the service doesn't have any endpoint when
+                # endpoint filter is enabled, this is inconsistent with
+                # full catalog that is returned when endpoint filter is
+                # disabled.
+                if service['endpoints']:
+                    catalog_ref.append(service)
             return catalog_ref
+        # When it arrives here it means it's domain scoped token (
+        # `project_id` is not set) or it's a project scoped token
+        # but the endpoint filtering is not performed.
+        # Both of them tell us the endpoint filtering is not enabled, so
+        # check the option of `return_all_endpoints_if_no_filter`, it will
+        # judge whether a full unfiltered catalog or a empty service
+        # catalog will be returned.
+        elif not CONF.endpoint_filter.return_all_endpoints_if_no_filter:
+            return []
+        # Build the unfiltered catalog.
+        return [make_v3_service(svc) for svc in services]
 
     @sql.handle_conflicts(conflict_type='project_endpoint')
     def add_endpoint_to_project(self, endpoint_id, project_id):
@@ -470,6 +493,11 @@ class Catalog(base.CatalogDriverBase):
             endpoint_filter_refs = query.all()
             return [ref.to_dict() for ref in endpoint_filter_refs]
 
+    def list_project_endpoints(self):
+        with sql.session_for_read() as session:
+            query = session.query(ProjectEndpoint)
+            return [ref.to_dict() for ref in query.all()]
+
     def delete_association_by_endpoint(self, endpoint_id):
         with sql.session_for_write() as session:
             query = session.query(ProjectEndpoint)
@@ -575,6 +603,11 @@ class Catalog(base.CatalogDriverBase):
             endpoint_group_refs = query.all()
             return [ref.to_dict() for ref in endpoint_group_refs]
 
+    def list_project_endpoint_groups(self):
+        with sql.session_for_read() as session:
+            query = session.query(ProjectEndpointGroupMembership)
+            return [ref.to_dict() for ref in query.all()]
+
     def _delete_endpoint_group_association_by_endpoint_group(
             self, session, endpoint_group_id):
         query = session.query(ProjectEndpointGroupMembership)
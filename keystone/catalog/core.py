@@ -15,6 +15,8 @@
 
 """Main entry point into the Catalog service."""
 
+import collections
+
 from keystone.common import cache
 from keystone.common import driver_hints
 from keystone.common import manager
@@ -65,6 +67,7 @@ class Manager(manager.Manager):
         notifications.register_event_callback(
             notifications.ACTIONS.deleted, 'endpoint',
             self._on_project_or_endpoint_delete)
+        self._endpoint_filter_index = (None, None)
 
     def _on_project_or_endpoint_delete(self, service, resource_type, operation,
                                        payload):
@@ -233,6 +236,17 @@ class Manager(manager.Manager):
     def list_endpoints(self, hints=None):
         return self.driver.list_endpoints(hints or driver_hints.Hints())
 
+    def get_computed_catalog_tag(self):
+        """Return a tag identifying the current computed catalogs.
+
+        The tag changes whenever a change is made that could affect a catalog
+        returned by :meth:`get_v3_catalog`.
+
+        :returns: an opaque value, or None if it cannot be determined
+
+        """
+        return cache.get_region_id(COMPUTED_CATALOG_REGION)
+
     @MEMOIZE_COMPUTED_CATALOG
     def get_v3_catalog(self, user_id, project_id):
         return self.driver.get_v3_catalog(user_id, project_id)
@@ -264,6 +278,16 @@ class Manager(manager.Manager):
             # Some catalog drivers don't support this
             pass
 
+    def update_endpoint_group(self, endpoint_group_id, endpoint_group):
+        ref = self.driver.update_endpoint_group(endpoint_group_id,
+                                                endpoint_group)
+        COMPUTED_CATALOG_REGION.invalidate()
+        return ref
+
+    def delete_endpoint_group(self, endpoint_group_id):
+        self.driver.delete_endpoint_group(endpoint_group_id)
+        COMPUTED_CATALOG_REGION.invalidate()
+
     def get_endpoint_groups_for_project(self, project_id):
         # recover the project endpoint group memberships and for each
         # membership recover the endpoint group
@@ -276,11 +300,8 @@ class Manager(manager.Manager):
         except exception.EndpointGroupNotFound:
             return []
 
-    def get_endpoints_filtered_by_endpoint_group(self, endpoint_group_id):
-        endpoints = self.list_endpoints()
-        filters = self.get_endpoint_group(endpoint_group_id)['filters']
-        filtered_endpoints = []
-
+    @staticmethod
+    def _filter_endpoints(endpoints, filters):
         for endpoint in endpoints:
             is_candidate = True
             for key, value in filters.items():
@@ -288,40 +309,130 @@ class Manager(manager.Manager):
                     is_candidate = False
                     break
             if is_candidate:
-                filtered_endpoints.append(endpoint)
-        return filtered_endpoints
+                yield endpoint
+
+    def get_endpoints_filtered_by_endpoint_group(self, endpoint_group_id):
+        endpoints = self.list_endpoints()
+        filters = self.get_endpoint_group(endpoint_group_id)['filters']
+        return list(self._filter_endpoints(endpoints, filters))
+
+    def _compile_endpoint_filter_index(self):
+        """Map projects to the endpoints they are associated with.
+
+        Each endpoint group is evaluated once, however many projects it is
+        associated with, and projects associated with the same endpoints
+        share the same set. Associations are removed without invalidating
+        the index when a project is deleted, which only leaves entries no
+        token can be scoped to.
+
+        :returns: a dictionary mapping project IDs to frozensets of the IDs
+                  of the endpoints associated with them, directly or through
+                  endpoint groups
+
+        """
+        endpoints = self.driver.list_endpoints(driver_hints.Hints())
+        existing_ids = set(endpoint['id'] for endpoint in endpoints)
+        project_endpoint_ids = collections.defaultdict(set)
+        for ref in self.driver.list_project_endpoints():
+            if ref['endpoint_id'] in existing_ids:
+                project_endpoint_ids[ref['project_id']].add(
+                    ref['endpoint_id'])
+
+        endpoint_group_ids = {}
+        for endpoint_group in self.driver.list_endpoint_groups():
+            endpoint_group_ids[endpoint_group['id']] = [
+                endpoint['id'] for endpoint in self._filter_endpoints(
+                    endpoints, endpoint_group['filters'])]
+        for ref in self.driver.list_project_endpoint_groups():
+            project_endpoint_ids[ref['project_id']].update(
+                endpoint_group_ids.get(ref['endpoint_group_id'], []))
+
+        index = {}
+        shared = {}
+        for project_id, endpoint_ids in project_endpoint_ids.items():
+            endpoint_ids = frozenset(endpoint_ids)
+            index[project_id] = shared.setdefault(endpoint_ids, endpoint_ids)
+        return index
+
+    def _lookup_endpoint_ids_for_project(self, project_id):
+        """Look up the endpoints associated with a single project.
+
+        :returns: a frozenset of the IDs of the endpoints associated with the
+                  project, directly or through endpoint groups
+
+        """
+        endpoints = self.driver.list_endpoints(driver_hints.Hints())
+        existing_ids = set(endpoint['id'] for endpoint in endpoints)
+        endpoint_ids = set(
+            ref['endpoint_id']
+            for ref in self.driver.list_endpoints_for_project(project_id)
+            if ref['endpoint_id'] in existing_ids)
+        for ref in self.driver.list_endpoint_groups_for_project(project_id):
+            try:
+                endpoint_group = self.driver.get_endpoint_group(
+                    ref['endpoint_group_id'])
+            except exception.EndpointGroupNotFound:  # nosec
+                # The endpoint group was deleted in the meantime.
+                continue
+            endpoint_ids.update(
+                endpoint['id'] for endpoint in self._filter_endpoints(
+                    endpoints, endpoint_group['filters']))
+        return frozenset(endpoint_ids)
+
+    def get_endpoint_ids_for_project(self, project_id):
+        """Return the IDs of the endpoints associated with a project.
+
+        The associations are read from an index covering every project,
+        which is compiled again only once the catalog tag changes. Without a
+        stable tag, for instance when caching is disabled, the associations
+        of the project are looked up instead.
+
+        :param project_id: project identifier to check
+        :type project_id: string
+        :returns: a frozenset of the IDs of the endpoints associated with the
+                  project, directly or through endpoint groups
+        :raises keystone.exception.ProjectNotFound: If the project has no
+            associations and does not exist.
+
+        """
+        # NOTE: Like the compiled catalogs, the index is stamped with the
+        # catalog tag read before compiling it, so a change made in the
+        # meantime is never missed.
+        tag = self.get_computed_catalog_tag()
+        if tag is None or tag != self.get_computed_catalog_tag():
+            # NOTE: Without a cache backend to keep it, the tag changes on
+            # every read, and the index would be compiled for every catalog.
+            endpoint_ids = self._lookup_endpoint_ids_for_project(project_id)
+            if not endpoint_ids:
+                PROVIDERS.resource_api.get_project(project_id)
+            return endpoint_ids
+
+        compiled_tag, index = self._endpoint_filter_index
+        if index is None or tag != compiled_tag:
+            index = self._compile_endpoint_filter_index()
+            self._endpoint_filter_index = (tag, index)
+        if project_id not in index:
+            PROVIDERS.resource_api.get_project(project_id)
+            return frozenset()
+        return index[project_id]
 
     def list_endpoints_for_project(self, project_id):
         """List all endpoints associated with a project.
 
         :param project_id: project identifier to check
         :type project_id: string
-        :returns: a list of endpoint ids or an empty list.
+        :returns: a dictionary mapping endpoint ids to endpoints, or an empty
+                  dictionary.
 
         """
-        refs = self.driver.list_endpoints_for_project(project_id)
         filtered_endpoints = {}
-        for ref in refs:
+        for endpoint_id in self.get_endpoint_ids_for_project(project_id):
             try:
-                endpoint = self.get_endpoint(ref['endpoint_id'])
-                filtered_endpoints.update({ref['endpoint_id']: endpoint})
-            except exception.EndpointNotFound:
-                # remove bad reference from association
-                self.remove_endpoint_from_project(ref['endpoint_id'],
-                                                  project_id)
-
-        # need to recover endpoint_groups associated with project
-        # then for each endpoint group return the endpoints.
-        endpoint_groups = self.get_endpoint_groups_for_project(project_id)
-        for endpoint_group in endpoint_groups:
-            endpoint_refs = self.get_endpoints_filtered_by_endpoint_group(
-                endpoint_group['id'])
-            # now check if any endpoints for current endpoint group are not
-            # contained in the list of filtered endpoints
-            for endpoint_ref in endpoint_refs:
-                if endpoint_ref['id'] not in filtered_endpoints:
-                    filtered_endpoints[endpoint_ref['id']] = endpoint_ref
-
+                filtered_endpoints[endpoint_id] = self.get_endpoint(
+                    endpoint_id)
+            except exception.EndpointNotFound:  # nosec
+                # The endpoint was deleted since the index was compiled.
+                pass
         return filtered_endpoints
 
     def delete_association_by_endpoint(self, endpoint_id):
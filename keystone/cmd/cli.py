@@ -815,6 +815,95 @@ class TrustFlush(BaseApp):
         )
 
 
+class RevocationCompact(BaseApp):
+    """Delete revocation events subsumed by broader events."""
+
+    name = 'revocation_compact'
+
+    @classmethod
+    def main(cls):
+        drivers = backends.load_backends()
+        revoke_manager = drivers['revoke_api']
+        total, removed = revoke_manager.compact_events()
+        ratio = 100.0 * removed / total if total else 0.0
+        print(_('Deleted %(removed)d of %(total)d revocation events '
+                '(%(ratio).1f%%).') %
+              {'removed': removed, 'total': total, 'ratio': ratio})
+
+
+class RevocationExport(BaseApp):
+    """Export a snapshot of the active revocation events."""
+
+    name = 'revocation_export'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(RevocationExport, cls).add_argument_parser(subparsers)
+        parser.add_argument('--output', default=None,
+                            help=('The file to write the snapshot to. '
+                                  'Defaults to [revoke] snapshot_file.'))
+        return parser
+
+    @classmethod
+    def main(cls):
+        path = CONF.command.output or CONF.revoke.snapshot_file
+        drivers = backends.load_backends()
+        revoke_manager = drivers['revoke_api']
+        try:
+            count, high_water_mark = revoke_manager.export_events(path)
+        except (IOError, OSError) as e:
+            raise SystemExit(_('Unable to write the revocation event '
+                               'snapshot to %(path)s: %(error)s') %
+                             {'path': path, 'error': e})
+        if high_water_mark is None:
+            high_water_mark = _('none')
+        else:
+            high_water_mark = utils.isotime(high_water_mark, subsecond=True)
+        print(_('Exported %(count)d revocation events to %(path)s, with a '
+                'high-water mark of %(high_water_mark)s.') %
+              {'count': count, 'path': path,
+               'high_water_mark': high_water_mark})
+
+
+class RevocationFlush(BaseApp):
+    """Delete expired revocation events from the backend."""
+
+    name = 'revocation_flush'
+
+    @classmethod
+    def add_argument_parser(cls, subparsers):
+        parser = super(RevocationFlush, cls).add_argument_parser(subparsers)
+        parser.add_argument('--batch-size', default=None, type=int,
+                            help=('The maximum number of events to delete '
+                                  'in a single transaction. Defaults to '
+                                  '[revoke] prune_batch_size.'))
+        parser.add_argument('--batch-delay', default=None, type=float,
+                            help=('The number of seconds to wait between '
+                                  'two batches. Defaults to [revoke] '
+                                  'prune_batch_delay.'))
+        return parser
+
+    @classmethod
+    def main(cls):
+        if CONF.command.batch_size is not None and CONF.command.batch_size < 1:
+            raise SystemExit(_('--batch-size must be a positive integer.'))
+        if (CONF.command.batch_delay is not None and
+                CONF.command.batch_delay < 0):
+            raise SystemExit(_('--batch-delay must not be negative.'))
+
+        drivers = backends.load_backends()
+        revoke_manager = drivers['revoke_api']
+
+        def progress(total):
+            print(_('Deleted %d expired revocation events so far.') % total)
+
+        total = revoke_manager.prune_expired_events(
+            batch_size=CONF.command.batch_size,
+            batch_delay=CONF.command.batch_delay,
+            progress=progress)
+        print(_('Deleted %d expired revocation events.') % total)
+
+
 class MappingPurge(BaseApp):
     """Purge the mapping table."""
 
@@ -1297,6 +1386,9 @@ CMDS = [
     MappingEngineTester,
     ReceiptRotate,
     ReceiptSetup,
+    RevocationCompact,
+    RevocationExport,
+    RevocationFlush,
     SamlIdentityProviderMetadata,
     TokenRotate,
     TokenSetup,
@@ -11,10 +11,13 @@
 # under the License.
 
 """A dogpile.cache proxy that caches objects in the request local cache."""
+import datetime
+
 from dogpile.cache import api
 from dogpile.cache import proxy
 from oslo_context import context as oslo_context
 from oslo_serialization import msgpackutils
+import six
 
 
 # Register our new handler.
@@ -28,6 +31,99 @@ def _register_model_handler(handler_class):
     _registry.frozen = True
 
 
+# Values of these types can be shared as they are, since they are immutable.
+_IMMUTABLE_TYPES = (six.text_type, six.binary_type, bool, float,
+                    datetime.date, datetime.time, datetime.timedelta,
+                    type(None)) + six.integer_types
+
+
+def _immutable(*args, **kwargs):
+    raise TypeError('Cached values cannot be modified.')
+
+
+class _FrozenDict(dict):
+    """A dictionary that cannot be modified.
+
+    The keys of the values that are themselves frozen containers are kept, so
+    that a regular copy can be made without looking at every value.
+    """
+
+    __slots__ = ('_nested',)
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def _thaw(self):
+        value = dict(self)
+        for k in self._nested:
+            value[k] = self[k]._thaw()
+        return value
+
+
+class _FrozenList(list):
+    """A list that cannot be modified.
+
+    The indexes of the values that are themselves frozen containers are kept,
+    so that a regular copy can be made without looking at every value.
+    """
+
+    __slots__ = ('_nested',)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    __setslice__ = __delslice__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = (
+        _immutable)
+
+    def _thaw(self):
+        value = list(self)
+        for i in self._nested:
+            value[i] = self[i]._thaw()
+        return value
+
+
+_FROZEN_TYPES = (_FrozenDict, _FrozenList)
+
+
+class _NotFreezable(Exception):
+    pass
+
+
+def _freeze(value):
+    """Return an immutable version of a value.
+
+    Dictionaries and lists are copied into frozen containers, anything else
+    must be immutable already.
+
+    :raises _NotFreezable: if the value holds an object that is not known to
+                           be immutable.
+    """
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, dict):
+        frozen = _FrozenDict((k, _freeze(v)) for k, v in value.items())
+        frozen._nested = [k for k, v in frozen.items()
+                          if isinstance(v, _FROZEN_TYPES)]
+        return frozen
+    if isinstance(value, list):
+        frozen = _FrozenList(_freeze(v) for v in value)
+        frozen._nested = [i for i, v in enumerate(frozen)
+                          if isinstance(v, _FROZEN_TYPES)]
+        return frozen
+    if type(value) in (tuple, frozenset):
+        for v in value:
+            if _freeze(v) is not v:
+                raise _NotFreezable()
+        return value
+    raise _NotFreezable()
+
+
+def _thaw(value):
+    """Return a copy of a frozen value that can be modified."""
+    if isinstance(value, _FROZEN_TYPES):
+        return value._thaw()
+    return value
+
+
 class _ResponseCacheProxy(proxy.ProxyBackend):
 
     __key_pfx = '_request_cache_%s'
@@ -40,20 +136,31 @@ class _ResponseCacheProxy(proxy.ProxyBackend):
         return self.__key_pfx % key
 
     def _set_local_cache(self, key, value):
-        # Set a serialized version of the returned value in local cache for
-        # subsequent calls to the memoized method.
+        # Set a frozen version of the returned value in local cache for
+        # subsequent calls to the memoized method. Values that cannot be
+        # frozen, such as models, are serialized instead.
         ctx = self._get_request_context()
-        serialize = {'payload': value.payload, 'metadata': value.metadata}
-        setattr(ctx, self._get_request_key(key), msgpackutils.dumps(serialize))
+        try:
+            local_value = api.CachedValue(payload=_freeze(value.payload),
+                                          metadata=_freeze(value.metadata))
+        except _NotFreezable:
+            serialize = {'payload': value.payload, 'metadata': value.metadata}
+            local_value = msgpackutils.dumps(serialize)
+        setattr(ctx, self._get_request_key(key), local_value)
 
     def _get_local_cache(self, key):
         # Return the version from our local request cache if it exists.
+        # Immutable values are returned as they are, while callers get their
+        # own copy of anything else so that they can't modify the cached one.
         ctx = self._get_request_context()
         try:
             value = getattr(ctx, self._get_request_key(key))
         except AttributeError:
             return api.NO_VALUE
 
+        if isinstance(value, api.CachedValue):
+            return api.CachedValue(payload=_thaw(value.payload),
+                                   metadata=value.metadata)
         value = msgpackutils.loads(value)
         return api.CachedValue(payload=value['payload'],
                                metadata=value['metadata'])
@@ -90,9 +197,12 @@ class _ResponseCacheProxy(proxy.ProxyBackend):
             v = self._get_local_cache(key)
             if v is not api.NO_VALUE:
                 values[key] = v
-        query_keys = set(keys).difference(set(values.keys()))
-        values.update(dict(
-            zip(query_keys, self.proxied.get_multi(query_keys))))
+        query_keys = [k for k in keys if k not in values]
+        if query_keys:
+            for k, v in zip(query_keys, self.proxied.get_multi(query_keys)):
+                if v is not api.NO_VALUE:
+                    self._set_local_cache(k, v)
+                values[k] = v
         return [values[k] for k in keys]
 
     def set_multi(self, mapping):
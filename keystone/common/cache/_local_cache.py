@@ -0,0 +1,145 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""A dogpile.cache proxy that caches objects in process memory."""
+import collections
+import threading
+import time
+
+from dogpile.cache import api
+from dogpile.cache import proxy
+from oslo_log import log
+from oslo_serialization import msgpackutils
+
+
+LOG = log.getLogger(__name__)
+
+
+class _LocalCacheProxy(proxy.ProxyBackend):
+    """Keep the most recently used values of a region in memory.
+
+    Values are kept for at most ``expiration_time`` seconds and at most
+    ``max_size`` of them are kept, evicting the least recently used ones
+    first. Keys reaching the proxy have already been through the region's key
+    mangler, so they include the region id and a value cached before the
+    region was invalidated is never found again; it is eventually evicted.
+
+    """
+
+    def __init__(self, name, max_size, expiration_time, stats_interval=0):
+        super(_LocalCacheProxy, self).__init__()
+        self.name = name
+        self._max_size = max_size
+        self._expiration_time = expiration_time
+        self._stats_interval = stats_interval
+        self._stats_logged_at = time.time()
+        self._lock = threading.Lock()
+        self._values = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'size': len(self._values)}
+
+    def _log_stats(self, now):
+        if (not self._stats_interval or
+                now - self._stats_logged_at < self._stats_interval):
+            return
+        self._stats_logged_at = now
+        LOG.info('In-process cache for region %(name)s: %(hits)d hits, '
+                 '%(misses)d misses, %(evictions)d evictions, %(size)d of '
+                 '%(max_size)d values.',
+                 {'name': self.name, 'hits': self.hits,
+                  'misses': self.misses, 'evictions': self.evictions,
+                  'size': len(self._values), 'max_size': self._max_size})
+
+    def _set_local_cache(self, key, value):
+        # NOTE: Values are kept serialized, like in the request local cache,
+        # so that callers never share the objects they are handed.
+        serialize = {'payload': value.payload, 'metadata': value.metadata}
+        expires_at = time.time() + self._expiration_time
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = (expires_at, msgpackutils.dumps(serialize))
+            while len(self._values) > self._max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def _get_local_cache(self, key):
+        now = time.time()
+        with self._lock:
+            self._log_stats(now)
+            try:
+                expires_at, value = self._values.pop(key)
+            except KeyError:
+                self.misses += 1
+                return api.NO_VALUE
+            if expires_at <= now:
+                self.misses += 1
+                return api.NO_VALUE
+            # Re-insert the value to mark it as the most recently used one.
+            self._values[key] = (expires_at, value)
+            self.hits += 1
+
+        value = msgpackutils.loads(value)
+        return api.CachedValue(payload=value['payload'],
+                               metadata=value['metadata'])
+
+    def _delete_local_cache(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def get(self, key):
+        value = self._get_local_cache(key)
+        if value is api.NO_VALUE:
+            value = self.proxied.get(key)
+            if value is not api.NO_VALUE:
+                self._set_local_cache(key, value)
+        return value
+
+    def set(self, key, value):
+        self._set_local_cache(key, value)
+        self.proxied.set(key, value)
+
+    def delete(self, key):
+        self._delete_local_cache(key)
+        self.proxied.delete(key)
+
+    def get_multi(self, keys):
+        values = {}
+        for key in keys:
+            v = self._get_local_cache(key)
+            if v is not api.NO_VALUE:
+                values[key] = v
+        query_keys = [k for k in keys if k not in values]
+        if query_keys:
+            for k, v in zip(query_keys, self.proxied.get_multi(query_keys)):
+                if v is not api.NO_VALUE:
+                    self._set_local_cache(k, v)
+                values[k] = v
+        return [values[k] for k in keys]
+
+    def set_multi(self, mapping):
+        for k, v in mapping.items():
+            self._set_local_cache(k, v)
+        self.proxied.set_multi(mapping)
+
+    def delete_multi(self, keys):
+        for k in keys:
+            self._delete_local_cache(k)
+        self.proxied.delete_multi(keys)
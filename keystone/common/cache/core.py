@@ -22,6 +22,7 @@ from dogpile.cache import util
 from oslo_cache import core as cache
 
 from keystone.common.cache import _context_cache
+from keystone.common.cache import _local_cache
 import keystone.conf
 
 
@@ -31,14 +32,22 @@ CONF = keystone.conf.CONF
 class RegionInvalidationManager(object):
 
     REGION_KEY_PREFIX = '<<<region>>>:'
+    TAG_KEY_PREFIX = '<<<tag>>>:'
 
     def __init__(self, invalidation_region, region_name):
         self._invalidation_region = invalidation_region
         self._region_key = self.REGION_KEY_PREFIX + region_name
+        self._tag_key_prefix = '%s%s:' % (self.TAG_KEY_PREFIX, region_name)
 
     def _generate_new_id(self):
         return os.urandom(10)
 
+    def _generate_new_ids(self, *keys):
+        return [self._generate_new_id() for key in keys]
+
+    def _get_tag_key(self, tag):
+        return self._tag_key_prefix + tag
+
     @property
     def region_id(self):
         return self._invalidation_region.get_or_create(
@@ -49,6 +58,18 @@ class RegionInvalidationManager(object):
         self._invalidation_region.set(self._region_key, new_region_id)
         return new_region_id
 
+    def get_tag_ids(self, tags):
+        tags = list(tags)
+        tag_ids = self._invalidation_region.get_or_create_multi(
+            [self._get_tag_key(tag) for tag in tags], self._generate_new_ids,
+            expiration_time=-1)
+        return dict(zip(tags, tag_ids))
+
+    def invalidate_tags(self, tags):
+        self._invalidation_region.set_multi(
+            dict((self._get_tag_key(tag), self._generate_new_id())
+                 for tag in tags))
+
     def is_region_key(self, key):
         return key == self._region_key
 
@@ -58,6 +79,16 @@ class DistributedInvalidationStrategy(region.RegionInvalidationStrategy):
     def __init__(self, region_manager):
         self._region_manager = region_manager
 
+    @property
+    def region_id(self):
+        return self._region_manager.region_id
+
+    def get_tag_ids(self, tags):
+        return self._region_manager.get_tag_ids(tags)
+
+    def invalidate_tags(self, tags):
+        self._region_manager.invalidate_tags(tags)
+
     def invalidate(self, hard=None):
         self._region_manager.invalidate_region()
 
@@ -113,8 +144,21 @@ CACHE_INVALIDATION_REGION = create_region(name='invalidation region')
 
 register_model_handler = _context_cache._register_model_handler
 
+# The in-process caches in use, by region name.
+_LOCAL_CACHES = {}
+
 
-def configure_cache(region=None):
+def _wants_local_cache(region):
+    if not CONF.local_cache.enabled:
+        return False
+    regions = CONF.local_cache.regions
+    return not regions or region.name in regions
+
+
+def configure_cache(region=None, local_caches=True):
+    # NOTE: Regions holding values which are updated concurrently, such as
+    # counters, pass local_caches=False so that they are always read from the
+    # cache backend rather than from a request local or in-process copy.
     if region is None:
         region = CACHE_REGION
     # NOTE(morganfainberg): running cache.configure_cache_region()
@@ -125,7 +169,17 @@ def configure_cache(region=None):
     # Only wrap the region if it was not configured. This should be pushed
     # to oslo_cache lib somehow.
     if not configured:
-        region.wrap(_context_cache._ResponseCacheProxy)
+        # NOTE: The last proxy wrapped is the first one consulted, so the
+        # request local cache is checked before the in-process one.
+        if local_caches and _wants_local_cache(region):
+            local_cache = _local_cache._LocalCacheProxy(
+                region.name, CONF.local_cache.max_size,
+                CONF.local_cache.expiration_time,
+                stats_interval=CONF.local_cache.stats_interval)
+            region.wrap(local_cache)
+            _LOCAL_CACHES[region.name] = local_cache
+        if local_caches:
+            region.wrap(_context_cache._ResponseCacheProxy)
 
         region_manager = RegionInvalidationManager(
             CACHE_INVALIDATION_REGION, region.name)
@@ -135,6 +189,71 @@ def configure_cache(region=None):
             region_manager)
 
 
+def get_region_id(region):
+    """Return the current invalidation id of a region.
+
+    The id changes every time the region is invalidated, so it can be stored
+    alongside values derived from the region's contents and compared later to
+    tell whether those values are still current.
+
+    :param region: a region configured with :func:`configure_cache`
+    :returns: the region id, or None if the region does not use distributed
+              invalidation
+
+    """
+    return getattr(region.region_invalidator, 'region_id', None)
+
+
+def get_local_cache_stats():
+    """Return the counters of the in-process caches.
+
+    :returns: a dictionary mapping region names to dictionaries with the
+              ``hits``, ``misses`` and ``evictions`` of their in-process
+              cache and the number of values it currently holds (``size``)
+
+    """
+    return dict((name, local_cache.stats)
+                for name, local_cache in _LOCAL_CACHES.items())
+
+
+def get_tag_ids(region, tags):
+    """Return the current invalidation ids of a set of tags in a region.
+
+    Tags let a region be invalidated in parts: values cached in the region
+    are stored along with the ids of the tags describing them, and are only
+    used while those ids are still the current ones. Like region ids, tag ids
+    are kept in the invalidation region so that every process sharing the
+    cache sees the same ones.
+
+    :param region: a region configured with :func:`configure_cache`
+    :param tags: an iterable of strings
+    :returns: a dictionary mapping each tag to its current id, or None if the
+              region does not use distributed invalidation
+
+    """
+    strategy = region.region_invalidator
+    if not isinstance(strategy, DistributedInvalidationStrategy):
+        return None
+    return strategy.get_tag_ids(tags)
+
+
+def invalidate_tags(region, tags):
+    """Invalidate the values of a region stored with any of the given tags.
+
+    If the region does not use distributed invalidation the whole region is
+    invalidated instead.
+
+    :param region: a region configured with :func:`configure_cache`
+    :param tags: an iterable of strings
+
+    """
+    strategy = region.region_invalidator
+    if not isinstance(strategy, DistributedInvalidationStrategy):
+        region.invalidate()
+        return
+    strategy.invalidate_tags(tags)
+
+
 def _sha1_mangle_key(key):
     """Wrapper for dogpile's sha1_mangle_key.
 
@@ -38,7 +38,8 @@ def truncated(f):
                 _('Cannot truncate a driver call without hints list as '
                   'first parameter after self '))
 
-        if hints.limit is None or hints.filters:
+        if (hints.limit is None or hints.filters or
+                hints.marker is not None or hints.stream):
             return f(self, hints, *args, **kwargs)
 
         # A limit is set, so ask for one more entry than we need
@@ -74,6 +75,17 @@ class Hints(object):
     accessed publicly. Also it contains a dict called limit, which will
     indicate the amount of data we want to limit our listing to.
 
+    A Hint object may also contain a dict called marker, which indicates that
+    the entities should be listed in ID order, starting after the ID of the
+    last entity of the previous page. A driver which does order the entities
+    and skip those up to the marker must set its ``ordered`` key.
+
+    If `stream` is set, the caller can consume an iterator, so a driver may
+    return one which reads the entities in batches rather than a list. Such a
+    driver must still remove the filters it satisfies before returning, but
+    may only set the ``truncated`` key of the limit once the iterator is
+    exhausted.
+
     If the filter is discovered to never match, then `cannot_match` can be set
     to indicate that there will not be any matches and the backend work can be
     short-circuited.
@@ -91,6 +103,8 @@ class Hints(object):
 
     def __init__(self):
         self.limit = None
+        self.marker = None
+        self.stream = False
         self.filters = list()
         self.cannot_match = False
 
@@ -110,3 +124,17 @@ class Hints(object):
     def set_limit(self, limit, truncated=False):
         """Set a limit to indicate the list should be truncated."""
         self.limit = {'limit': limit, 'truncated': truncated}
+
+    def cap_limit(self, limit):
+        """Set a limit unless a lower one was already set."""
+        if self.limit is None or self.limit['limit'] > limit:
+            self.set_limit(limit)
+
+    def set_marker(self, marker, ordered=False):
+        """Set a marker to indicate the list should be paginated.
+
+        :param marker: the ID of the last entity of the previous page, or None
+                       for the first page
+
+        """
+        self.marker = {'marker': marker, 'ordered': ordered}
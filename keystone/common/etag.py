@@ -0,0 +1,91 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Version the collections whose listings are served with ETags."""
+
+import hashlib
+
+from keystone.common import cache
+import keystone.conf
+from keystone import notifications
+
+
+CONF = keystone.conf.CONF
+
+# The resource types whose collections are versioned.
+VERSIONED_RESOURCE_TYPES = ('domain', 'endpoint', 'region', 'role',
+                            'service')
+
+# NOTE: The versions are kept alongside the region and tag ids in the
+# invalidation region, so every keystone process sharing the cache sees the
+# same ones and none of them is ever expired.
+_VERSIONS = cache.RegionInvalidationManager(
+    cache.CACHE_INVALIDATION_REGION, 'collection versions')
+
+
+def get_versions(resource_types):
+    """Return the current versions of collections.
+
+    :param resource_types: an iterable of resource types from
+                           ``VERSIONED_RESOURCE_TYPES``
+    :returns: a list of opaque values, in the order of ``resource_types``, or
+              None if the collections are not versioned because caching is
+              disabled
+
+    """
+    if not CONF.cache.enabled:
+        return None
+    resource_types = list(resource_types)
+    versions = _VERSIONS.get_tag_ids(resource_types)
+    return [versions[resource_type] for resource_type in resource_types]
+
+
+def bump_version(resource_type):
+    """Give a collection a new version."""
+    _VERSIONS.invalidate_tags([resource_type])
+
+
+def compute_etag(versions, *keys):
+    """Compute a strong ETag.
+
+    :param versions: the versions of the collections a response was built
+                     from, as returned by :func:`get_versions`
+    :param keys: anything else the response depends on
+    :returns: the ETag, without quotes
+
+    """
+    return hashlib.sha256(repr((versions,) + keys).encode('utf-8')
+                          ).hexdigest()
+
+
+@notifications.listener
+class VersionTracker(object):
+    """Bump the version of a collection whenever one of its members changes.
+
+    Listings read the versions before the collections and versions are
+    bumped after the changes are written, so a stale listing can only be
+    revalidated while a change is being made.
+
+    """
+
+    def __init__(self):
+        callbacks = dict((resource_type, self._bump_version)
+                         for resource_type in VERSIONED_RESOURCE_TYPES)
+        self.event_callbacks = dict(
+            (action, callbacks)
+            for action in (notifications.ACTIONS.created,
+                           notifications.ACTIONS.updated,
+                           notifications.ACTIONS.disabled,
+                           notifications.ACTIONS.deleted))
+
+    def _bump_version(self, service, resource_type, operation, payload):
+        bump_version(resource_type)
@@ -13,12 +13,15 @@
 import base64
 import os
 import stat
+import threading
+import time
 
 from cryptography import fernet
 from oslo_log import log
 
 from keystone.common import utils
 import keystone.conf
+from keystone import exception
 
 
 LOG = log.getLogger(__name__)
@@ -33,6 +36,36 @@ CONF = keystone.conf.CONF
 # upgrades.
 NULL_KEY = base64.urlsafe_b64encode(b'\x00' * 32)
 
+# Some filesystems only update directory timestamps with a
+# granularity of a few milliseconds (or a full second). A change made within
+# this window of loading the keys could go unnoticed by comparing stamps, so
+# key rings keep reloading until the key repository has been quiet for longer
+# than this many seconds.
+RACY_STAMP_WINDOW = 2.0
+
+_KEY_RINGS = {}
+_KEY_RINGS_LOCK = threading.Lock()
+
+
+def get_stamp(path):
+    """Return a stamp of a file or directory, which changes when it does.
+
+    :param path: the file or directory to stamp
+    :returns: a tuple of its inode and its modification time, in
+              nanoseconds, or None if it doesn't exist
+
+    """
+    try:
+        stat_info = os.stat(path)
+    except OSError:
+        return None
+    # NOTE: Python 2 doesn't have st_mtime_ns, fall back to the less precise
+    # floating point modification time.
+    mtime_ns = getattr(stat_info, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat_info.st_mtime * 1e9)
+    return (stat_info.st_ino, mtime_ns)
+
 
 class FernetUtils(object):
 
@@ -146,6 +179,7 @@ class FernetUtils(object):
         valid_key_file = os.path.join(self.key_repository, '0')
 
         os.rename(tmp_key_file, valid_key_file)
+        reset_key_rings(self.key_repository)
 
         LOG.info('Become a valid new key: %s', valid_key_file)
 
@@ -254,6 +288,8 @@ class FernetUtils(object):
             LOG.info('Excess key to purge: %s', key_to_purge)
             os.remove(key_to_purge)
 
+        reset_key_rings(self.key_repository)
+
     def load_keys(self, use_null_key=False):
         """Load keys from disk into a list.
 
@@ -295,3 +331,131 @@ class FernetUtils(object):
             key_list.append(NULL_KEY)
 
         return key_list
+
+
+class KeyRing(object):
+    """A per-process cache of the Fernet keys found in a key repository.
+
+    Loading keys from disk requires listing the key repository and reading
+    every key file in it, which is far too expensive to do for every token
+    that is issued or validated. A key ring loads the keys once and hands out
+    the same ``MultiFernet`` instance until the key repository changes.
+
+    Changes are detected by comparing a stamp of the key repository directory
+    (its inode and modification time) with the stamp taken when the keys were
+    loaded. Key rotation and key distribution tools replace key files by
+    renaming them into place, which always updates the directory. Rotations
+    performed by this process also reset the key ring explicitly.
+
+    """
+
+    def __init__(self, key_repository, max_active_keys=None,
+                 config_group=None):
+        self.key_repository = key_repository
+        self.max_active_keys = max_active_keys
+        self.config_group = config_group
+
+        self._lock = threading.Lock()
+        self._crypto = None
+        self._stamp = None
+        self._loaded_at = None
+
+        # counters to help operators understand how often keys are reloaded
+        self.hits = 0
+        self.reloads = 0
+
+    def _get_stamp(self):
+        return get_stamp(self.key_repository)
+
+    def _get_current(self, stamp):
+        crypto, loaded_stamp, loaded_at = (
+            self._crypto, self._stamp, self._loaded_at)
+        if crypto is None or stamp is None or stamp != loaded_stamp:
+            return None
+        # if the key repository was modified right before the keys were
+        # loaded, the stamp can't be trusted to reflect later changes
+        if stamp[1] / 1e9 >= loaded_at - RACY_STAMP_WINDOW:
+            return None
+        return crypto
+
+    def reset(self):
+        """Drop the cached keys so that they are reloaded on next use."""
+        with self._lock:
+            self._crypto, self._stamp, self._loaded_at = None, None, None
+
+    @property
+    def crypto(self):
+        """Return a ``MultiFernet`` instance built from the current keys.
+
+        :raises keystone.exception.KeysNotFound: If the key repository does
+            not contain any keys.
+
+        """
+        stamp = self._get_stamp()
+        crypto = self._get_current(stamp)
+        if crypto is not None:
+            self.hits += 1
+            return crypto
+
+        with self._lock:
+            # another thread might have reloaded the keys while we waited
+            crypto = self._get_current(stamp)
+            if crypto is not None:
+                self.hits += 1
+                return crypto
+
+            loaded_at = time.time()
+            fernet_utils = FernetUtils(
+                self.key_repository, self.max_active_keys, self.config_group
+            )
+            keys = fernet_utils.load_keys()
+            if not keys:
+                # don't cache an empty key repository, it could be set up
+                # at any time
+                self._crypto = None
+                raise exception.KeysNotFound()
+
+            crypto = fernet.MultiFernet([fernet.Fernet(key) for key in keys])
+            self._crypto, self._stamp, self._loaded_at = (
+                crypto, stamp, loaded_at)
+            self.reloads += 1
+            LOG.debug('Loaded %(count)d keys from %(dir)s into the '
+                      '[%(group)s] key ring (reloads: %(reloads)d).', {
+                          'count': len(keys),
+                          'dir': self.key_repository,
+                          'group': self.config_group,
+                          'reloads': self.reloads})
+            return crypto
+
+
+def get_key_ring(key_repository, max_active_keys=None, config_group=None):
+    """Return the process-wide key ring for a key repository.
+
+    :param key_repository: Path to the key repository.
+    :param max_active_keys: Number of keys expected in the key repository.
+    :param config_group: Configuration group the key repository belongs to.
+    :returns: A :class:`KeyRing` shared by every caller in this process.
+
+    """
+    ring_id = (key_repository, config_group)
+    key_ring = _KEY_RINGS.get(ring_id)
+    if key_ring is None:
+        with _KEY_RINGS_LOCK:
+            key_ring = _KEY_RINGS.setdefault(
+                ring_id,
+                KeyRing(key_repository, max_active_keys, config_group)
+            )
+    key_ring.max_active_keys = max_active_keys
+    return key_ring
+
+
+def reset_key_rings(key_repository=None):
+    """Force key rings to reload their keys on next use.
+
+    :param key_repository: Only reset key rings for this key repository. If
+                           not provided, every key ring is reset.
+
+    """
+    for (repository, _group), key_ring in list(_KEY_RINGS.items()):
+        if key_repository is None or repository == key_repository:
+            key_ring.reset()
@@ -10,9 +10,24 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import hashlib
+import os
+import threading
+import time
+
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives import serialization
+from oslo_log import log
+
+from keystone.common import fernet_utils
+
+
+LOG = log.getLogger(__name__)
+
+_KEY_CACHES = {}
+_KEY_CACHES_LOCK = threading.Lock()
 
 
 def create_jws_keypair(private_key_path, public_key_path):
@@ -41,3 +56,190 @@ def create_jws_keypair(private_key_path, public_key_path):
                 format=serialization.PublicFormat.SubjectPublicKeyInfo
             )
         )
+
+    # keys written by this process are picked up right away, regardless of
+    # the granularity of file timestamps
+    reset_key_caches(private_key_path)
+    reset_key_caches(os.path.dirname(public_key_path))
+
+
+def get_key_id(public_key):
+    """Return the key ID of a public key.
+
+    The key ID is the SHA-256 fingerprint of the DER encoded
+    SubjectPublicKeyInfo of the key, encoded using unpadded URL-safe base64.
+    It only depends on the key itself, so every keystone server computes the
+    same one for the same key, regardless of the name of its file.
+
+    :param public_key: a public key object
+    :returns: the key ID, as a string
+
+    """
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    digest = hashlib.sha256(der).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def _load_private_key(path):
+    with open(path, 'rb') as f:
+        private_key = serialization.load_pem_private_key(
+            f.read(), password=None, backend=default_backend()
+        )
+    return get_key_id(private_key.public_key()), private_key
+
+
+def _load_public_keys(path):
+    keys = {}
+    for keyfile in os.listdir(path):
+        keyfile_path = os.path.join(path, keyfile)
+        try:
+            with open(keyfile_path, 'rb') as f:
+                public_key = serialization.load_pem_public_key(
+                    f.read(), backend=default_backend()
+                )
+        except (IOError, ValueError):
+            LOG.warning('Ignoring %s, it is not a readable PEM encoded '
+                        'public key.', keyfile_path)
+            continue
+        keys[get_key_id(public_key)] = public_key
+    return keys
+
+
+class KeyCache(object):
+    """A per-process cache of the JWS keys parsed from a file or directory.
+
+    Parsing PEM encoded keys is far too expensive to do for every token that
+    is issued or validated, so a key cache parses them once and hands out the
+    same key objects until the file or directory they were loaded from
+    changes.
+
+    Changes are detected the same way a Fernet
+    :class:`keystone.common.fernet_utils.KeyRing` detects them, by comparing a
+    stamp of the file or directory (its inode and modification time) with the
+    stamp taken when the keys were loaded. The keys of a directory are
+    stamped on the directory and on each of its files, so that a public key
+    rewritten in place is picked up as well as one added or renamed into the
+    public key repository. The private key is stamped on its own file because
+    ``keystone-manage create_jws_keypair --force`` rewrites it in place.
+
+    """
+
+    def __init__(self, path, load, directory=False):
+        self.path = path
+        self._load = load
+        self._directory = directory
+
+        self._lock = threading.Lock()
+        self._keys = None
+        self._stamp = None
+        self._loaded_at = None
+
+        # counters to help operators understand how often keys are reloaded
+        self.hits = 0
+        self.reloads = 0
+
+    def _get_stamp(self):
+        stamp = fernet_utils.get_stamp(self.path)
+        if stamp is None:
+            return None
+        stamps = [stamp]
+        if self._directory:
+            try:
+                filenames = sorted(os.listdir(self.path))
+            except OSError:
+                return None
+            stamps.extend(
+                fernet_utils.get_stamp(os.path.join(self.path, filename))
+                for filename in filenames)
+        return tuple(stamps)
+
+    def _get_current(self, stamp):
+        keys, loaded_stamp, loaded_at = (
+            self._keys, self._stamp, self._loaded_at)
+        if keys is None or stamp is None or stamp != loaded_stamp:
+            return None
+        # if the keys were modified right before they were loaded, the stamp
+        # can't be trusted to reflect later changes
+        modified_at = max(file_stamp[1] for file_stamp in stamp
+                          if file_stamp is not None)
+        if modified_at / 1e9 >= loaded_at - fernet_utils.RACY_STAMP_WINDOW:
+            return None
+        return keys
+
+    def reset(self):
+        """Drop the cached keys so that they are reloaded on next use."""
+        with self._lock:
+            self._keys, self._stamp, self._loaded_at = None, None, None
+
+    @property
+    def keys(self):
+        """Return the keys parsed from the current file or directory."""
+        stamp = self._get_stamp()
+        keys = self._get_current(stamp)
+        if keys is not None:
+            self.hits += 1
+            return keys
+
+        with self._lock:
+            # another thread might have reloaded the keys while we waited
+            keys = self._get_current(stamp)
+            if keys is not None:
+                self.hits += 1
+                return keys
+
+            loaded_at = time.time()
+            keys = self._load(self.path)
+            self._keys, self._stamp, self._loaded_at = (
+                keys, stamp, loaded_at)
+            self.reloads += 1
+            LOG.debug('Loaded JWS keys from %(path)s (reloads: '
+                      '%(reloads)d).', {'path': self.path,
+                                        'reloads': self.reloads})
+            return keys
+
+
+def _get_key_cache(path, load, directory=False):
+    key_cache = _KEY_CACHES.get(path)
+    if key_cache is None:
+        with _KEY_CACHES_LOCK:
+            key_cache = _KEY_CACHES.setdefault(
+                path, KeyCache(path, load, directory=directory))
+    return key_cache
+
+
+def get_private_key_cache(private_key_path):
+    """Return the process-wide cache of a private key.
+
+    :param private_key_path: Path to the PEM encoded private key.
+    :returns: A :class:`KeyCache` whose keys are a ``(key_id, private_key)``
+              tuple.
+
+    """
+    return _get_key_cache(private_key_path, _load_private_key)
+
+
+def get_public_key_cache(public_key_repository):
+    """Return the process-wide cache of the keys in a public key repository.
+
+    :param public_key_repository: Path to the public key repository.
+    :returns: A :class:`KeyCache` whose keys are a dictionary of public keys
+              by key ID.
+
+    """
+    return _get_key_cache(public_key_repository, _load_public_keys,
+                          directory=True)
+
+
+def reset_key_caches(path=None):
+    """Force key caches to reload their keys on next use.
+
+    :param path: Only reset the key cache of this file or directory. If not
+                 provided, every key cache is reset.
+
+    """
+    for key_path, key_cache in list(_KEY_CACHES.items()):
+        if path is None or key_path == path:
+            key_cache.reset()
@@ -64,7 +64,7 @@ def response_truncated(f):
 
         list_limit = self.driver._get_list_limit()
         if list_limit:
-            kwargs['hints'].set_limit(list_limit)
+            kwargs['hints'].cap_limit(list_limit)
         return f(self, *args, **kwargs)
     return wrapper
 
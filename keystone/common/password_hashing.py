@@ -13,9 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import itertools
+import threading
 
+import futurist
+from futurist import waiters
 from oslo_log import log
+from oslo_utils import timeutils
 import passlib.hash
 
 import keystone.conf
@@ -56,6 +61,123 @@ def _get_hasher_from_ident(hashed):
             hashed[0:hashed.index('$', 1) + 1])
 
 
+class _HashingExecutor(object):
+    """A bounded pool of workers hashing and checking passwords."""
+
+    def __init__(self, worker_type, workers, queue_size):
+        self.options = (worker_type, workers, queue_size)
+        self.workers = workers
+        if worker_type == 'process':
+            self._executor = futurist.ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = futurist.ThreadPoolExecutor(max_workers=workers)
+        # Operations being processed by a worker count towards the backlog
+        # too, so the queue is full when it exceeds the number of workers.
+        self._max_backlog = workers + queue_size if queue_size else None
+        self._lock = threading.Lock()
+        self.backlog = 0
+        self.rejected = 0
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._max_backlog and self.backlog >= self._max_backlog:
+                self.rejected += 1
+                raise exception.PasswordHashingQueueFull()
+            self.backlog += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future=None):
+        with self._lock:
+            self.backlog -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+_STATISTICS = {}
+_STATISTICS_LOCK = threading.Lock()
+
+
+def _get_executor():
+    """Return the executor configured for password hashing, if any."""
+    global _EXECUTOR
+
+    workers = CONF.identity.password_hash_workers
+    if not workers:
+        return None
+    options = (CONF.identity.password_hash_worker_type, workers,
+               CONF.identity.password_hash_queue_size)
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or _EXECUTOR.options != options:
+            if _EXECUTOR is not None:
+                _EXECUTOR.shutdown()
+            _EXECUTOR = _HashingExecutor(*options)
+        return _EXECUTOR
+
+
+def _timed(func, *args):
+    # NOTE: This runs in the workers, so the time spent waiting for one is
+    # not included.
+    watch = timeutils.StopWatch().start()
+    result = func(*args)
+    return result, watch.elapsed()
+
+
+def _record_statistics(algorithm, hash_time, queue_time):
+    with _STATISTICS_LOCK:
+        stats = _STATISTICS.setdefault(algorithm, {
+            'count': 0, 'time': 0, 'max_time': 0,
+            'queue_time': 0, 'max_queue_time': 0})
+        stats['count'] += 1
+        stats['time'] += hash_time
+        stats['max_time'] = max(stats['max_time'], hash_time)
+        stats['queue_time'] += queue_time
+        stats['max_queue_time'] = max(stats['max_queue_time'], queue_time)
+
+
+def _run(algorithm, func, *args):
+    watch = timeutils.StopWatch().start()
+    executor = _get_executor()
+    if executor is None:
+        result, hash_time = _timed(func, *args)
+    else:
+        result, hash_time = executor.submit(_timed, func, *args).result()
+    _record_statistics(algorithm, hash_time,
+                       max(watch.elapsed() - hash_time, 0))
+    return result
+
+
+def get_statistics():
+    """Return the counters of the passwords hashed and checked.
+
+    :returns: a dictionary with the number of passwords being hashed or
+              waiting for a worker (``backlog``), the number of passwords
+              rejected because too many were waiting (``rejected``), and the
+              counters of each hashing algorithm (``algorithms``): the number
+              of passwords it hashed or checked (``count``), and the total and
+              maximum number of seconds spent hashing them (``time`` and
+              ``max_time``) and waiting for a worker (``queue_time`` and
+              ``max_queue_time``)
+
+    """
+    with _EXECUTOR_LOCK:
+        executor = _EXECUTOR
+    with _STATISTICS_LOCK:
+        algorithms = dict((algorithm, dict(stats))
+                          for algorithm, stats in _STATISTICS.items())
+    return {'backlog': executor.backlog if executor else 0,
+            'rejected': executor.rejected if executor else 0,
+            'algorithms': algorithms}
+
+
 def verify_length_and_trunc_password(password):
     """Verify and truncate the provided password to the max_password_length."""
     max_length = CONF.identity.max_password_length
@@ -84,7 +206,51 @@ def check_password(password, hashed):
         return False
     password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
     hasher = _get_hasher_from_ident(hashed)
-    return hasher.verify(password_utf8, hashed)
+    return _run(hasher.name, _verify, password_utf8, hashed)
+
+
+def check_any_password(password, hashes):
+    """Check whether a plaintext password matches any of several hashes.
+
+    When passwords are hashed by a pool of workers, the hashes are checked
+    concurrently, one per worker at most, and the checks still waiting for a
+    worker are cancelled as soon as one of the hashes matches.
+
+    """
+    hashes = [hashed for hashed in hashes if hashed is not None]
+    executor = _get_executor()
+    if password is None or executor is None or len(hashes) < 2:
+        return any(check_password(password, hashed) for hashed in hashes)
+
+    password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
+    hashes = collections.deque(hashes)
+    running = {}
+    try:
+        while hashes or running:
+            while hashes and len(running) < executor.workers:
+                hashed = hashes.popleft()
+                hasher = _get_hasher_from_ident(hashed)
+                future = executor.submit(_timed, _verify, password_utf8,
+                                         hashed)
+                running[future] = (hasher.name,
+                                   timeutils.StopWatch().start())
+
+            done, _ = waiters.wait_for_any(list(running))
+            for future in done:
+                algorithm, watch = running.pop(future)
+                result, hash_time = future.result()
+                _record_statistics(algorithm, hash_time,
+                                   max(watch.elapsed() - hash_time, 0))
+                if result:
+                    return True
+        return False
+    finally:
+        for future in running:
+            future.cancel()
+
+
+def _verify(password_utf8, hashed):
+    return _get_hasher_from_ident(hashed).verify(password_utf8, hashed)
 
 
 def hash_user_password(user):
@@ -127,4 +293,8 @@ def hash_password(password):
         if CONF.identity.salt_bytesize:
             params['salt_size'] = CONF.identity.salt_bytesize
 
-    return hasher.using(**params).hash(password_utf8)
+    return _run(hasher.name, _hash, hasher.name, params, password_utf8)
+
+
+def _hash(hasher_name, params, password_utf8):
+    return _HASHER_NAME_MAP[hasher_name].using(**params).hash(password_utf8)
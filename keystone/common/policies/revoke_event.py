@@ -25,7 +25,14 @@ revoke_event_policies = [
         scope_types=['system'],
         description='List revocation events.',
         operations=[{'path': '/v3/OS-REVOKE/events',
-                     'method': 'GET'}])
+                     'method': 'GET'}]),
+    policy.DocumentedRuleDefault(
+        name=base.IDENTITY % 'create_revoke_events',
+        check_str=base.SYSTEM_ADMIN,
+        scope_types=['system'],
+        description='Revoke the tokens matching several revocation events.',
+        operations=[{'path': '/v3/OS-REVOKE/events',
+                     'method': 'POST'}])
 ]
 
 
@@ -45,6 +45,15 @@ token_policies = [
         description='Validate a token.',
         operations=[{'path': '/v3/auth/tokens',
                      'method': 'GET'}]),
+    policy.DocumentedRuleDefault(
+        name=base.IDENTITY % 'validate_tokens',
+        check_str=base.RULE_SERVICE_OR_ADMIN,
+        # Unlike validating a single token, there is no single token
+        # subject to compare against, so only services and administrators are
+        # allowed to validate tokens in bulk.
+        description='Validate several tokens with a single request.',
+        operations=[{'path': '/v3/auth/tokens/validate',
+                     'method': 'POST'}]),
     policy.DocumentedRuleDefault(
         name=base.IDENTITY % 'revoke_token',
         check_str=base.RULE_ADMIN_OR_TOKEN_SUBJECT,
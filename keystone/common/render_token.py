@@ -18,7 +18,19 @@ CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
 
-def render_token_response_from_model(token, include_catalog=True):
+def render_token_response_from_model(token, include_catalog=True,
+                                     shared=None):
+    """Render a token model into a token response.
+
+    :param token: a ``keystone.models.token_model.TokenModel`` to render
+    :param include_catalog: whether or not to include the service catalog
+    :param shared: an optional dictionary used to share catalogs and service
+                   providers between tokens rendered for the same request
+    :returns: a dictionary representing the token response
+
+    """
+    if shared is None:
+        shared = {}
     token_reference = {
         'token': {
             'methods': token.methods,
@@ -103,11 +115,14 @@ def render_token_response_from_model(token, include_catalog=True):
         user_id = token.user_id
         if token.trust_id:
             user_id = token.trust['trustor_user_id']
-        catalog = PROVIDERS.catalog_api.get_v3_catalog(
-            user_id, token.project_id
-        )
-        token_reference['token']['catalog'] = catalog
-    sps = PROVIDERS.federation_api.get_enabled_service_providers()
+        catalog_key = ('catalog', user_id, token.project_id)
+        if catalog_key not in shared:
+            shared[catalog_key] = token.catalog
+        token_reference['token']['catalog'] = shared[catalog_key]
+    if 'service_providers' not in shared:
+        shared['service_providers'] = (
+            PROVIDERS.federation_api.get_enabled_service_providers())
+    sps = shared['service_providers']
     if sps:
         token_reference['token']['service_providers'] = sps
     if token.is_federated:
@@ -0,0 +1,33 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from keystone.common.sql import upgrades
+
+
+def upgrade(migrate_engine):
+    # drop triggers
+    if upgrades.USE_TRIGGERS:
+        if migrate_engine.name == 'postgresql':
+            drop_project_insert_trigger = (
+                'DROP TRIGGER project_after_insert_trigger on project;')
+        elif migrate_engine.name == 'mysql':
+            drop_project_insert_trigger = (
+                'DROP TRIGGER project_after_insert_trigger;')
+        else:
+            drop_project_insert_trigger = (
+                'DROP TRIGGER IF EXISTS project_after_insert_trigger;')
+        migrate_engine.execute(drop_project_insert_trigger)
+
+    # NOTE: The insert trigger only covers projects created by nodes still
+    # running the previous release, so bring the table in line with the
+    # hierarchy again in case the project table was written to otherwise.
+    upgrades.sync_project_closure(migrate_engine)
@@ -20,6 +20,7 @@ CONF() because it sets up configuration options.
 """
 import datetime
 import functools
+import re
 import pytz
 
 from oslo_db import exception as db_exception
@@ -33,6 +34,7 @@ from osprofiler import opts as profiler
 import osprofiler.sqlalchemy
 import six
 import sqlalchemy as sql
+from sqlalchemy.ext import compiler as sql_compiler
 from sqlalchemy.ext import declarative
 from sqlalchemy.orm.attributes import flag_modified, InstrumentedAttribute
 from sqlalchemy import types as sql_types
@@ -350,6 +352,95 @@ class _WontMatch(Exception):
         # Otherwise the value could match a value in the column.
 
 
+# The character escaping the wildcards of LIKE patterns.
+_LIKE_ESCAPE = '!'
+
+
+def _add_wildcards(comparator, value, wildcard):
+    if comparator in ('contains', 'endswith'):
+        value = wildcard + value
+    if comparator in ('contains', 'startswith'):
+        value = value + wildcard
+    return value
+
+
+def _like_pattern(comparator, value):
+    """Build a LIKE pattern matching the value as an inexact filter."""
+    value = re.sub(r'([%_!])', r'!\1', value)
+    return _add_wildcards(comparator, value, '%')
+
+
+def _glob_pattern(comparator, value):
+    """Build a GLOB pattern matching the value as an inexact filter."""
+    value = re.sub(r'([\[*?])', r'[\1]', value)
+    return _add_wildcards(comparator, value, '*')
+
+
+class _CaseSensitiveLike(sql.sql.expression.ColumnElement):
+    """A case sensitive inexact match, whatever the database.
+
+    LIKE is case insensitive with the default MySQL collations, and with
+    SQLite for ASCII characters, so the bytes of the column are compared with
+    MySQL and GLOB is used with SQLite.
+
+    """
+
+    type = sql.Boolean()
+    _is_implicitly_boolean = True
+
+    def __init__(self, column, comparator, value):
+        self.column = column.__clause_element__()
+        self.comparator = comparator
+        self.value = value
+
+    @property
+    def _from_objects(self):
+        return self.column._from_objects
+
+
+@sql_compiler.compiles(_CaseSensitiveLike)
+def _compile_case_sensitive_like(element, compiler, **kw):
+    pattern = _like_pattern(element.comparator, element.value)
+    return compiler.process(
+        element.column.like(pattern, escape=_LIKE_ESCAPE), **kw)
+
+
+@sql_compiler.compiles(_CaseSensitiveLike, 'mysql')
+def _compile_case_sensitive_like_mysql(element, compiler, **kw):
+    pattern = _like_pattern(element.comparator, element.value)
+    return "CAST(%s AS BINARY) LIKE %s ESCAPE '%s'" % (
+        compiler.process(element.column, **kw),
+        compiler.process(sql.literal(pattern), **kw), _LIKE_ESCAPE)
+
+
+@sql_compiler.compiles(_CaseSensitiveLike, 'sqlite')
+def _compile_case_sensitive_like_sqlite(element, compiler, **kw):
+    pattern = _glob_pattern(element.comparator, element.value)
+    return compiler.process(element.column.op('GLOB')(pattern), **kw)
+
+
+def _list_value_attribute(attr):
+    """Return the attribute holding the values of a list-valued attribute.
+
+    List-valued attributes, like the remote IDs of an identity provider, are
+    relationships to a table with a row per value.
+
+    :param attr: the model attribute in question
+    :returns: the attribute of the related model holding the values, or None
+              if the attribute is not list-valued
+
+    """
+    prop = getattr(attr, 'property', None)
+    if not isinstance(prop, sql.orm.RelationshipProperty):
+        return None
+    join_columns = set(remote for local, remote in prop.local_remote_pairs)
+    value_attrs = [column_attr for column_attr in prop.mapper.column_attrs
+                   if not join_columns.intersection(column_attr.columns)]
+    if len(value_attrs) != 1:
+        return None
+    return getattr(prop.mapper.class_, value_attrs[0].key)
+
+
 def _filter(model, query, hints):
     """Apply filtering to a query.
 
@@ -376,29 +467,21 @@ def _filter(model, query, hints):
         """
         column_attr = getattr(model, filter_['name'])
 
-        # TODO(henry-nash): Sqlalchemy 0.7 defaults to case insensitivity
-        # so once we find a way of changing that (maybe on a call-by-call
-        # basis), we can add support for the case sensitive versions of
-        # the filters below.  For now, these case sensitive versions will
-        # be handled at the controller level.
-
-        if filter_['case_sensitive']:
-            return query
-
-        if filter_['comparator'] == 'contains':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%%%s%%' % filter_['value'])
-        elif filter_['comparator'] == 'startswith':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%s%%' % filter_['value'])
-        elif filter_['comparator'] == 'endswith':
-            _WontMatch.check(filter_['value'], column_attr)
-            query_term = column_attr.ilike('%%%s' % filter_['value'])
-        else:
+        if filter_['comparator'] not in ('contains', 'startswith',
+                                         'endswith'):
             # It's a filter we don't understand, so let the caller
             # work out if they need to do something with it.
             return query
 
+        _WontMatch.check(filter_['value'], column_attr)
+        if filter_['case_sensitive']:
+            query_term = _CaseSensitiveLike(
+                column_attr, filter_['comparator'], filter_['value'])
+        else:
+            query_term = column_attr.ilike(
+                _like_pattern(filter_['comparator'], filter_['value']),
+                escape=_LIKE_ESCAPE)
+
         satisfied_filters.append(filter_)
         return query.filter(query_term)
 
@@ -424,12 +507,37 @@ def _filter(model, query, hints):
         satisfied_filters.append(filter_)
         return query.filter(col == filter_val)
 
+    def list_filter(model, query, filter_, value_attr, satisfied_filters):
+        """Apply an exact filter on a list-valued attribute to a query.
+
+        :param model: the table model in question
+        :param query: query to apply filters to
+        :param dict filter_: describes this filter
+        :param value_attr: the attribute holding the values of the list
+        :param list satisfied_filters: filter_ will be added if it is
+                                       satisfied.
+        :returns: query updated to match the rows whose list contains the
+                  filter value
+        """
+        list_attr = getattr(model, filter_['name'])
+        _WontMatch.check(filter_['value'], value_attr)
+        satisfied_filters.append(filter_)
+        return query.filter(list_attr.any(value_attr == filter_['value']))
+
     try:
         satisfied_filters = []
         for filter_ in hints.filters:
             if filter_['name'] not in model.attributes:
                 continue
-            if filter_['comparator'] == 'equals':
+            value_attr = _list_value_attribute(
+                getattr(model, filter_['name']))
+            if value_attr is not None:
+                if filter_['comparator'] == 'equals':
+                    query = list_filter(model, query, filter_, value_attr,
+                                        satisfied_filters)
+                # Inexact filters on the values of a list are left to the
+                # caller.
+            elif filter_['comparator'] == 'equals':
                 query = exact_filter(model, query, filter_,
                                      satisfied_filters)
             else:
@@ -446,6 +554,22 @@ def _filter(model, query, hints):
         return
 
 
+def _paginate(model, query, hints):
+    """Order a query by ID and start it after the marker, if any.
+
+    :param model: table model
+    :param query: query to apply the marker to
+    :param hints: contains the marker details.
+
+    :returns: query updated with the ordering and marker
+
+    """
+    if hints.marker['marker'] is not None:
+        query = query.filter(model.id > hints.marker['marker'])
+    hints.marker['ordered'] = True
+    return query.order_by(model.id)
+
+
 def _limit(query, hints):
     """Apply a limit to a query.
 
@@ -455,27 +579,25 @@ def _limit(query, hints):
     :returns: query updated with any limits satisfied
 
     """
-    # NOTE(henry-nash): If we were to implement pagination, then we
-    # we would expand this method to support pagination and limiting.
-
     # If we satisfied all the filters, set an upper limit if supplied
     if hints.limit:
-        original_len = query.count()
-        limit_query = query.limit(hints.limit['limit'])
-        if limit_query.count() < original_len:
+        list_limit = hints.limit['limit']
+        # NOTE: Counting one entity more than the limit is enough to know
+        # whether the list is truncated, without counting the whole table.
+        if query.limit(list_limit + 1).count() > list_limit:
             hints.limit['truncated'] = True
-            query = limit_query
+            query = query.limit(list_limit)
     return query
 
 
 def filter_limit_query(model, query, hints):
-    """Apply filtering and limit to a query.
+    """Apply filtering, pagination and limit to a query.
 
     :param model: table model
     :param query: query to apply filters to
-    :param hints: contains the list of filters and limit details.  This may
-                  be None, indicating that there are no filters or limits
-                  to be applied. If it's not None, then any filters
+    :param hints: contains the list of filters, marker and limit details.
+                  This may be None, indicating that there are no filters or
+                  limits to be applied. If it's not None, then any filters
                   satisfied here will be removed so that the caller will
                   know if any filters remain.
 
@@ -492,6 +614,9 @@ def filter_limit_query(model, query, hints):
         # Nothing's going to match, so don't bother with the query.
         return []
 
+    if hints.marker is not None:
+        query = _paginate(model, query, hints)
+
     # NOTE(henry-nash): Any unsatisfied filters will have been left in
     # the hints list for the controller to handle. We can only try and
     # limit here if all the filters are already satisfied since, if not,
@@ -505,6 +630,72 @@ def filter_limit_query(model, query, hints):
         return query
 
 
+# The number of entities read at once by stream_query().
+STREAM_BATCH_SIZE = 100
+
+
+def stream_query(model, query, hints, to_dict):
+    """Apply filtering to a query and read its entities in batches.
+
+    As with filter_limit_query(), the filters satisfied are removed from the
+    hints right away. The entities are then read in ID order as the returned
+    iterator is consumed, STREAM_BATCH_SIZE at a time and each batch in its
+    own session, so the query must not depend on the session it was built
+    with. Whether the list is truncated is only known once the iterator is
+    exhausted.
+
+    :param model: table model
+    :param query: query to apply filters to
+    :param hints: contains the list of filters, marker and limit details.
+    :param to_dict: callable converting a model instance into the entity to
+                    return, called within the session it was read in.
+
+    :returns: an iterator over the entities
+
+    """
+    query = _filter(model, query, hints)
+
+    if hints.cannot_match:
+        return iter([])
+
+    marker = None
+    if hints.marker is not None:
+        marker = hints.marker['marker']
+        hints.marker['ordered'] = True
+
+    list_limit = None
+    if hints.limit and not hints.filters:
+        list_limit = hints.limit['limit']
+
+    return _stream(model, query.order_by(model.id), hints, marker,
+                   list_limit, to_dict)
+
+
+def _stream(model, query, hints, marker, list_limit, to_dict):
+    count = 0
+    while True:
+        batch_size = STREAM_BATCH_SIZE
+        if list_limit is not None:
+            # Read one entity more than the limit to know whether the list is
+            # truncated.
+            batch_size = min(batch_size, list_limit + 1 - count)
+        batch_query = query
+        if marker is not None:
+            batch_query = batch_query.filter(model.id > marker)
+        with session_for_read() as session:
+            batch = [(ref.id, to_dict(ref)) for ref in
+                     batch_query.with_session(session).limit(batch_size)]
+        for ref_id, ref in batch:
+            if count == list_limit:
+                hints.limit['truncated'] = True
+                return
+            count += 1
+            yield ref
+        if len(batch) < batch_size:
+            return
+        marker = batch[-1][0]
+
+
 def handle_conflicts(conflict_type='object'):
     """Convert select sqlalchemy exceptions into HTTP 409 Conflict."""
     _conflict_msg = 'Conflict %(conflict_type)s: %(details)s'
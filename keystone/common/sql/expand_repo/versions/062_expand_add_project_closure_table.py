@@ -0,0 +1,102 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import sqlalchemy as sql
+
+from keystone.common.sql import upgrades
+
+# Nodes still running the previous release create projects without adding
+# them to project_closure, so the project insert trigger does it for them
+# until the contract phase.
+MYSQL_PROJECT_INSERT_TRIGGER = """
+CREATE TRIGGER project_after_insert_trigger
+AFTER INSERT
+    ON project FOR EACH ROW
+BEGIN
+    INSERT INTO project_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, NEW.id, depth + 1 FROM project_closure
+            WHERE descendant_id = NEW.parent_id
+        UNION ALL
+        SELECT id, NEW.id, 1 FROM project
+            WHERE id = NEW.parent_id;
+END;
+"""
+
+SQLITE_PROJECT_INSERT_TRIGGER = """
+CREATE TRIGGER project_after_insert_trigger
+AFTER INSERT
+    ON project
+BEGIN
+    INSERT INTO project_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, NEW.id, depth + 1 FROM project_closure
+            WHERE descendant_id = NEW.parent_id
+        UNION ALL
+        SELECT id, NEW.id, 1 FROM project
+            WHERE id = NEW.parent_id;
+END;
+"""
+
+POSTGRESQL_PROJECT_INSERT_TRIGGER = """
+CREATE OR REPLACE FUNCTION add_project_to_closure()
+    RETURNS trigger AS
+$BODY$
+BEGIN
+    INSERT INTO project_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, NEW.id, depth + 1 FROM project_closure
+            WHERE descendant_id = NEW.parent_id
+        UNION ALL
+        SELECT id, NEW.id, 1 FROM project
+            WHERE id = NEW.parent_id;
+    RETURN NULL;
+END
+$BODY$ LANGUAGE plpgsql;
+
+CREATE TRIGGER project_after_insert_trigger AFTER INSERT ON project
+FOR EACH ROW
+EXECUTE PROCEDURE add_project_to_closure();
+"""
+
+
+def upgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    project_table = sql.Table('project', meta, autoload=True)
+
+    project_closure_table = sql.Table(
+        'project_closure',
+        meta,
+        sql.Column('ancestor_id',
+                   sql.String(64),
+                   sql.ForeignKey(project_table.c.id, ondelete='CASCADE'),
+                   primary_key=True),
+        sql.Column('descendant_id',
+                   sql.String(64),
+                   sql.ForeignKey(project_table.c.id, ondelete='CASCADE'),
+                   primary_key=True),
+        sql.Column('depth', sql.Integer, nullable=False),
+        sql.Index('ix_project_closure_descendant_id_depth', 'descendant_id',
+                  'depth'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+
+    project_closure_table.create(migrate_engine, checkfirst=True)
+
+    if upgrades.USE_TRIGGERS:
+        if migrate_engine.name == 'postgresql':
+            project_insert_trigger = POSTGRESQL_PROJECT_INSERT_TRIGGER
+        elif migrate_engine.name == 'sqlite':
+            project_insert_trigger = SQLITE_PROJECT_INSERT_TRIGGER
+        else:
+            project_insert_trigger = MYSQL_PROJECT_INSERT_TRIGGER
+        migrate_engine.execute(project_insert_trigger)
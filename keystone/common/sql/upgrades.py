@@ -149,6 +149,81 @@ def rename_tables_with_constraints(renames, constraints, engine):
         add_constraints(constraints)
 
 
+def _project_closure_rows(parent_ids):
+    # Add a row for every ancestor of every project, walking up the
+    # hierarchy from each project.
+    rows = {}
+    for project_id in parent_ids:
+        parent_id = parent_ids[project_id]
+        examined = set([project_id])
+        depth = 1
+        while parent_id is not None and parent_id not in examined:
+            rows[(parent_id, project_id)] = depth
+            examined.add(parent_id)
+            parent_id = parent_ids.get(parent_id)
+            depth += 1
+        if parent_id == project_id:
+            # Keep the project as its own ancestor so that the cycle is
+            # detected, as the driver does.
+            rows[(project_id, project_id)] = depth
+    return rows
+
+
+def sync_project_closure(engine):
+    """Bring the project_closure table in line with the project hierarchy.
+
+    Only the rows which are missing, stale or have the wrong depth are
+    changed, so this can run again once releases which don't maintain the
+    table have stopped writing to the project table.
+
+    :param engine: the engine of the database to update
+    :returns: the number of rows inserted, updated or deleted
+
+    """
+    meta = sqlalchemy.MetaData()
+    meta.bind = engine
+    project_table = sqlalchemy.Table('project', meta, autoload=True)
+    closure_table = sqlalchemy.Table('project_closure', meta, autoload=True)
+
+    with engine.begin() as conn:
+        query = sqlalchemy.select([project_table.c.id,
+                                   project_table.c.parent_id])
+        parent_ids = dict((row.id, row.parent_id)
+                          for row in conn.execute(query))
+        expected = _project_closure_rows(parent_ids)
+        query = sqlalchemy.select([closure_table.c.ancestor_id,
+                                   closure_table.c.descendant_id,
+                                   closure_table.c.depth])
+        current = dict(((row.ancestor_id, row.descendant_id), row.depth)
+                       for row in conn.execute(query))
+
+        changes = 0
+        for (ancestor_id, descendant_id), depth in current.items():
+            if expected.get((ancestor_id, descendant_id)) == depth:
+                continue
+            if descendant_id not in parent_ids:
+                # The project was created after the hierarchy was read.
+                continue
+            where = sqlalchemy.and_(
+                closure_table.c.ancestor_id == ancestor_id,
+                closure_table.c.descendant_id == descendant_id)
+            if (ancestor_id, descendant_id) in expected:
+                conn.execute(closure_table.update().where(where).values(
+                    depth=expected[(ancestor_id, descendant_id)]))
+            else:
+                conn.execute(closure_table.delete().where(where))
+            changes += 1
+
+        missing = [{'ancestor_id': ancestor_id,
+                    'descendant_id': descendant_id,
+                    'depth': depth}
+                   for (ancestor_id, descendant_id), depth in expected.items()
+                   if (ancestor_id, descendant_id) not in current]
+        if missing:
+            conn.execute(closure_table.insert(), missing)
+        return changes + len(missing)
+
+
 def find_repo(repo_name):
     """Return the absolute path to the named repository."""
     path = os.path.abspath(os.path.join(
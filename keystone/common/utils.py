@@ -437,6 +437,51 @@ def format_url(url, substitutions, silent_keyerror_failures=None):
     return result
 
 
+def compile_url(url, substitutions, deferred_keys):
+    """Format a user-defined URL, leaving some substitutions for later.
+
+    This does the expensive part of :func:`format_url` once, so that URLs
+    which only differ by a few values, such as the user and project ids in a
+    service catalog, can be formatted cheaply.
+
+    :param string url: the URL to be formatted
+    :param dict substitutions: the dictionary used for substitution
+    :param list deferred_keys: the keys that are substituted later
+    :returns: a function taking a dictionary of the deferred substitutions and
+        returning the formatted URL, or None if the URL needs a deferred key
+        which has no value
+    :raises keystone.exception.MalformedEndpoint: if the URL cannot be
+        formatted
+
+    """
+    markers = dict((key, '\0%s\0' % key) for key in deferred_keys)
+    template = format_url(url, dict(substitutions, **markers))
+    parts = template.split('\0')
+    keys = parts[1::2]
+    if len(parts) % 2 == 0 or not set(keys).issubset(markers):
+        # NOTE: A conversion other than a plain string mangled a marker, so
+        # the URL has to be formatted in full every time.
+        def format_deferred(values):
+            subs = dict(substitutions)
+            subs.update((k, v) for k, v in values.items() if v is not None)
+            return format_url(url, subs,
+                              silent_keyerror_failures=deferred_keys)
+        return format_deferred
+
+    if not keys:
+        return lambda values: template
+
+    def render(values):
+        result = list(parts)
+        for i, key in enumerate(keys, start=1):
+            value = values.get(key)
+            if value is None:
+                return None
+            result[2 * i - 1] = six.text_type(value)
+        return ''.join(result)
+    return render
+
+
 def check_endpoint_url(url):
     """Check substitution of url.
 
@@ -38,6 +38,7 @@ from keystone.conf import identity
 from keystone.conf import identity_mapping
 from keystone.conf import jwt_tokens
 from keystone.conf import ldap
+from keystone.conf import local_cache
 from keystone.conf import memcache
 from keystone.conf import oauth1
 from keystone.conf import policy
@@ -77,6 +78,7 @@ conf_modules = [
     identity_mapping,
     jwt_tokens,
     ldap,
+    local_cache,
     memcache,
     oauth1,
     policy,
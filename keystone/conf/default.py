@@ -97,6 +97,19 @@ to a reasonable number to prevent operations like listing all users and
 projects from placing an unnecessary load on the system.
 """))
 
+stream_list_responses = cfg.BoolOpt(
+    'stream_list_responses',
+    default=False,
+    help=utils.fmt("""
+If set to true, the users, groups and projects listed by the API are read from
+the SQL backends in batches and written to the response as they are read,
+rather than all being loaded and serialized at once. This bounds the memory
+used to list large collections, with the drawback that an error occurring
+while the response is being written can only be reported by closing the
+connection, leaving the response body incomplete. The `links` and `truncated`
+attributes of the collection are written after its entities.
+"""))
+
 strict_password_check = cfg.BoolOpt(
     'strict_password_check',
     default=False,
@@ -165,6 +178,7 @@ ALL_OPTS = [
     max_param_size,
     max_token_size,
     list_limit,
+    stream_list_responses,
     strict_password_check,
     insecure_debug,
     default_publisher_id,
@@ -166,6 +166,41 @@ This option is only used when the `password_hash_algorithm` option is set
 to `scrypt`. Defaults to 1.
 """))
 
+password_hash_workers = cfg.IntOpt(
+    'password_hash_workers',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Number of workers dedicated to hashing and checking passwords. Hashing a
+password is deliberately expensive, so running it in a bounded pool of workers
+keeps a burst of password authentications from starving other requests, such
+as token validations, served by the same keystone process. When set to 0, the
+default, passwords are hashed by the thread handling the request.
+"""))
+
+password_hash_worker_type = cfg.StrOpt(
+    'password_hash_worker_type',
+    choices=['thread', 'process'],
+    default='thread',
+    help=utils.fmt("""
+The type of the workers hashing passwords when `[identity]
+password_hash_workers` is set. Threads are enough for the C implementations of
+the hashing algorithms, while processes also isolate the hashing work from the
+Python interpreter serving requests, at the cost of more memory.
+"""))
+
+password_hash_queue_size = cfg.IntOpt(
+    'password_hash_queue_size',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Maximum number of passwords waiting for one of the `[identity]
+password_hash_workers` to be hashed or checked. Requests needing a password to
+be hashed while the queue is full are rejected immediately with a `503 Service
+Unavailable` error, instead of waiting for a worker. When set to 0, the
+default, the queue is not limited.
+"""))
+
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     default_domain_id,
@@ -182,6 +217,9 @@ ALL_OPTS = [
     scrypt_block_size,
     scrypt_paralellism,
     salt_bytesize,
+    password_hash_workers,
+    password_hash_worker_type,
+    password_hash_queue_size,
 ]
 
 
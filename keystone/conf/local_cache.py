@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_config import cfg
+
+from keystone.conf import utils
+
+
+enabled = cfg.BoolOpt(
+    'enabled',
+    default=False,
+    help=utils.fmt("""
+Toggle for the in-process cache kept in front of the configured cache backend.
+When enabled, each keystone process keeps the most recently used values of
+every cache region in memory, saving a round trip to the cache backend (for
+example, memcached) when they are used again. Region invalidations are always
+honored, but values deleted individually by another process may be returned
+for up to `[local_cache] expiration_time` seconds. This has no effect unless
+global caching is enabled.
+"""))
+
+max_size = cfg.IntOpt(
+    'max_size',
+    default=1024,
+    min=1,
+    help=utils.fmt("""
+Maximum number of values kept in memory for each cache region. When a region
+is full, its least recently used value is evicted.
+"""))
+
+expiration_time = cfg.IntOpt(
+    'expiration_time',
+    default=5,
+    min=1,
+    help=utils.fmt("""
+Time to keep a value in memory, in seconds. This bounds how long a value that
+was deleted from the cache backend by another keystone process can still be
+used by this one, so it should be kept short.
+"""))
+
+regions = cfg.ListOpt(
+    'regions',
+    default=[],
+    help=utils.fmt("""
+Names of the cache regions to keep in memory, for example `computed
+assignments` or `tokens`. If empty, every cache region is kept in memory.
+"""))
+
+stats_interval = cfg.IntOpt(
+    'stats_interval',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+Interval, in seconds, at which the hit, miss and eviction counts of each
+region's in-process cache are logged. These can be used to size `[local_cache]
+max_size`. Set to 0 to disable logging the counts.
+"""))
+
+
+GROUP_NAME = __name__.split('.')[-1]
+ALL_OPTS = [
+    enabled,
+    max_size,
+    expiration_time,
+    regions,
+    stats_interval,
+]
+
+
+def register_opts(conf):
+    conf.register_opts(ALL_OPTS, group=GROUP_NAME)
+
+
+def list_opts():
+    return {GROUP_NAME: ALL_OPTS}
@@ -20,8 +20,20 @@ driver = cfg.StrOpt(
     default='sql',
     help=utils.fmt("""
 Entry point for the token revocation backend driver in the `keystone.revoke`
-namespace. Keystone only provides a `sql` driver, so there is no reason to set
-this option unless you are providing a custom entry point.
+namespace. Keystone provides a `sql` driver, and a `snapshot` driver which
+serves revocation events from `[revoke] snapshot_file` for nodes that only
+validate tokens. Tokens cannot be revoked through the `snapshot` driver.
+"""))
+
+snapshot_file = cfg.StrOpt(
+    'snapshot_file',
+    default='/etc/keystone/revocation_events.snapshot',
+    help=utils.fmt("""
+Path of the revocation event snapshot read by the `snapshot` revocation
+driver, and written by default by `keystone-manage revocation_export`. The
+snapshot is reloaded whenever the file changes, so it should be replaced
+atomically, for instance by exporting it next to its destination and renaming
+it.
 """))
 
 expiration_buffer = cfg.IntOpt(
@@ -51,13 +63,63 @@ Time to cache the revocation list and the revocation events (in seconds). This
 has no effect unless global and `[revoke] caching` are both enabled.
 """))
 
+index_fetch_overlap = cfg.IntOpt(
+    'index_fetch_overlap',
+    default=5,
+    min=0,
+    help=utils.fmt("""
+Each keystone process keeps an in-memory index of revocation events, which it
+updates by fetching the events revoked since the newest event it knows about.
+Events revoked up to this many seconds before the newest known event are
+fetched again, so that events recorded by other keystone nodes with slightly
+different clocks, or within the same second, are never missed. This should be
+larger than the clock skew between keystone nodes.
+"""))
+
+prune_interval = cfg.IntOpt(
+    'prune_interval',
+    default=300,
+    min=0,
+    help=utils.fmt("""
+The number of seconds between two runs of the background task which each
+keystone process uses to delete revocation events that can no longer match a
+valid token (see `[revoke] expiration_buffer`). Set this to 0 to disable the
+background task, for instance to run `keystone-manage revocation_flush`
+periodically instead. Revoking tokens never deletes events.
+"""))
+
+prune_batch_size = cfg.IntOpt(
+    'prune_batch_size',
+    default=1000,
+    min=1,
+    help=utils.fmt("""
+The maximum number of revocation events deleted in a single transaction, by
+the background task, `keystone-manage revocation_flush` or `keystone-manage
+revocation_compact`. Smaller batches hold locks on the revocation event table
+for less time.
+"""))
+
+prune_batch_delay = cfg.FloatOpt(
+    'prune_batch_delay',
+    default=0.1,
+    min=0,
+    help=utils.fmt("""
+The number of seconds to wait between two batches of deleted revocation
+events, which limits the rate at which expired events are deleted.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     driver,
+    snapshot_file,
     expiration_buffer,
     caching,
     cache_time,
+    index_fetch_overlap,
+    prune_interval,
+    prune_batch_size,
+    prune_batch_delay,
 ]
 
 
@@ -27,6 +27,19 @@ and is considered "inactive", the user's `enabled` attribute in the HTTP API
 may not match the value of the user's `enabled` column in the user table.
 """))
 
+last_active_at_flush_interval = cfg.IntOpt(
+    'last_active_at_flush_interval',
+    default=0,
+    min=0,
+    help=utils.fmt("""
+The number of seconds for which the dates users were last active are collected
+before being written to the database in a single statement, when
+`[security_compliance] disable_user_account_days_inactive` is set. By default
+they are written as users authenticate. Either way, each keystone process
+writes a user's date at most once a day. Dates which have not been written yet
+are written when the process exits.
+"""))
+
 lockout_failure_attempts = cfg.IntOpt(
     'lockout_failure_attempts',
     min=1,
@@ -53,6 +66,39 @@ non-zero value. This feature depends on the `sql` backend for the `[identity]
 driver`.
 """))
 
+lockout_tracker = cfg.StrOpt(
+    'lockout_tracker',
+    default='sql',
+    choices=['sql', 'cache', 'memory'],
+    help=utils.fmt("""
+Where failed authentication attempts are counted. `sql` updates the user's
+row in the `local_user` table on every failed attempt. `cache` keeps the
+counters in the cache backend, so they are shared by every keystone process
+using it, and `memory` keeps them in each keystone process. With either of the
+latter two, the counters are written back to the `local_user` table every
+`[security_compliance] lockout_write_back_interval` seconds and as soon as a
+user is locked out, which spares the database from a write per failed attempt
+during bursts of failed logins. Counters which have not been written back yet
+are lost if the process stops. `memory`, and `cache` with a cache backend
+which is not shared by the keystone processes, weaken the lockout: a process
+only sees the failures counted by the others once they are written back, so
+until then a user can fail to authenticate up to `[security_compliance]
+lockout_failure_attempts` times with each process before being locked out.
+`cache` falls back to `memory` if caching is disabled. This feature depends on
+the `sql` backend for the `[identity] driver`.
+"""))
+
+lockout_write_back_interval = cfg.IntOpt(
+    'lockout_write_back_interval',
+    default=60,
+    min=1,
+    help=utils.fmt("""
+The number of seconds failed authentication attempts may be counted by the
+`cache` or `memory` `[security_compliance] lockout_tracker` before they are
+written back to the database. This should be shorter than `[cache]
+expiration_time` when using the `cache` tracker.
+"""))
+
 password_expires_days = cfg.IntOpt(
     'password_expires_days',
     min=1,
@@ -128,8 +174,11 @@ applicable with the `sql` backend for the `[identity] driver`.
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
     disable_user_account_days_inactive,
+    last_active_at_flush_interval,
     lockout_failure_attempts,
     lockout_duration,
+    lockout_tracker,
+    lockout_write_back_interval,
     password_expires_days,
     unique_last_password_count,
     minimum_password_age,
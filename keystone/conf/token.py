@@ -135,6 +135,16 @@ the built-in expiry time. This allows long running operations to succeed.
 Defaults to two days.
 """))
 
+max_validation_batch_size = cfg.IntOpt(
+    'max_validation_batch_size',
+    default=100,
+    min=1,
+    help=utils.fmt("""
+The maximum number of tokens that can be validated with a single request to
+`POST /v3/auth/tokens/validate`. Larger batches save more round trips for
+services validating bursts of tokens, but make each request take longer.
+"""))
+
 
 GROUP_NAME = __name__.split('.')[-1]
 ALL_OPTS = [
@@ -147,6 +157,7 @@ ALL_OPTS = [
     infer_roles,
     cache_on_issue,
     allow_expired_window,
+    max_validation_batch_size,
 ]
 
 
@@ -632,6 +632,18 @@ class Gone(Error):
     title = http_client.responses[http_client.GONE]
 
 
+class ServiceUnavailable(Error):
+    message_format = _("The service is temporarily unable to handle the"
+                       " request, please try again later.")
+    code = int(http_client.SERVICE_UNAVAILABLE)
+    title = http_client.responses[http_client.SERVICE_UNAVAILABLE]
+
+
+class PasswordHashingQueueFull(ServiceUnavailable):
+    message_format = _("Too many passwords are waiting to be checked, please"
+                       " try again later.")
+
+
 class ConfigFileNotFound(UnexpectedError):
     debug_message_format = _("The Keystone configuration file %(config_file)s "
                              "could not be found.")
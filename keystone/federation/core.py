@@ -98,7 +98,9 @@ class Manager(manager.Manager):
             'will be recalculated and enforced accordingly the next time '
             'they authenticate or validate a token.' % {'idp_id': idp_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        notifications.invalidate_token_cache_notification(
+            reason, tags=[('identity_provider', idp_id)]
+        )
 
     def _cleanup_idp_domain(self, domain_id):
         domain = {'enabled': False}
@@ -0,0 +1,113 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Coalesce the updates of the date users were last active."""
+
+import atexit
+import datetime
+import os
+import threading
+
+from oslo_log import log
+
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+
+class ActivityRecorder(object):
+    """Record that users were active, at most once per user and day.
+
+    ``last_active_at`` is a date, so once a user has been recorded as active
+    today, recording it again can't change anything and is skipped. The
+    remaining updates are written by calling ``write`` with a list of user
+    IDs, either right away or, if ``[security_compliance]
+    last_active_at_flush_interval`` is set, in batches by a thread flushing
+    them at that interval and when the process exits.
+
+    Several keystone processes may record the same user, so ``write`` must
+    only move ``last_active_at`` forward.
+
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self._lock = threading.Lock()
+        self._today = None
+        self._recorded = set()
+        self._pending = set()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    def record(self, user_id):
+        """Record that a user is active today."""
+        today = datetime.datetime.utcnow().date()
+        with self._lock:
+            if today != self._today:
+                self._today = today
+                self._recorded = set()
+            if user_id in self._recorded:
+                return
+            self._recorded.add(user_id)
+            if CONF.security_compliance.last_active_at_flush_interval:
+                self._pending.add(user_id)
+                self._start_flusher()
+                return
+        try:
+            self._write([user_id])
+        except Exception:
+            with self._lock:
+                self._recorded.discard(user_id)
+            raise
+
+    def flush(self):
+        """Write the pending updates."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return
+        try:
+            self._write(sorted(pending))
+        except Exception:
+            with self._lock:
+                self._pending.update(pending)
+            raise
+
+    def stop(self):
+        """Stop the flushing thread, if any, and write the pending updates."""
+        self._stopped.set()
+        self.flush()
+
+    def _start_flusher(self):
+        # NOTE: Threads don't survive forking, so every keystone process
+        # starts its own flusher the first time it has something to write.
+        pid = os.getpid()
+        if self._flusher is not None and self._flusher[0] == pid:
+            return
+        thread = threading.Thread(target=self._run,
+                                  name='last-active-at-flusher')
+        thread.daemon = True
+        if self._flusher is None:
+            atexit.register(self.stop)
+        self._flusher = (pid, thread)
+        thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(
+                CONF.security_compliance.last_active_at_flush_interval or 1):
+            try:
+                self.flush()
+            except Exception:
+                LOG.exception('Unable to update the date users were last '
+                              'active, will retry.')
@@ -257,6 +257,26 @@ class IdentityDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_users_from_ids(self, user_ids):
+        """List the users with the given IDs.
+
+        Drivers should override this to get all the users in one query.
+
+        :param list user_ids: User IDs.
+
+        :returns: the users which exist. See user schema in
+                  :class:`~.IdentityDriverBase`.
+        :rtype: list of dict
+
+        """
+        users = []
+        for user_id in user_ids:
+            try:
+                users.append(self.get_user(user_id))
+            except exception.UserNotFound:
+                pass
+        return users
+
     @abc.abstractmethod
     def update_user(self, user_id, user):
         """Update an existing user.
@@ -410,6 +430,26 @@ class IdentityDriverBase(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_groups_from_ids(self, group_ids):
+        """List the groups with the given IDs.
+
+        Drivers should override this to get all the groups in one query.
+
+        :param list group_ids: group IDs.
+
+        :returns: the groups which exist. See group schema in
+                  :class:`~.IdentityDriverBase`.
+        :rtype: list of dict
+
+        """
+        groups = []
+        for group_id in group_ids:
+            try:
+                groups.append(self.get_group(group_id))
+            except exception.GroupNotFound:
+                pass
+        return groups
+
     @abc.abstractmethod
     def get_group_by_name(self, group_name, domain_id):
         """Get a group by name.
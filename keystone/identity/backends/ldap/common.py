@@ -1501,7 +1501,10 @@ class BaseLdap(object):
         attrs = list(set(([self.id_attr] +
                           list(self.attribute_mapping.values()) +
                           list(self.extra_attr_mapping.keys()))))
-        if hints.limit:
+        # NOTE: LDAP servers can't order entries by their keystone IDs, so
+        # paginated lists are read in full, page by page, and left to the
+        # controller to order and truncate.
+        if hints.limit and hints.marker is None:
             sizelimit = hints.limit['limit']
             res = self._ldap_get_limited(self.tree_dn,
                                          self.LDAP_SCOPE,
@@ -1548,6 +1551,18 @@ class BaseLdap(object):
         else:
             return self._ldap_res_to_model(res)
 
+    def get_all_by_ids(self, object_ids):
+        """Return the objects with the given IDs, in a single search."""
+        if not object_ids:
+            return []
+        query = u'(|%s)' % ''.join(
+            u'(%s=%s)' % (self.id_attr, ldap.filter.escape_filter_chars(
+                six.text_type(object_id)))
+            for object_id in object_ids)
+        # NOTE: Passing a filter replaces the configured one, so it is added
+        # back here.
+        return self.get_all(u'(&%s%s)' % (query, self.ldap_filter or ''))
+
     def get_by_name(self, name, ldap_filter=None):
         query = (u'(%s=%s)' % (self.attribute_mapping['name'],
                                ldap.filter.escape_filter_chars(
@@ -1663,13 +1678,6 @@ class BaseLdap(object):
             ldap_attr = self.attribute_mapping[filter_['name']]
             val_esc = ldap.filter.escape_filter_chars(filter_['value'])
 
-            if filter_['case_sensitive']:
-                # NOTE(henry-nash): Although dependent on the schema being
-                # used, most LDAP attributes are configured with case
-                # insensitive matching rules, so we'll leave this to the
-                # controller to filter.
-                return
-
             if filter_['name'] == 'enabled':
                 # NOTE(henry-nash): Due to the different options for storing
                 # the enabled attribute (e,g, emulated or not), for now we
@@ -1720,8 +1728,14 @@ class BaseLdap(object):
             if filter_['name'] not in self.attribute_mapping:
                 continue
             new_filter = build_filter(filter_)
-            if new_filter is not None:
-                filter_list.append(new_filter)
+            if new_filter is None:
+                continue
+            filter_list.append(new_filter)
+            # NOTE: Although dependent on the schema being used, most LDAP
+            # attributes are configured with case insensitive matching rules.
+            # So a case sensitive filter only narrows down the entries read
+            # from LDAP, and is left in the hints for the controller.
+            if not filter_['case_sensitive']:
                 satisfied_filters.append(filter_)
 
         if filter_list:
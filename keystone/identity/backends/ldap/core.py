@@ -86,6 +86,10 @@ class Identity(base.IdentityDriverBase):
     def list_users(self, hints):
         return self.user.get_all_filtered(hints)
 
+    def list_users_from_ids(self, user_ids):
+        return [self.user.filter_attributes(user)
+                for user in self.user.get_all_by_ids(user_ids)]
+
     def unset_default_project_id(self, project_id):
         # This function is not implemented for the LDAP backend. The LDAP
         # backend is readonly.
@@ -99,6 +103,10 @@ class Identity(base.IdentityDriverBase):
     def get_group(self, group_id):
         return self.group.get_filtered(group_id)
 
+    def list_groups_from_ids(self, group_ids):
+        return [common_ldap.filter_entity(group)
+                for group in self.group.get_all_by_ids(group_ids)]
+
     def get_group_by_name(self, group_name, domain_id):
         # domain_id will already have been handled in the Manager layer,
         # parameter left in so this matches the Driver specification
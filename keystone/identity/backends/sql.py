@@ -27,6 +27,7 @@ from keystone.i18n import _
 from keystone.identity.backends import base
 from keystone.identity.backends import resource_options as options
 from keystone.identity.backends import sql_model as model
+from keystone.identity import lockout
 
 
 CONF = keystone.conf.CONF
@@ -37,6 +38,7 @@ class Identity(base.IdentityDriverBase):
     # config parameter to enable sql to be used as a domain-specific driver.
     def __init__(self, conf=None):
         self.conf = conf
+        self._lockout_tracker = (None, None)
         super(Identity, self).__init__()
 
     @property
@@ -65,17 +67,37 @@ class Identity(base.IdentityDriverBase):
         if self._is_account_locked(user_id, user_ref):
             raise exception.AccountLocked(user_id=user_id)
         elif not self._check_password(password, user_ref):
-            self._record_failed_auth(user_id)
+            self._record_failed_auth(user_id, user_ref)
             raise AssertionError(_('Invalid user / password'))
         elif not user_ref.enabled:
             raise exception.UserDisabled(user_id=user_id)
         elif user_ref.password_is_expired:
             raise exception.PasswordExpired(user_id=user_id)
         # successful auth, reset failed count if present
-        if user_ref.local_user.failed_auth_count:
+        if self._get_failed_auth(user_ref)[0]:
             self._reset_failed_auth(user_id)
         return user_dict
 
+    def _get_lockout_tracker(self):
+        name = CONF.security_compliance.lockout_tracker
+        tracker_name, tracker = self._lockout_tracker
+        if tracker_name != name:
+            if tracker is not None:
+                tracker.write_back(force=True)
+            tracker = lockout.get_tracker(name, self._write_back_failed_auth)
+            self._lockout_tracker = (name, tracker)
+        return tracker
+
+    def _get_failed_auth(self, user_ref):
+        local_user = user_ref.local_user
+        tracker = self._get_lockout_tracker()
+        if tracker is None:
+            return local_user.failed_auth_count or 0, local_user.failed_auth_at
+        return tracker.get_failures(user_ref.id,
+                                    local_user.failed_auth_count,
+                                    local_user.failed_auth_at,
+                                    local_user.failed_auth_reset_at)
+
     def _is_account_locked(self, user_id, user_ref):
         """Check if the user account is locked.
 
@@ -92,7 +114,7 @@ class Identity(base.IdentityDriverBase):
         if ignore_option and ignore_option.option_value is True:
             return False
 
-        attempts = user_ref.local_user.failed_auth_count or 0
+        attempts, last_failure = self._get_failed_auth(user_ref)
         max_attempts = CONF.security_compliance.lockout_failure_attempts
         lockout_duration = CONF.security_compliance.lockout_duration
         if max_attempts and (attempts >= max_attempts):
@@ -100,14 +122,24 @@ class Identity(base.IdentityDriverBase):
                 return True
             else:
                 delta = datetime.timedelta(seconds=lockout_duration)
-                last_failure = user_ref.local_user.failed_auth_at
                 if (last_failure + delta) > datetime.datetime.utcnow():
                     return True
                 else:
                     self._reset_failed_auth(user_id)
+                    # NOTE: The rest of the request must not count failures
+                    # on top of the values read before the reset.
+                    user_ref.local_user.failed_auth_count = 0
+                    user_ref.local_user.failed_auth_at = None
         return False
 
-    def _record_failed_auth(self, user_id):
+    def _record_failed_auth(self, user_id, user_ref):
+        tracker = self._get_lockout_tracker()
+        if tracker is not None:
+            tracker.record_failure(user_id,
+                                   user_ref.local_user.failed_auth_count,
+                                   user_ref.local_user.failed_auth_at,
+                                   user_ref.local_user.failed_auth_reset_at)
+            return
         with sql.session_for_write() as session:
             user_ref = session.query(model.User).get(user_id)
             if not user_ref.local_user.failed_auth_count:
@@ -116,10 +148,45 @@ class Identity(base.IdentityDriverBase):
             user_ref.local_user.failed_auth_at = datetime.datetime.utcnow()
 
     def _reset_failed_auth(self, user_id):
+        tracker = self._get_lockout_tracker()
+        if tracker is not None:
+            tracker.reset(user_id)
+            return
         with sql.session_for_write() as session:
             user_ref = session.query(model.User).get(user_id)
             user_ref.local_user.failed_auth_count = 0
             user_ref.local_user.failed_auth_at = None
+            user_ref.local_user.failed_auth_reset_at = (
+                datetime.datetime.utcnow())
+
+    def _write_back_failed_auth(self, failures):
+        now = datetime.datetime.utcnow()
+        with sql.session_for_write() as session:
+            for user_id, (count, failed_at) in failures.items():
+                query = session.query(model.LocalUser).filter_by(
+                    user_id=user_id)
+                values = {'failed_auth_count': count,
+                          'failed_auth_at': failed_at}
+                if count:
+                    # NOTE: Other keystone processes write back their own
+                    # counters, so a count is only written over a lower one,
+                    # and only if it was counted after the last reset. Only
+                    # resets lower the stored count.
+                    query = query.filter(
+                        sqlalchemy.or_(
+                            model.LocalUser.failed_auth_count.is_(None),
+                            model.LocalUser.failed_auth_count < count),
+                        sqlalchemy.or_(
+                            model.LocalUser.failed_auth_reset_at.is_(None),
+                            model.LocalUser.failed_auth_reset_at <= failed_at))
+                else:
+                    values['failed_auth_reset_at'] = now
+                query.update(values, synchronize_session=False)
+
+    def _forget_failed_auth(self, user_id):
+        tracker = self._get_lockout_tracker()
+        if tracker is not None:
+            tracker.forget(user_id)
 
     # user crud
 
@@ -166,6 +233,10 @@ class Identity(base.IdentityDriverBase):
             query = session.query(model.User).outerjoin(model.LocalUser)
             query, hints = self._create_password_expires_query(session, query,
                                                                hints)
+            if hints.stream:
+                return sql.stream_query(
+                    model.User, query, hints,
+                    lambda x: base.filter_user(x.to_dict()))
             user_refs = sql.filter_limit_query(model.User, query, hints)
             return [base.filter_user(x.to_dict()) for x in user_refs]
 
@@ -188,6 +259,14 @@ class Identity(base.IdentityDriverBase):
             return base.filter_user(
                 self._get_user(session, user_id).to_dict())
 
+    def list_users_from_ids(self, user_ids):
+        if not user_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.User)
+            query = query.filter(model.User.id.in_(user_ids))
+            return [base.filter_user(x.to_dict()) for x in query]
+
     def get_user_by_name(self, user_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.User).join(model.LocalUser)
@@ -228,6 +307,10 @@ class Identity(base.IdentityDriverBase):
                     user_ref.password_ref.expires_at = expires_now
 
             user_ref.extra = new_user.extra
+            if user_ref.enabled:
+                # NOTE: Enabling a user resets its failed authentication
+                # attempts, see model.User.enabled.
+                self._forget_failed_auth(user_id)
             return base.filter_user(
                 user_ref.to_dict(include_extra_dict=True))
 
@@ -235,11 +318,15 @@ class Identity(base.IdentityDriverBase):
         unique_cnt = CONF.security_compliance.unique_last_password_count
         # Validate the new password against the remaining passwords.
         if unique_cnt > 0:
-            for password_ref in user_ref.local_user.passwords[-unique_cnt:]:
-                if password_hashing.check_password(
-                        password, password_ref.password_hash):
-                    raise exception.PasswordHistoryValidationError(
-                        unique_count=unique_cnt)
+            # NOTE: The most recent passwords are the most likely to be
+            # reused, so they are checked first.
+            password_hashes = [
+                password_ref.password_hash for password_ref in
+                reversed(user_ref.local_user.passwords[-unique_cnt:])]
+            if password_hashing.check_any_password(password,
+                                                   password_hashes):
+                raise exception.PasswordHistoryValidationError(
+                    unique_count=unique_cnt)
 
     def change_password(self, user_id, new_password):
         with sql.session_for_write() as session:
@@ -339,6 +426,7 @@ class Identity(base.IdentityDriverBase):
             q.delete(False)
 
             session.delete(ref)
+        self._forget_failed_auth(user_id)
 
     # group crud
 
@@ -353,6 +441,9 @@ class Identity(base.IdentityDriverBase):
     def list_groups(self, hints):
         with sql.session_for_read() as session:
             query = session.query(model.Group)
+            if hints.stream:
+                return sql.stream_query(model.Group, query, hints,
+                                        lambda ref: ref.to_dict())
             refs = sql.filter_limit_query(model.Group, query, hints)
             return [ref.to_dict() for ref in refs]
 
@@ -366,6 +457,14 @@ class Identity(base.IdentityDriverBase):
         with sql.session_for_read() as session:
             return self._get_group(session, group_id).to_dict()
 
+    def list_groups_from_ids(self, group_ids):
+        if not group_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(model.Group)
+            query = query.filter(model.Group.id.in_(group_ids))
+            return [ref.to_dict() for ref in query]
+
     def get_group_by_name(self, group_name, domain_id):
         with sql.session_for_read() as session:
             query = session.query(model.Group)
@@ -208,6 +208,7 @@ class User(sql.ModelBase, sql.ModelDictMixinWithExtras):
         if value and self.local_user:
             self.local_user.failed_auth_count = 0
             self.local_user.failed_auth_at = None
+            self.local_user.failed_auth_reset_at = datetime.datetime.utcnow()
         self._enabled = value
 
     @enabled.expression
@@ -273,6 +274,7 @@ class LocalUser(sql.ModelBase, sql.ModelDictMixin):
                                  order_by='Password.created_at_int')
     failed_auth_count = sql.Column(sql.Integer, nullable=True)
     failed_auth_at = sql.Column(sql.DateTime, nullable=True)
+    failed_auth_reset_at = sql.Column(sql.DateTime, nullable=True)
     __table_args__ = (
         sql.UniqueConstraint('user_id'),
         sql.UniqueConstraint('domain_id', 'name'),
@@ -14,6 +14,7 @@
 
 """Main entry point into the Identity service."""
 
+import collections
 import copy
 import functools
 import itertools
@@ -35,6 +36,7 @@ from keystone.common.validation import validators
 import keystone.conf
 from keystone import exception
 from keystone.i18n import _
+from keystone.identity import activity
 from keystone.identity.mapping_backends import mapping
 from keystone import notifications
 from oslo_utils import timeutils
@@ -52,6 +54,9 @@ ID_MAPPING_REGION = cache.create_region(name='id mapping')
 MEMOIZE_ID_MAPPING = cache.get_memoization_decorator(group='identity',
                                                      region=ID_MAPPING_REGION)
 
+# Failed authentication counters kept by the `cache` lockout tracker.
+LOCKOUT_REGION = cache.create_region(name='lockout')
+
 DOMAIN_CONF_FHEAD = 'keystone.'
 DOMAIN_CONF_FTAIL = '.conf'
 
@@ -609,6 +614,12 @@ class Manager(manager.Manager):
         return (driver is not self.driver or not driver.generates_uuids() or
                 not driver.is_domain_aware())
 
+    def _disable_streaming_if_post_processing(self, hints, driver):
+        # NOTE: The domain IDs and ID mappings of a list of entities are
+        # patched into the whole list at once, so it can't be streamed.
+        if hints.stream and self._needs_post_processing(driver):
+            hints.stream = False
+
     def _insert_new_public_id(self, local_entity, ref, driver):
         # Need to create a mapping. If the driver generates UUIDs
         # then pass the local UUID in as the public ID to use.
@@ -821,6 +832,47 @@ class Manager(manager.Manager):
         # which case we leave this to the caller to check.
         return (conf.default_domain_id, driver, public_id)
 
+    def _get_domain_drivers_and_entity_ids(self, public_ids):
+        """Look up the details of several public IDs at once.
+
+        This is the bulk version of :meth:`_get_domain_driver_and_entity_id`,
+        which looks up all the mappings needed in a single query.
+
+        :param public_ids: the IDs provided in the call
+
+        :returns: a dictionary mapping (domain_id, driver) pairs to the list
+                  of the entity IDs understood by that driver. Public IDs
+                  which can't be found in the mapping table are left out.
+
+        """
+        conf = CONF.identity
+        driver = self.driver
+        mappings = {}
+        if (conf.domain_specific_drivers_enabled or
+                not (driver.generates_uuids() or
+                     CONF.identity_mapping.backward_compatible_ids)):
+            mappings = dict(
+                (local_id_ref['public_id'], local_id_ref) for local_id_ref in
+                PROVIDERS.id_mapping_api.list_id_mappings_from_public_ids(
+                    list(public_ids)))
+
+        entity_ids = collections.defaultdict(list)
+        for public_id in public_ids:
+            local_id_ref = mappings.get(public_id)
+            if conf.domain_specific_drivers_enabled and local_id_ref:
+                domain_id = local_id_ref['domain_id']
+                key = (domain_id, self._select_identity_driver(domain_id))
+                entity_ids[key].append(local_id_ref['local_id'])
+            elif driver.generates_uuids():
+                entity_ids[(None, driver)].append(public_id)
+            elif not CONF.identity_mapping.backward_compatible_ids:
+                if local_id_ref:
+                    key = (local_id_ref['domain_id'], driver)
+                    entity_ids[key].append(local_id_ref['local_id'])
+            else:
+                entity_ids[(conf.default_domain_id, driver)].append(public_id)
+        return entity_ids
+
     def _assert_user_and_group_in_same_backend(
             self, user_entity_id, user_driver, group_entity_id, group_driver):
         """Ensure that user and group IDs are backed by the same backend.
@@ -885,7 +937,7 @@ class Manager(manager.Manager):
 
         list_limit = driver._get_list_limit()
         if list_limit:
-            hints.set_limit(list_limit)
+            hints.cap_limit(list_limit)
 
     # The actual driver calls - these are pre/post processed here as
     # part of the Manager layer to make sure we:
@@ -960,6 +1012,25 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
 
+    @domains_configured
+    def list_users_from_ids(self, user_ids):
+        """List the users with the given IDs.
+
+        The users are fetched with one query per identity backend, rather
+        than one per user.
+
+        :param user_ids: the public IDs of the users
+        :returns: the users which exist
+
+        """
+        users = []
+        entity_ids = self._get_domain_drivers_and_entity_ids(set(user_ids))
+        for (domain_id, driver), ids in entity_ids.items():
+            refs = driver.list_users_from_ids(ids)
+            users.extend(self._set_domain_id_and_mapping(
+                refs, domain_id, driver, mapping.EntityType.USER))
+        return users
+
     def assert_user_enabled(self, user_id, user=None):
         """Assert the user and the user's domain are enabled.
 
@@ -1032,7 +1103,10 @@ class Manager(manager.Manager):
                 fed_res = PROVIDERS.shadow_users_api.get_federated_users(
                     fed_hints)
                 break
-        return driver.list_users(hints) + fed_res
+        ref_list = driver.list_users(hints)
+        if fed_res:
+            ref_list = list(ref_list) + fed_res
+        return ref_list
 
     @domains_configured
     @exception_translated('user')
@@ -1048,6 +1122,7 @@ class Manager(manager.Manager):
             # We are effectively satisfying any domain_id filter by the above
             # driver selection, so remove any such filter.
             self._mark_domain_id_filter_satisfied(hints)
+        self._disable_streaming_if_post_processing(hints, driver)
         hints = self._translate_expired_password_hints(hints)
         ref_list = self._handle_shadow_and_local_users(driver, hints)
         return self._set_domain_id_and_mapping(
@@ -1111,7 +1186,9 @@ class Manager(manager.Manager):
                 'enforced accordingly the next time they authenticate or '
                 'validate a token.' % {'user_id': user_id}
             )
-            notifications.invalidate_token_cache_notification(reason)
+            notifications.invalidate_token_cache_notification(
+                reason, tags=[('user', user_id)]
+            )
 
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
@@ -1181,6 +1258,25 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.GROUP)
 
+    @domains_configured
+    def list_groups_from_ids(self, group_ids):
+        """List the groups with the given IDs.
+
+        The groups are fetched with one query per identity backend, rather
+        than one per group.
+
+        :param group_ids: the public IDs of the groups
+        :returns: the groups which exist
+
+        """
+        groups = []
+        entity_ids = self._get_domain_drivers_and_entity_ids(set(group_ids))
+        for (domain_id, driver), ids in entity_ids.items():
+            refs = driver.list_groups_from_ids(ids)
+            groups.extend(self._set_domain_id_and_mapping(
+                refs, domain_id, driver, mapping.EntityType.GROUP))
+        return groups
+
     @domains_configured
     @exception_translated('group')
     def get_group_by_name(self, group_name, domain_id):
@@ -1325,6 +1421,7 @@ class Manager(manager.Manager):
             # We are effectively satisfying any domain_id filter by the above
             # driver selection, so remove any such filter.
             self._mark_domain_id_filter_satisfied(hints)
+        self._disable_streaming_if_post_processing(hints, driver)
         ref_list = driver.list_groups(hints)
         return self._set_domain_id_and_mapping(
             ref_list, domain_scope, driver, mapping.EntityType.GROUP)
@@ -1499,3 +1596,23 @@ class ShadowUsersManager(manager.Manager):
         shadow_driver = CONF.shadow_users.driver
 
         super(ShadowUsersManager, self).__init__(shadow_driver)
+        self._activity = activity.ActivityRecorder(
+            self._write_last_active_at)
+
+    def _write_last_active_at(self, user_ids):
+        self.driver.set_last_active_at_for_users(user_ids)
+
+    def set_last_active_at(self, user_id):
+        """Record that a user is active.
+
+        The date is only written once a day per user and keystone process,
+        and possibly in a batch with other users' later on, see
+        ``[security_compliance] last_active_at_flush_interval``.
+
+        """
+        if CONF.security_compliance.disable_user_account_days_inactive:
+            self._activity.record(user_id)
+
+    def flush_last_active_at(self):
+        """Write the dates users were last active which are still pending."""
+        self._activity.flush()
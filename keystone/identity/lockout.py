@@ -0,0 +1,302 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Count failed authentication attempts outside of the user table."""
+
+import abc
+import datetime
+import threading
+
+from dogpile.cache import api as dogpile_api
+from dogpile.cache.backends import memcached
+from oslo_log import log
+import six
+
+import keystone.conf
+from keystone import exception
+from keystone.identity import core
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class _Tracker(object):
+    """Count failed authentication attempts and write them back in batches.
+
+    A user's counter never falls behind the values stored in the user table,
+    which other keystone processes may have written back, and every change to
+    it is written back by calling ``write_back`` with a dictionary mapping
+    user IDs to ``(failed_auth_count, failed_auth_at)`` tuples. That happens
+    at most every ``[security_compliance] lockout_write_back_interval``
+    seconds, and as soon as a user is locked out so that every keystone
+    process sees the lockout. Resets are written back immediately as well,
+    because they are the only change lowering the stored count. They are
+    stamped in ``failed_auth_reset_at``, and the failures a process counted
+    before the last reset are dropped instead of being merged.
+
+    """
+
+    def __init__(self, write_back):
+        self._write_back = write_back
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._last_write_back = datetime.datetime.utcnow()
+
+    @abc.abstractmethod
+    def _get(self, user_id):
+        """Return the tracked ``(count, failed_at)`` of a user, or None."""
+        raise exception.NotImplemented()  # pragma: no cover
+
+    @abc.abstractmethod
+    def _set(self, user_id, failures):
+        """Track the ``(count, failed_at)`` of a user."""
+        raise exception.NotImplemented()  # pragma: no cover
+
+    @abc.abstractmethod
+    def _delete(self, user_id):
+        """Stop tracking a user."""
+        raise exception.NotImplemented()  # pragma: no cover
+
+    def _increment(self, user_id, stored, reset_at, failed_at):
+        """Count a failure, with the lock held.
+
+        :param user_id: the user ID
+        :param stored: the ``(count, failed_at)`` stored for the user
+        :param reset_at: the ``failed_auth_reset_at`` stored for the user
+        :param failed_at: the time of the failure
+        :returns: the new ``(count, failed_at)`` of the user
+
+        """
+        failures = (self._merge(self._get(user_id), stored, reset_at)[0] + 1,
+                    failed_at)
+        self._set(user_id, failures)
+        return failures
+
+    @staticmethod
+    def _merge(tracked, stored, reset_at):
+        # The tracked failures are stale if they were counted before another
+        # keystone process reset the user, and the stored count is ahead of
+        # the tracked one if another process wrote back failures this one
+        # hasn't seen.
+        if (tracked is not None and reset_at is not None and
+                tracked[1] is not None and tracked[1] < reset_at):
+            tracked = None
+        if tracked is None or stored[0] > tracked[0]:
+            return stored
+        return tracked
+
+    def _prune(self, before):
+        pass
+
+    def get_failures(self, user_id, count, failed_at, reset_at=None):
+        """Return the failed authentication attempts of a user.
+
+        :param user_id: the user ID
+        :param count: the ``failed_auth_count`` stored for the user
+        :param failed_at: the ``failed_auth_at`` stored for the user
+        :param reset_at: the ``failed_auth_reset_at`` stored for the user
+        :returns: a ``(failed_auth_count, failed_auth_at)`` tuple
+
+        """
+        with self._lock:
+            tracked = self._get(user_id)
+        return self._merge(tracked, (count or 0, failed_at), reset_at)
+
+    def record_failure(self, user_id, count, failed_at, reset_at=None):
+        """Count a failed authentication attempt.
+
+        :param user_id: the user ID
+        :param count: the ``failed_auth_count`` stored for the user
+        :param failed_at: the ``failed_auth_at`` stored for the user
+        :param reset_at: the ``failed_auth_reset_at`` stored for the user
+
+        """
+        now = datetime.datetime.utcnow()
+        with self._lock:
+            failures = self._increment(user_id, (count or 0, failed_at),
+                                       reset_at, now)
+            self._dirty.add(user_id)
+        max_attempts = CONF.security_compliance.lockout_failure_attempts
+        self.write_back(force=failures[0] == max_attempts)
+
+    def reset(self, user_id):
+        """Clear the failed authentication attempts of a user."""
+        with self._lock:
+            self._set(user_id, (0, None))
+            self._dirty.add(user_id)
+        self.write_back(force=True)
+
+    def forget(self, user_id):
+        """Stop tracking a user whose stored values have been changed."""
+        with self._lock:
+            self._delete(user_id)
+            self._dirty.discard(user_id)
+
+    def write_back(self, force=False):
+        """Write the changed counters back to the user table.
+
+        :param force: write back even if the write back interval has not
+                      elapsed yet
+
+        """
+        now = datetime.datetime.utcnow()
+        interval = datetime.timedelta(
+            seconds=CONF.security_compliance.lockout_write_back_interval)
+        with self._lock:
+            if not force and now - self._last_write_back < interval:
+                return
+            self._last_write_back = now
+            self._prune(now - interval)
+            failures = {}
+            for user_id in self._dirty:
+                user_failures = self._get(user_id)
+                if user_failures is not None:
+                    failures[user_id] = user_failures
+            self._dirty.clear()
+        if not failures:
+            return
+        try:
+            self._write_back(failures)
+        except Exception:
+            with self._lock:
+                self._dirty.update(failures)
+            raise
+
+
+class MemoryTracker(_Tracker):
+    """Keep the counters in the memory of the current process.
+
+    Each process only sees the failures counted by the others once they are
+    written back, so until then a user can fail to authenticate up to
+    ``[security_compliance] lockout_failure_attempts`` times with every
+    process before being locked out.
+
+    """
+
+    def __init__(self, write_back):
+        super(MemoryTracker, self).__init__(write_back)
+        self._failures = {}
+
+    def _get(self, user_id):
+        return self._failures.get(user_id)
+
+    def _set(self, user_id, failures):
+        self._failures[user_id] = failures
+
+    def _delete(self, user_id):
+        self._failures.pop(user_id, None)
+
+    def _prune(self, before):
+        # NOTE: Counters which were written back by an earlier write back and
+        # have not changed since match the user table, so they can be dropped
+        # to keep memory bounded and reloaded from the table if the user
+        # fails again.
+        for user_id, (count, failed_at) in list(self._failures.items()):
+            if user_id not in self._dirty and (failed_at is None or
+                                               failed_at < before):
+                del self._failures[user_id]
+
+
+class CacheTracker(_Tracker):
+    """Keep the counters in the cache backend.
+
+    The counters are shared by every keystone process using the cache
+    backend, but each process writes back the counters it changed. With a
+    memcached backend, counts are incremented atomically by memcached itself,
+    so concurrent failures in different processes are all counted. Other
+    backends can only be updated atomically within a process.
+
+    """
+
+    def _key(self, user_id):
+        return 'lockout:%s' % user_id
+
+    def _counter_key(self, user_id):
+        # NOTE: Counters are read and written with the memcached client
+        # directly, because memcached can only increment values it stores
+        # as plain numbers, not the values serialized by the region.
+        key = 'lockout-count:%s' % user_id
+        if core.LOCKOUT_REGION.key_mangler:
+            key = core.LOCKOUT_REGION.key_mangler(key)
+        return key
+
+    def _client(self):
+        backend = core.LOCKOUT_REGION.actual_backend
+        if isinstance(backend, memcached.GenericMemcachedBackend):
+            return backend.client
+        return None
+
+    def _get(self, user_id):
+        failures = core.LOCKOUT_REGION.get(self._key(user_id))
+        if failures is dogpile_api.NO_VALUE:
+            return None
+        count, failed_at = failures
+        client = self._client()
+        if client is not None:
+            value = client.get(self._counter_key(user_id))
+            if value is not None:
+                count = int(value)
+        return count, failed_at
+
+    def _set(self, user_id, failures):
+        client = self._client()
+        if client is not None:
+            client.set(self._counter_key(user_id), str(failures[0]),
+                       CONF.cache.expiration_time)
+        core.LOCKOUT_REGION.set(self._key(user_id), failures)
+
+    def _delete(self, user_id):
+        client = self._client()
+        if client is not None:
+            client.delete(self._counter_key(user_id))
+        core.LOCKOUT_REGION.delete(self._key(user_id))
+
+    def _increment(self, user_id, stored, reset_at, failed_at):
+        client = self._client()
+        if client is None:
+            return super(CacheTracker, self)._increment(
+                user_id, stored, reset_at, failed_at)
+        key = self._counter_key(user_id)
+        # add() only seeds the counter if no other process did, and incr()
+        # is atomic, so no failure is lost to a concurrent update.
+        client.add(key, str(stored[0]), CONF.cache.expiration_time)
+        count = client.incr(key, 1)
+        if count is None or int(count) <= stored[0]:
+            # the counter expired in between, or is behind the user table
+            count = stored[0] + 1
+            client.set(key, str(count), CONF.cache.expiration_time)
+        failures = (int(count), failed_at)
+        core.LOCKOUT_REGION.set(self._key(user_id), failures)
+        return failures
+
+
+def get_tracker(name, write_back):
+    """Return a new lockout tracker.
+
+    :param name: the ``[security_compliance] lockout_tracker`` to create
+    :param write_back: a callable writing a dictionary of counters back to the
+                       user table
+    :returns: a tracker, or None if failed attempts are written to the user
+              table directly
+
+    """
+    if name == 'cache' and not CONF.cache.enabled:
+        LOG.warning('Caching is disabled, so failed authentication attempts '
+                    'are counted in the memory of each keystone process.')
+        name = 'memory'
+    if name == 'cache':
+        return CacheTracker(write_back)
+    elif name == 'memory':
+        return MemoryTracker(write_back)
+    return None
@@ -58,6 +58,23 @@ class MappingDriverBase(provider_api.ProviderAPIMixin, object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_id_mappings_from_public_ids(self, public_ids):
+        """Return the local mappings of several public IDs.
+
+        Drivers should override this to get all the mappings in one query.
+
+        :param public_ids: The public IDs for the mappings required.
+        :returns list: The mappings which exist, each a dict containing the
+                       public ID, entity domain, local ID and type.
+
+        """
+        mappings = []
+        for public_id in public_ids:
+            mapping = self.get_id_mapping(public_id)
+            if mapping:
+                mappings.append(mapping)
+        return mappings
+
     @abc.abstractmethod
     def create_id_mapping(self, local_entity, public_id=None):
         """Create and store a mapping to a public_id.
@@ -68,6 +68,14 @@ class Mapping(base.MappingDriverBase):
             if mapping_ref:
                 return mapping_ref.to_dict()
 
+    def list_id_mappings_from_public_ids(self, public_ids):
+        if not public_ids:
+            return []
+        with sql.session_for_read() as session:
+            query = session.query(IDMapping)
+            query = query.filter(IDMapping.public_id.in_(public_ids))
+            return [mapping_ref.to_dict() for mapping_ref in query]
+
     def create_id_mapping(self, local_entity, public_id=None):
         entity = local_entity.copy()
         try:
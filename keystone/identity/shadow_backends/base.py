@@ -89,6 +89,18 @@ class ShadowUsersDriverBase(object):
         """
         raise exception.NotImplemented()
 
+    def set_last_active_at_for_users(self, user_ids):
+        """Set the last active at date for several users.
+
+        Drivers should only move the date forward, since several keystone
+        processes may set it for the same user.
+
+        :param user_ids: List of unique identifiers of the users
+
+        """
+        for user_id in user_ids:
+            self.set_last_active_at(user_id)
+
     @abc.abstractmethod
     def list_federated_users_info(self, hints=None):
         """Get the shadow users info with the specified filters.
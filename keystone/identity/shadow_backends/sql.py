@@ -126,6 +126,18 @@ class ShadowUsers(base.ShadowUsersDriverBase):
                 user_ref = session.query(model.User).get(user_id)
                 user_ref.last_active_at = datetime.datetime.utcnow().date()
 
+    def set_last_active_at_for_users(self, user_ids):
+        if CONF.security_compliance.disable_user_account_days_inactive:
+            today = datetime.datetime.utcnow().date()
+            with sql.session_for_write() as session:
+                query = session.query(model.User)
+                query = query.filter(model.User.id.in_(user_ids))
+                query = query.filter(sqlalchemy.or_(
+                    model.User.last_active_at.is_(None),
+                    model.User.last_active_at < today))
+                query.update({'last_active_at': today},
+                             synchronize_session=False)
+
     @sql.handle_conflicts(conflict_type='federated_user')
     def update_federated_user_display_name(self, idp_id, protocol_id,
                                            unique_id, display_name):
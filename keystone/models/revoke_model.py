@@ -266,6 +266,254 @@ def build_token_values(token):
     return token_values
 
 
+# Attributes used to index revocation events, with the token values each one
+# is compared against. Events are indexed by the first attribute in this list
+# that they have a value for, so the most selective attributes come first.
+_INDEX_KEYS = [
+    ('audit_id', ['audit_id']),
+    ('audit_chain_id', ['audit_chain_id']),
+    ('trust_id', ['trust_id']),
+    ('consumer_id', ['consumer_id']),
+    ('user_id', ALTERNATIVES['user_id']),
+    ('project_id', ['project_id']),
+    ('domain_scope_id', ALTERNATIVES['domain_scope_id']),
+    ('domain_id', ALTERNATIVES['domain_id']),
+]
+
+
+def _matches_token(event, token_values):
+    """See if the token matches every attribute of the revocation event.
+
+    Unlike :func:`matches`, which relies on the backend to have filtered
+    events by issue time, user, project and audit ID, this checks all of the
+    attributes of the event.
+
+    """
+    if event.issued_before < token_values['issued_at']:
+        return False
+
+    if event.user_id is not None and event.user_id not in (
+            token_values['user_id'],
+            token_values['trustor_id'],
+            token_values['trustee_id'],):
+        return False
+
+    if event.project_id is not None and event.project_id not in (
+            token_values['project_id'],):
+        return False
+
+    if event.audit_id is not None and event.audit_id not in (
+            token_values['audit_id'],):
+        return False
+
+    return matches(event, token_values)
+
+
+class RevokeIndex(object):
+    """An in-memory index of revocation events.
+
+    Events are grouped by the value of their most selective attribute, so
+    checking a token only needs to look at the handful of events that share
+    one of its values, no matter how many events are in the index.
+
+    The index is kept up to date by adding the events returned by
+    ``list_events(last_fetch=...)`` and pruning the events the backend
+    would have removed.
+
+    """
+
+    def __init__(self):
+        self._buckets = dict((name, {}) for name, _ in _INDEX_KEYS)
+        self._buckets['role_id'] = {}
+        self._unindexed = set()
+        self._events = {}
+        self._first_revoked_at = None
+        self.last_revoked_at = None
+
+    def __len__(self):
+        return len(self._events)
+
+    @staticmethod
+    def _fingerprint(event):
+        return tuple(getattr(event, name)
+                     for name in _EVENT_NAMES + _EVENT_ARGS)
+
+    def _bucket_for(self, event):
+        for name, _ in _INDEX_KEYS + [('role_id', None)]:
+            value = getattr(event, name)
+            if value is not None:
+                return self._buckets[name].setdefault(value, set())
+        return self._unindexed
+
+    def add_event(self, event):
+        """Add a revocation event to the index.
+
+        Events that are already in the index are ignored.
+
+        :param event: a RevokeEvent instance
+        :returns: True if the event was added to the index
+
+        """
+        fingerprint = self._fingerprint(event)
+        if fingerprint in self._events:
+            return False
+
+        self._events[fingerprint] = event
+        self._bucket_for(event).add(event)
+        if (self.last_revoked_at is None or
+                event.revoked_at > self.last_revoked_at):
+            self.last_revoked_at = event.revoked_at
+        if (self._first_revoked_at is None or
+                event.revoked_at < self._first_revoked_at):
+            self._first_revoked_at = event.revoked_at
+        return True
+
+    def add_events(self, events):
+        """Add revocation events to the index.
+
+        :param events: a list of RevokeEvent instances
+        :returns: the number of events added to the index
+
+        """
+        return len([event for event in events if self.add_event(event)])
+
+    def remove_event(self, event):
+        """Remove a revocation event from the index.
+
+        :param event: a RevokeEvent instance
+
+        """
+        event = self._events.pop(self._fingerprint(event), None)
+        if event is None:
+            return
+
+        for name, _ in _INDEX_KEYS + [('role_id', None)]:
+            value = getattr(event, name)
+            if value is not None:
+                bucket = self._buckets[name][value]
+                bucket.discard(event)
+                if not bucket:
+                    del self._buckets[name][value]
+                return
+        self._unindexed.discard(event)
+
+    def prune(self, revoked_before):
+        """Remove events revoked before a given time.
+
+        :param revoked_before: events revoked before this time are removed
+        :returns: the number of events removed from the index
+
+        """
+        if (self._first_revoked_at is None or
+                self._first_revoked_at >= revoked_before):
+            return 0
+
+        expired = [event for event in self._events.values()
+                   if event.revoked_at < revoked_before]
+        for event in expired:
+            self.remove_event(event)
+        self._first_revoked_at = min(
+            [event.revoked_at for event in self._events.values()] or [None])
+        return len(expired)
+
+    def _candidates(self, token_values):
+        for name, token_keys in _INDEX_KEYS:
+            bucket = self._buckets[name]
+            for key in token_keys:
+                value = token_values.get(key)
+                if value is not None and value in bucket:
+                    for event in bucket[value]:
+                        yield event
+
+        bucket = self._buckets['role_id']
+        for role_id in token_values.get('roles') or []:
+            for event in bucket.get(role_id, ()):
+                yield event
+
+        for event in self._unindexed:
+            yield event
+
+    def is_revoked(self, token_values):
+        """Check if a token matches a revocation event in the index.
+
+        :param token_values: map based on a flattened view of the token, see
+                             :func:`is_revoked`
+        :returns: True if the token matches a revocation event
+
+        """
+        return any(_matches_token(event, token_values)
+                   for event in self._candidates(token_values))
+
+
+def _constraints(event):
+    return frozenset((name, getattr(event, name)) for name in _EVENT_NAMES
+                     if getattr(event, name) is not None)
+
+
+def subsumes(event, other):
+    """See if a revocation event revokes every token another one revokes.
+
+    A token matches an event if it matches every attribute the event has a
+    value for, each attribute being checked on its own, and if it was issued
+    before the event's ``issued_before``. So an event with a subset of the
+    attributes of another event, with the same values, and a later
+    ``issued_before`` revokes every token the other event revokes. It must
+    also have been revoked later, so that it isn't pruned first.
+
+    :param event: a RevokeEvent instance
+    :param other: a RevokeEvent instance
+    :returns: True if ``other`` is redundant as long as ``event`` is recorded
+
+    """
+    return (event.issued_before >= other.issued_before and
+            event.revoked_at >= other.revoked_at and
+            _constraints(event) <= _constraints(other))
+
+
+def compact_events(events):
+    """Find the revocation events which are subsumed by other events.
+
+    Removing the subsumed events doesn't change which tokens are revoked, see
+    :func:`subsumes`. Of several identical events, only one is kept.
+
+    :param events: a list of RevokeEvent instances
+    :returns: a tuple of the list of events to keep and the list of events
+              subsumed by one of them
+
+    """
+    # NOTE: Events are visited from the latest to the earliest, and from the
+    # broadest to the narrowest among events recorded at the same time, so
+    # every event which could subsume an event has been visited before it.
+    # Subsumption being transitive, comparing events with the events which
+    # are kept is enough, and only the kept events with a subset of the
+    # attributes of an event need to be looked at.
+    ordered = sorted(
+        ((event, _constraints(event)) for event in events),
+        key=lambda item: (item[0].issued_before, item[0].revoked_at,
+                          -len(item[1])),
+        reverse=True)
+
+    kept_by_constraints = {}
+    kept = []
+    subsumed = []
+    for event, constraints in ordered:
+        if any(other.revoked_at >= event.revoked_at
+               for subset in _subsets(constraints)
+               for other in kept_by_constraints.get(subset, ())):
+            subsumed.append(event)
+        else:
+            kept.append(event)
+            kept_by_constraints.setdefault(constraints, []).append(event)
+    return kept, subsumed
+
+
+def _subsets(constraints):
+    subsets = [frozenset()]
+    for constraint in constraints:
+        subsets.extend([subset | {constraint} for subset in subsets])
+    return subsets
+
+
 class _RevokeEventHandler(object):
     # NOTE(morganfainberg): There needs to be reserved "registry" entries set
     # in oslo_serialization for application-specific handlers. We picked 127
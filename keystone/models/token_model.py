@@ -76,6 +76,16 @@ class TokenModel(object):
         self.application_credential_id = None
         self.__application_credential = None
 
+        # Roles and the catalog are resolved lazily and kept along with the
+        # tag of the cache region they were computed from, see ``roles``.
+        self.__roles = None
+        self.__roles_tag = None
+        self.__catalog = None
+        self.__catalog_tag = None
+
+        # The ids of the token cache tags this token was cached with.
+        self.cache_tags = None
+
     def __repr__(self):
         """Return string representation of TokenModel."""
         desc = ('<%(type)s (audit_id=%(audit_id)s, '
@@ -420,8 +430,7 @@ class TokenModel(object):
 
         return roles
 
-    @property
-    def roles(self):
+    def _get_roles(self):
         if self.system_scoped:
             roles = self._get_system_roles()
         elif self.trust_scoped:
@@ -438,6 +447,34 @@ class TokenModel(object):
             roles = []
         return roles
 
+    @property
+    def roles(self):
+        # Resolving roles takes a number of assignment and role lookups, so
+        # they are resolved at most once and then kept with the token, which
+        # includes the copy stored in the token cache. They are only reused
+        # for as long as the computed assignments they were derived from have
+        # not been invalidated.
+        if self.unscoped:
+            return []
+        tag = PROVIDERS.assignment_api.get_computed_assignments_tag()
+        if self.__roles is None or tag is None or tag != self.__roles_tag:
+            self.__roles = self._get_roles()
+            self.__roles_tag = tag
+        return [dict(role) for role in self.__roles]
+
+    @property
+    def catalog(self):
+        tag = PROVIDERS.catalog_api.get_computed_catalog_tag()
+        if self.__catalog is None or tag is None or tag != self.__catalog_tag:
+            user_id = self.user_id
+            if self.trust_id:
+                user_id = self.trust['trustor_user_id']
+            self.__catalog = PROVIDERS.catalog_api.get_v3_catalog(
+                user_id, self.project_id
+            )
+            self.__catalog_tag = tag
+        return self.__catalog
+
     def _validate_token_resources(self):
         if self.project and not self.project.get('enabled'):
             msg = ('Unable to validate token because project %(id)s is '
@@ -209,12 +209,18 @@ class Audit(object):
                   public, reason)
 
 
-def invalidate_token_cache_notification(reason):
+def invalidate_token_cache_notification(reason, tags=None):
     """A specific notification for invalidating the token cache.
 
     :param reason: The specific reason why the token cache is being
                    invalidated.
     :type reason: string
+    :param tags: The tokens to invalidate, as ``(type, id)`` tuples where type
+                 is one of ``user``, ``project``, ``domain``, ``role``,
+                 ``trust``, ``identity_provider`` or ``access_token``. Cached
+                 tokens built from any of them are invalidated. If not given,
+                 the entire token cache is invalidated.
+    :type tags: list
 
     """
     # Since keystone does a lot of work in the authentication and validation
@@ -226,7 +232,9 @@ def invalidate_token_cache_notification(reason):
     # cache DRY, instead of have each subsystem implement their own token cache
     # invalidation strategy or callbacks.
     LOG.debug(reason)
-    resource_id = None
+    # NOTE: The notification is never public, so the tags can be handed to
+    # the callbacks as the affected resource.
+    resource_id = tags
     initiator = None
     public = False
     Audit._emit(
@@ -38,6 +38,10 @@ def get_project_from_domain(domain_ref):
 # details.
 NULL_DOMAIN_ID = '<<keystone.domain.root>>'
 
+# The filters on project tags, which drivers that can satisfy them remove from
+# the hints passed to list_projects() like any other filter.
+TAG_SEARCH_FILTERS = ('tags', 'tags-any', 'not-tags', 'not-tags-any')
+
 
 @six.add_metaclass(abc.ABCMeta)
 class ResourceDriverBase(object):
@@ -12,8 +12,8 @@
 
 from oslo_log import log
 from six import text_type
+import sqlalchemy
 from sqlalchemy import orm
-from sqlalchemy.sql import expression
 
 from keystone.common import driver_hints
 from keystone.common import sql
@@ -80,9 +80,31 @@ class Resource(base.ResourceDriverBase):
         with sql.session_for_read() as session:
             query = session.query(Project)
             query = query.filter(Project.id != base.NULL_DOMAIN_ID)
+            query = self._filter_by_tags(session, query, hints)
+            if hints.stream:
+                return sql.stream_query(Project, query, hints,
+                                        lambda ref: ref.to_dict())
             project_refs = sql.filter_limit_query(Project, query, hints)
             return [project_ref.to_dict() for project_ref in project_refs]
 
+    def _filter_by_tags(self, session, query, hints):
+        for filter_ in list(hints.filters):
+            if filter_['name'] not in base.TAG_SEARCH_FILTERS:
+                continue
+            tags = set(filter_['value'].split(','))
+            tagged = session.query(ProjectTag.project_id).filter(
+                ProjectTag.name.in_(tags))
+            if filter_['name'] in ('tags', 'not-tags'):
+                # Only the projects with all of the tags
+                tagged = tagged.group_by(ProjectTag.project_id).having(
+                    sqlalchemy.func.count(ProjectTag.name) == len(tags))
+            condition = Project.id.in_(tagged.subquery())
+            if filter_['name'].startswith('not-'):
+                condition = sqlalchemy.not_(condition)
+            query = query.filter(condition)
+            hints.filters.remove(filter_)
+        return query
+
     def list_projects_from_ids(self, ids):
         if not ids:
             return []
@@ -124,46 +146,37 @@ class Resource(base.ResourceDriverBase):
         project_refs = query.all()
         return [project_ref.to_dict() for project_ref in project_refs]
 
+    def _is_in_cycle(self, project_id, project_refs):
+        # NOTE: A project that is its own ancestor can only exist if its
+        # parent_id was updated directly in the driver, see _move_subtree.
+        if project_id in [ref.id for ref in project_refs]:
+            msg = ('Circular reference or a repeated '
+                   'entry found in projects hierarchy - '
+                   '%(project_id)s.')
+            LOG.error(msg, {'project_id': project_id})
+            return True
+        return False
+
     def list_projects_in_subtree(self, project_id):
         with sql.session_for_read() as session:
-            children = self._get_children(session, [project_id])
-            subtree = []
-            examined = set([project_id])
-            while children:
-                children_ids = set()
-                for ref in children:
-                    if ref['id'] in examined:
-                        msg = ('Circular reference or a repeated '
-                               'entry found in projects hierarchy - '
-                               '%(project_id)s.')
-                        LOG.error(msg, {'project_id': ref['id']})
-                        return
-                    children_ids.add(ref['id'])
-
-                examined.update(children_ids)
-                subtree += children
-                children = self._get_children(session, children_ids)
-            return subtree
+            query = session.query(Project).join(
+                ProjectClosure, Project.id == ProjectClosure.descendant_id)
+            query = query.filter(ProjectClosure.ancestor_id == project_id)
+            project_refs = query.order_by(ProjectClosure.depth).all()
+            if self._is_in_cycle(project_id, project_refs):
+                return
+            return [project_ref.to_dict() for project_ref in project_refs]
 
     def list_project_parents(self, project_id):
         with sql.session_for_read() as session:
-            project = self._get_project(session, project_id).to_dict()
-            parents = []
-            examined = set()
-            while project.get('parent_id') is not None:
-                if project['id'] in examined:
-                    msg = ('Circular reference or a repeated '
-                           'entry found in projects hierarchy - '
-                           '%(project_id)s.')
-                    LOG.error(msg, {'project_id': project['id']})
-                    return
-
-                examined.add(project['id'])
-                parent_project = self._get_project(
-                    session, project['parent_id']).to_dict()
-                parents.append(parent_project)
-                project = parent_project
-            return parents
+            self._get_project(session, project_id)
+            query = session.query(Project).join(
+                ProjectClosure, Project.id == ProjectClosure.ancestor_id)
+            query = query.filter(ProjectClosure.descendant_id == project_id)
+            project_refs = query.order_by(ProjectClosure.depth).all()
+            if self._is_in_cycle(project_id, project_refs):
+                return
+            return [project_ref.to_dict() for project_ref in project_refs]
 
     def is_leaf_project(self, project_id):
         with sql.session_for_read() as session:
@@ -225,6 +238,72 @@ class Resource(base.ResourceDriverBase):
             valid_ids = list(set(valid_ids) & set(filtered_ids))
         return valid_ids
 
+    # Project closure
+    #
+    # The project_closure table holds a row for every ancestor of every
+    # project, with the number of levels between them, so that the whole
+    # subtree or all the parents of a project are found with a single query.
+    def _get_ancestors(self, session, project_id):
+        query = session.query(ProjectClosure.ancestor_id,
+                              ProjectClosure.depth)
+        return query.filter_by(descendant_id=project_id).all()
+
+    def _add_to_closure(self, session, project_id, parent_id):
+        if parent_id is None:
+            return
+        if self._get_ancestors(session, project_id):
+            # NOTE: Between the expand and contract phases of a rolling
+            # upgrade a database trigger adds the rows of every new project,
+            # for the nodes still running the previous release.
+            return
+        ancestors = [(parent_id, 0)] + self._get_ancestors(session, parent_id)
+        for ancestor_id, depth in ancestors:
+            session.add(ProjectClosure(ancestor_id=ancestor_id,
+                                       descendant_id=project_id,
+                                       depth=depth + 1))
+
+    def _delete_from_closure(self, session, project_ids):
+        query = session.query(ProjectClosure)
+        query.filter(sqlalchemy.or_(
+            ProjectClosure.ancestor_id.in_(project_ids),
+            ProjectClosure.descendant_id.in_(project_ids))).delete(
+                synchronize_session=False)
+
+    def _move_subtree(self, session, project_id, parent_id):
+        query = session.query(ProjectClosure.descendant_id,
+                              ProjectClosure.depth)
+        subtree = dict(query.filter_by(ancestor_id=project_id))
+        subtree[project_id] = 0
+
+        # Detach the subtree from the current parents of the project.
+        old_ancestor_ids = [
+            ancestor_id for ancestor_id, depth in
+            self._get_ancestors(session, project_id)]
+        if old_ancestor_ids:
+            query = session.query(ProjectClosure)
+            query.filter(
+                ProjectClosure.ancestor_id.in_(old_ancestor_ids),
+                ProjectClosure.descendant_id.in_(list(subtree))).delete(
+                    synchronize_session=False)
+
+        if parent_id is None:
+            return
+        if parent_id in subtree:
+            # The project is being moved into its own subtree, which the
+            # manager does not allow. Record the project as its own ancestor
+            # so that the cycle is detected instead of followed.
+            session.add(ProjectClosure(ancestor_id=project_id,
+                                       descendant_id=project_id,
+                                       depth=subtree[parent_id] + 1))
+            return
+
+        ancestors = [(parent_id, 0)] + self._get_ancestors(session, parent_id)
+        for ancestor_id, ancestor_depth in ancestors:
+            for descendant_id, depth in subtree.items():
+                session.add(ProjectClosure(ancestor_id=ancestor_id,
+                                           descendant_id=descendant_id,
+                                           depth=ancestor_depth + depth + 1))
+
     # CRUD
     @sql.handle_conflicts(conflict_type='project')
     def create_project(self, project_id, project):
@@ -232,6 +311,9 @@ class Resource(base.ResourceDriverBase):
         with sql.session_for_write() as session:
             project_ref = Project.from_dict(new_project)
             session.add(project_ref)
+            session.flush()
+            self._add_to_closure(session, project_ref.id,
+                                 project_ref.parent_id)
             return project_ref.to_dict()
 
     @sql.handle_conflicts(conflict_type='project')
@@ -246,6 +328,8 @@ class Resource(base.ResourceDriverBase):
             # been decoded, so we need to re-encode it
             old_project_dict = self._encode_domain_id(old_project_dict)
             new_project = Project.from_dict(old_project_dict)
+            if new_project.parent_id != project_ref.parent_id:
+                self._move_subtree(session, project_id, new_project.parent_id)
             for attr in Project.attributes:
                 if attr != 'id':
                     setattr(project_ref, attr, getattr(new_project, attr))
@@ -256,6 +340,7 @@ class Resource(base.ResourceDriverBase):
     def delete_project(self, project_id):
         with sql.session_for_write() as session:
             project_ref = self._get_project(session, project_id)
+            self._delete_from_closure(session, [project_id])
             session.delete(project_ref)
 
     @sql.handle_conflicts(conflict_type='project')
@@ -271,68 +356,17 @@ class Resource(base.ResourceDriverBase):
                         project_id == base.NULL_DOMAIN_ID):
                     LOG.warning('Project %s does not exist and was not '
                                 'deleted.', project_id)
+            self._delete_from_closure(session, project_ids)
             query.delete(synchronize_session=False)
 
     def check_project_depth(self, max_depth):
         with sql.session_for_read() as session:
-            obj_list = []
-            # Using db table self outerjoin to find the project descendants.
-            #
-            # We'll only outerjoin the project table `max_depth` times to
-            # check whether current project tree exceed the max depth limit.
-            #
-            # For example:
-            #
-            # If max_depth is 2, we will take the outerjoin 2 times, then the
-            # SQL result may be like:
-            #
-            #  +---- +-------------+-------------+-------------+
-            #  | No. | project1_id | project2_id | project3_id |
-            #  +--- -+-------------+-------------+-------------+
-            #  |  1  |  domain_x   |             |             |
-            #  +- ---+-------------+-------------+-------------+
-            #  |  2  |  project_a  |             |             |
-            #  +- ---+-------------+-------------+-------------+
-            #  |  3  |  domain_y   |  project_a  |             |
-            #  +- ---+-------------+-------------+-------------+
-            #  |  4  |  project_b  |  project_c  |             |
-            #  +- ---+-------------+-------------+-------------+
-            #  |  5  |  domain_y   |  project_b  |  project_c  |
-            #  +- ---+-------------+-------------+-------------+
-            #
-            # `project1_id` column is the root. It is a project or a domain.
-            # If `project1_id` is a project, there must exist a line that
-            # `project1` is its domain.
-            #
-            # We got 5 lines here. It includes three scenarios:
-            #
-            # 1). The No.1 line means there is a domain `domain_x` which has no
-            #     children. The depth is 1.
-            #
-            # 2). The No.2 and No.3 lines mean project `project_a` has no child
-            # and its parent is domain `domain_y`. The depth is 2.
-            #
-            # 3). The No.4 and No.5 lines mean project `project_b` has a child
-            #     `project_c` and its parent is domain `domain_y`. The depth is
-            #     3. This tree hit the max depth
-            #
-            # So we can see that if column "project3_id" has value, it means
-            # some trees hit the max depth limit.
-
-            for _ in range(max_depth + 1):
-                obj_list.append(orm.aliased(Project))
-
-            query = session.query(*obj_list)
-
-            for index in range(max_depth):
-                query = query.outerjoin(
-                    obj_list[index + 1],
-                    obj_list[index].id == obj_list[index + 1].parent_id)
-            exceeded_lines = query.filter(
-                obj_list[-1].id != expression.null())
-
-            if exceeded_lines:
-                return [line[max_depth].id for line in exceeded_lines]
+            # A project is beyond the max depth limit if it is `max_depth`
+            # levels below another project or domain, the root of its tree
+            # being at the first level.
+            query = session.query(ProjectClosure.descendant_id).filter(
+                ProjectClosure.depth == max_depth).distinct()
+            return [descendant_id for (descendant_id,) in query]
 
 
 class Project(sql.ModelBase, sql.ModelDictMixinWithExtras):
@@ -406,3 +440,19 @@ class ProjectTag(sql.ModelBase, sql.ModelDictMixin):
         nullable=False, primary_key=True)
     name = sql.Column(sql.Unicode(255), nullable=False, primary_key=True)
     __table_args__ = (sql.UniqueConstraint('project_id', 'name'),)
+
+
+class ProjectClosure(sql.ModelBase, sql.ModelDictMixin):
+    __tablename__ = 'project_closure'
+    attributes = ['ancestor_id', 'descendant_id', 'depth']
+    ancestor_id = sql.Column(
+        sql.String(64), sql.ForeignKey('project.id', ondelete='CASCADE'),
+        primary_key=True)
+    descendant_id = sql.Column(
+        sql.String(64), sql.ForeignKey('project.id', ondelete='CASCADE'),
+        primary_key=True)
+    depth = sql.Column(sql.Integer, nullable=False)
+    __table_args__ = (
+        sql.Index('ix_project_closure_descendant_id_depth', 'descendant_id',
+                  'depth'),
+    )
@@ -27,7 +27,6 @@ from keystone.i18n import _
 from keystone import notifications
 from keystone.resource.backends import base
 from keystone.resource.backends import sql as resource_sql
-from keystone.token import provider as token_provider
 
 CONF = keystone.conf.CONF
 LOG = log.getLogger(__name__)
@@ -35,7 +34,7 @@ MEMOIZE = cache.get_memoization_decorator(group='resource')
 PROVIDERS = provider_api.ProviderAPIs
 
 
-TAG_SEARCH_FILTERS = ('tags', 'tags-any', 'not-tags', 'not-tags-any')
+TAG_SEARCH_FILTERS = base.TAG_SEARCH_FILTERS
 
 
 class Manager(manager.Manager):
@@ -389,14 +388,14 @@ class Manager(manager.Manager):
                 # notification as well
                 if original_project_enabled and not project_enabled:
                     # NOTE(lbragstad): When a domain is disabled, we have to
-                    # invalidate the entire token cache. With persistent
-                    # tokens, we did something similar where all tokens for a
-                    # specific domain were deleted when that domain was
-                    # disabled. This effectively offers the same behavior for
-                    # non-persistent tokens by removing them from the cache and
-                    # requiring the authorization context to be rebuilt the
-                    # next time they're validated.
-                    token_provider.TOKENS_REGION.invalidate()
+                    # invalidate the cached tokens of that domain. With
+                    # persistent tokens, we did something similar where all
+                    # tokens for a specific domain were deleted when that
+                    # domain was disabled. This effectively offers the same
+                    # behavior for non-persistent tokens by removing them from
+                    # the cache and requiring the authorization context to be
+                    # rebuilt the next time they're validated. The token
+                    # provider does this when notified of the disabled domain.
                     notifications.Audit.disabled(self._DOMAIN, project_id,
                                                  public=False)
 
@@ -506,6 +505,7 @@ class Manager(manager.Manager):
         else:
             ret = self.driver.delete_project(project_id)
             self._post_delete_cleanup_project(project_id, project, initiator)
+            projects_ids = [project_id]
 
         reason = (
             'The token cache is being invalidate because project '
@@ -513,7 +513,9 @@ class Manager(manager.Manager):
             'and enforced accordingly the next time users authenticate or '
             'validate a token.' % {'project_id': project_id}
         )
-        notifications.invalidate_token_cache_notification(reason)
+        notifications.invalidate_token_cache_notification(
+            reason, tags=[('project', x) for x in projects_ids]
+        )
         return ret
 
     def _filter_projects_list(self, projects_list, user_id):
@@ -853,19 +855,20 @@ class Manager(manager.Manager):
 
     @manager.response_truncated
     def list_projects(self, hints=None):
-        if hints:
-            tag_filters = {}
-            # Handle project tag filters separately
-            for f in list(hints.filters):
-                if f['name'] in TAG_SEARCH_FILTERS:
-                    tag_filters[f['name']] = f['value']
-                    hints.filters.remove(f)
-            if tag_filters:
-                tag_refs = self.driver.list_projects_by_tags(tag_filters)
-                project_refs = self.driver.list_projects(hints)
-                ref_ids = [ref['id'] for ref in tag_refs]
-                return [ref for ref in project_refs if ref['id'] in ref_ids]
-        return self.driver.list_projects(hints or driver_hints.Hints())
+        hints = hints or driver_hints.Hints()
+        project_refs = self.driver.list_projects(hints)
+        # Handle the project tag filters the driver could not satisfy
+        # separately
+        tag_filters = {}
+        for f in list(hints.filters):
+            if f['name'] in TAG_SEARCH_FILTERS:
+                tag_filters[f['name']] = f['value']
+                hints.filters.remove(f)
+        if tag_filters:
+            tag_refs = self.driver.list_projects_by_tags(tag_filters)
+            ref_ids = set(ref['id'] for ref in tag_refs)
+            return [ref for ref in project_refs if ref['id'] in ref_ids]
+        return project_refs
 
     # NOTE(henry-nash): list_projects_in_domain is actually an internal method
     # and not exposed via the API.  Therefore there is no need to support
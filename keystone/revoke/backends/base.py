@@ -36,6 +36,11 @@ def revoked_before_cutoff_time():
 class RevokeDriverBase(object):
     """Interface for recording and reporting revocation events."""
 
+    # Whether the manager may cache the events listed by the driver until an
+    # event is recorded through it. Drivers serving events that change on
+    # their own must turn this off.
+    cache_events = True
+
     @abc.abstractmethod
     def list_events(self, last_fetch=None, token=None):
         """return the revocation events, as a list of objects.
@@ -61,3 +66,43 @@ class RevokeDriverBase(object):
 
         """
         raise exception.NotImplemented()  # pragma: no cover
+
+    def revoke_events(self, events):
+        """register several revocation events at once.
+
+        Drivers should override this to record every event in a single
+        transaction, the default records them one by one.
+
+        :param events: a list of keystone.revoke.model.RevocationEvent
+
+        """
+        for event in events:
+            self.revoke(event)
+
+    def compact_events(self):
+        """Delete the revocation events subsumed by broader events.
+
+        See :func:`keystone.models.revoke_model.subsumes`. Drivers should
+        override this, the default doesn't delete anything.
+
+        :returns: a tuple of the number of events before compaction and the
+                  number of events deleted
+
+        """
+        return len(self.list_events()), 0
+
+    def prune_events(self, revoked_before, batch_size):
+        """Delete a batch of expired revocation events.
+
+        Drivers which don't remove expired events on their own should
+        override this. It may be called by several keystone processes at the
+        same time.
+
+        :param revoked_before: only events revoked before this time are
+                               deleted
+        :param batch_size: the maximum number of events to delete
+        :returns: the number of events deleted, 0 once there are no expired
+                  events left
+
+        """
+        return 0
@@ -0,0 +1,161 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import time
+
+from oslo_log import log
+
+from keystone.common import fernet_utils
+import keystone.conf
+from keystone import exception
+from keystone.i18n import _
+from keystone.revoke.backends import base
+from keystone.revoke import snapshot
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+
+class Revoke(base.RevokeDriverBase):
+    """Serve revocation events from a snapshot file.
+
+    The snapshot is written by ``keystone-manage revocation_export`` on a
+    node with access to the revocation event table and copied to
+    ``[revoke] snapshot_file``. Nodes which only validate tokens can then
+    check revocations without querying the database.
+
+    The snapshot is reloaded when the file changes, which is detected the
+    same way a Fernet :class:`keystone.common.fernet_utils.KeyRing` detects
+    changes to a key repository. If the file can't be loaded, the previous
+    snapshot is kept until the file changes again. Without any snapshot,
+    tokens can't be validated at all.
+
+    This driver can't record events, so tokens can't be revoked on the nodes
+    using it.
+
+    """
+
+    # The snapshot changes without the manager knowing, so events listed
+    # from it must not be cached.
+    cache_events = False
+
+    def __init__(self):
+        self.path = CONF.revoke.snapshot_file
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None
+        self._loaded_at = None
+
+        # a counter to help operators understand how often the snapshot is
+        # reloaded
+        self.reloads = 0
+
+    def _get_current(self, stamp):
+        current, loaded_stamp, loaded_at = (
+            self._snapshot, self._stamp, self._loaded_at)
+        if current is None or stamp != loaded_stamp:
+            return None
+        # if the file was modified right before it was loaded, the stamp
+        # can't be trusted to reflect later changes
+        if (stamp is not None and
+                stamp[1] / 1e9 >= loaded_at - fernet_utils.RACY_STAMP_WINDOW):
+            return None
+        return current
+
+    @property
+    def snapshot(self):
+        """Return the snapshot loaded from the current file.
+
+        :raises keystone.exception.UnexpectedError: If no snapshot could ever
+            be loaded.
+
+        """
+        stamp = fernet_utils.get_stamp(self.path)
+        current = self._get_current(stamp)
+        if current is not None:
+            return current
+
+        with self._lock:
+            # another thread might have reloaded the snapshot while we waited
+            current = self._get_current(stamp)
+            if current is not None:
+                return current
+
+            loaded_at = time.time()
+            try:
+                with open(self.path, 'rb') as f:
+                    current = snapshot.loads(f.read())
+            except (IOError, OSError, ValueError) as e:
+                if self._snapshot is None:
+                    LOG.error('Unable to load the revocation event snapshot '
+                              'from %(path)s: %(error)s',
+                              {'path': self.path, 'error': e})
+                    raise exception.UnexpectedError(
+                        exception=_('No revocation event snapshot is '
+                                    'available.'))
+                LOG.warning('Unable to load the revocation event snapshot '
+                            'from %(path)s, still using the snapshot created '
+                            'at %(created_at)s: %(error)s',
+                            {'path': self.path,
+                             'created_at': self._snapshot.created_at,
+                             'error': e})
+                # don't try again until the file changes
+                self._stamp, self._loaded_at = stamp, loaded_at
+                return self._snapshot
+
+            if (self._snapshot is not None and
+                    current.checksum == self._snapshot.checksum):
+                current = self._snapshot
+            else:
+                self.reloads += 1
+                LOG.info('Loaded %(count)d revocation events from %(path)s, '
+                         'created at %(created_at)s (reloads: %(reloads)d).',
+                         {'count': len(current.events), 'path': self.path,
+                          'created_at': current.created_at,
+                          'reloads': self.reloads})
+            self._snapshot, self._stamp, self._loaded_at = (
+                current, stamp, loaded_at)
+            return current
+
+    @staticmethod
+    def _may_match(event, token):
+        # Filter events the same way the SQL driver does.
+        if event.issued_before < token['issued_at']:
+            return False
+        if event.user_id is not None and event.user_id not in (
+                token['user_id'], token['trustor_id'], token['trustee_id']):
+            return False
+        if event.project_id is not None and (
+                event.project_id != token['project_id']):
+            return False
+        if event.audit_id is not None and (
+                event.audit_id != token['audit_id']):
+            return False
+        return True
+
+    def list_events(self, last_fetch=None, token=None):
+        events = self.snapshot.events
+        if token:
+            return [event for event in events
+                    if self._may_match(event, token)]
+        if last_fetch:
+            return [event for event in events
+                    if event.revoked_at > last_fetch]
+        return list(events)
+
+    def revoke(self, event):
+        raise exception.NotImplemented(
+            _('Tokens cannot be revoked on a node which serves revocation '
+              'events from a snapshot.'))
@@ -10,13 +10,32 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from oslo_db import api as oslo_db_api
+from oslo_log import log
 import sqlalchemy
 
 from keystone.common import sql
+import keystone.conf
 from keystone.models import revoke_model
 from keystone.revoke.backends import base
 
-from oslo_db import api as oslo_db_api
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+# The columns holding the attributes tokens are matched against.
+_CONSTRAINT_COLUMNS = [attr for attr in revoke_model.REVOKE_KEYS
+                       if attr not in ('issued_before', 'revoked_at')]
+
+# The columns which are indexed along with issued_before. The events
+# subsumed by a new event are only deleted as it is recorded if it is
+# constrained by a single one of them, so that the delete is an index range
+# scan. Other redundant events are left to revocation_compact and the
+# pruner.
+_INDEXED_CONSTRAINT_COLUMNS = ('user_id', 'project_id', 'audit_id')
+
+# The largest number of values in the IN clause of a DELETE statement.
+_DELETE_CHUNK_SIZE = 500
 
 
 class RevocationEvent(sql.ModelBase, sql.ModelDictMixin):
@@ -49,47 +68,6 @@ class RevocationEvent(sql.ModelBase, sql.ModelDictMixin):
 
 
 class Revoke(base.RevokeDriverBase):
-    def _flush_batch_size(self, dialect):
-        batch_size = 0
-        if dialect == 'ibm_db_sa':
-            # This functionality is limited to DB2, because
-            # it is necessary to prevent the transaction log
-            # from filling up, whereas at least some of the
-            # other supported databases do not support update
-            # queries with LIMIT subqueries nor do they appear
-            # to require the use of such queries when deleting
-            # large numbers of records at once.
-            batch_size = 100
-            # Limit of 100 is known to not fill a transaction log
-            # of default maximum size while not significantly
-            # impacting the performance of large token purges on
-            # systems where the maximum transaction log size has
-            # been increased beyond the default.
-        return batch_size
-
-    def _prune_expired_events(self):
-        oldest = base.revoked_before_cutoff_time()
-
-        with sql.session_for_write() as session:
-            dialect = session.bind.dialect.name
-            batch_size = self._flush_batch_size(dialect)
-            if batch_size > 0:
-                query = session.query(RevocationEvent.id)
-                query = query.filter(RevocationEvent.revoked_at < oldest)
-                query = query.limit(batch_size).subquery()
-                delete_query = (session.query(RevocationEvent).
-                                filter(RevocationEvent.id.in_(query)))
-                while True:
-                    rowcount = delete_query.delete(synchronize_session=False)
-                    if rowcount == 0:
-                        break
-            else:
-                query = session.query(RevocationEvent)
-                query = query.filter(RevocationEvent.revoked_at < oldest)
-                query.delete(synchronize_session=False)
-
-            session.flush()
-
     def _list_token_events(self, token):
         with sql.session_for_read() as session:
             query = session.query(RevocationEvent).filter(
@@ -130,12 +108,93 @@ class Revoke(base.RevokeDriverBase):
         else:
             return self._list_last_fetch_events(last_fetch)
 
-    @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
+    @staticmethod
+    def _to_record(event):
+        return dict((attr, getattr(event, attr))
+                    for attr in revoke_model.REVOKE_KEYS)
+
+    def _delete_subsumed_events(self, session, records):
+        # Delete the recorded events subsumed by the events about to be
+        # recorded, see revoke_model.subsumes, if they are constrained by a
+        # single indexed column. Events revoked together usually only differ
+        # by the value of that column, so they are grouped to delete the
+        # events they subsume in a few statements.
+        groups = {}
+        for record in records:
+            columns = [column for column in _CONSTRAINT_COLUMNS
+                       if record[column] is not None]
+            if (len(columns) != 1 or
+                    columns[0] not in _INDEXED_CONSTRAINT_COLUMNS):
+                continue
+            key = (columns[0], record['issued_before'], record['revoked_at'])
+            groups.setdefault(key, []).append(record[columns[0]])
+
+        count = 0
+        for (column, issued_before, revoked_at), values in groups.items():
+            query = session.query(RevocationEvent)
+            query = query.filter(
+                RevocationEvent.issued_before <= issued_before,
+                RevocationEvent.revoked_at <= revoked_at)
+            column = getattr(RevocationEvent, column)
+            for i in range(0, len(values), _DELETE_CHUNK_SIZE):
+                count += query.filter(
+                    column.in_(values[i:i + _DELETE_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
+        return count
+
     def revoke(self, event):
-        kwargs = dict()
-        for attr in revoke_model.REVOKE_KEYS:
-            kwargs[attr] = getattr(event, attr)
-        record = RevocationEvent(**kwargs)
+        self.revoke_events([event])
+
+    @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
+    def revoke_events(self, events):
+        kept, subsumed = revoke_model.compact_events(events)
+        records = [self._to_record(event) for event in kept]
+        with sql.session_for_write() as session:
+            count = self._delete_subsumed_events(session, records)
+            session.bulk_insert_mappings(RevocationEvent, records)
+        if count or subsumed:
+            LOG.debug('Recorded %(recorded)d revocation events, which made '
+                      '%(count)d other events redundant.',
+                      {'recorded': len(records),
+                       'count': count + len(subsumed)})
+
+    @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
+    def compact_events(self):
+        with sql.session_for_read() as session:
+            query = session.query(RevocationEvent)
+            events = {}
+            for row in query:
+                events[row.id] = revoke_model.RevokeEvent(**row.to_dict())
+        ids = dict((id(event), event_id)
+                   for event_id, event in events.items())
+        kept, subsumed = revoke_model.compact_events(list(events.values()))
+
+        # NOTE: The events are deleted in batches, like when they are
+        # pruned. An event which is kept here and deleted by another process
+        # in the meantime was itself subsumed or had expired, which doesn't
+        # make the events it subsumes any more relevant.
+        event_ids = sorted(ids[id(event)] for event in subsumed)
+        batch_size = CONF.revoke.prune_batch_size
+        for i in range(0, len(event_ids), batch_size):
+            with sql.session_for_write() as session:
+                query = session.query(RevocationEvent)
+                query = query.filter(
+                    RevocationEvent.id.in_(event_ids[i:i + batch_size]))
+                query.delete(synchronize_session=False)
+        return len(events), len(event_ids)
+
+    @oslo_db_api.wrap_db_retry(retry_on_deadlock=True)
+    def prune_events(self, revoked_before, batch_size):
+        # NOTE: The IDs are selected first because not every database
+        # supports LIMIT in DELETE statements or their subqueries. Events
+        # deleted by another process in the meantime are simply not counted.
         with sql.session_for_write() as session:
-            session.add(record)
-            self._prune_expired_events()
+            query = session.query(RevocationEvent.id)
+            query = query.filter(RevocationEvent.revoked_at < revoked_before)
+            query = query.order_by(RevocationEvent.revoked_at)
+            event_ids = [event_id for event_id, in query.limit(batch_size)]
+            if not event_ids:
+                return 0
+            query = session.query(RevocationEvent)
+            query = query.filter(RevocationEvent.id.in_(event_ids))
+            return query.delete(synchronize_session=False)
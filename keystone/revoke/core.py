@@ -12,6 +12,14 @@
 
 """Main entry point into the Revoke service."""
 
+import datetime
+import threading
+import time
+import uuid
+
+from oslo_log import log
+from oslo_utils import timeutils
+
 from keystone.common import cache
 from keystone.common import manager
 import keystone.conf
@@ -19,9 +27,13 @@ from keystone import exception
 from keystone.i18n import _
 from keystone.models import revoke_model
 from keystone import notifications
+from keystone.revoke.backends import base
+from keystone.revoke import pruner
+from keystone.revoke import snapshot
 
 
 CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
 
 # This builds a discrete cache region dedicated to revoke events. The API can
 # return a filtered list based upon last fetchtime. This is deprecated but
@@ -44,17 +56,24 @@ class Manager(manager.Manager):
 
     driver_namespace = 'keystone.revoke'
     _provides_api = 'revoke_api'
+    _REVOCATION_BATCH = 'revocation_batch'
 
     def __init__(self):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = revoke_model
+        self._index = revoke_model.RevokeIndex()
+        self._index_lock = threading.Lock()
+        self._index_loaded = False
+        self._pruner = pruner.EventPruner(self.prune_expired_events)
 
     @MEMOIZE
     def _list_events(self, last_fetch):
         return self.driver.list_events(last_fetch)
 
     def list_events(self, last_fetch=None):
+        if not self.driver.cache_events:
+            return self.driver.list_events(last_fetch)
         return self._list_events(last_fetch)
 
     def _user_callback(self, service, resource_type, operation,
@@ -109,8 +128,12 @@ class Manager(manager.Manager):
                     'current request is aborted.')
             raise exception.UnexpectedError(exception=msg)
 
-    def revoke_by_audit_id(self, audit_id):
-        self.revoke(revoke_model.RevokeEvent(audit_id=audit_id))
+    def revoke_by_audit_id(self, audit_id, user_id=None):
+        # NOTE: Recording the user of the token doesn't change which tokens
+        # are revoked, since audit IDs are unique, but lets a later event
+        # revoking every token of the user make this one redundant.
+        self.revoke(revoke_model.RevokeEvent(audit_id=audit_id,
+                                             user_id=user_id))
 
     def revoke_by_audit_chain_id(self, audit_chain_id, project_id=None,
                                  domain_id=None):
@@ -122,6 +145,29 @@ class Manager(manager.Manager):
                                              domain_id=domain_id,
                                              project_id=project_id))
 
+    def _fetch_new_events(self):
+        """Fetch the revocation events missing from the in-memory index.
+
+        The first call loads every revocation event from the backend. After
+        that, only the events revoked since the newest event in the index are
+        fetched, through the cached ``list_events``. Since the revoke cache
+        region is invalidated whenever an event is recorded, this costs a
+        single cache lookup when nothing has been revoked.
+
+        This runs without holding the index lock. Reading a stale state of
+        the index only fetches events the index already has, which it
+        ignores.
+
+        """
+        if not self._index_loaded:
+            return self.driver.list_events()
+        last_revoked_at = self._index.last_revoked_at
+        if last_revoked_at is not None:
+            overlap = datetime.timedelta(
+                seconds=CONF.revoke.index_fetch_overlap)
+            return self.list_events(last_fetch=last_revoked_at - overlap)
+        return self.list_events()
+
     def check_token(self, token):
         """Check the values from a token against the revocation list.
 
@@ -132,10 +178,157 @@ class Manager(manager.Manager):
         :raises keystone.exception.TokenNotFound: If the token is invalid.
 
         """
-        if revoke_model.is_revoked(self.driver.list_events(token=token),
-                                   token):
+        self._pruner.start()
+        # NOTE: Fetching events is a cache or database round trip, so it's
+        # done before taking the lock to keep validations from queuing up
+        # behind each other.
+        events = self._fetch_new_events()
+        with self._index_lock:
+            self._index.add_events(events)
+            self._index_loaded = True
+            self._index.prune(base.revoked_before_cutoff_time())
+            revoked = self._index.is_revoked(token)
+        if revoked:
             raise exception.TokenNotFound(_('Failed to validate token'))
 
     def revoke(self, event):
+        self._pruner.start()
         self.driver.revoke(event)
         REVOKE_REGION.invalidate()
+
+    def revoke_events(self, events, initiator=None):
+        """Record several revocation events at once.
+
+        Every event is recorded in a single transaction, the revocation
+        caches are invalidated once and a single notification is emitted for
+        all of them.
+
+        :param events: a list of ``RevokeEvent`` objects
+        :param initiator: CADF representation of the user that requested the
+                          revocation
+        :returns: the recorded events
+
+        """
+        events = list(events)
+        if not events:
+            return events
+        for event in events:
+            self._assert_not_domain_and_project_scoped(
+                domain_id=event.domain_id, project_id=event.project_id)
+
+        self._pruner.start()
+        self.driver.revoke_events(events)
+        REVOKE_REGION.invalidate()
+
+        batch_id = uuid.uuid4().hex
+        LOG.info('Recorded %(count)d revocation events as batch %(batch)s.',
+                 {'count': len(events), 'batch': batch_id})
+        notifications.Audit.created(self._REVOCATION_BATCH, batch_id,
+                                    initiator)
+        return events
+
+    def revoke_by_users(self, user_ids, initiator=None):
+        return self.revoke_events(
+            self._build_events('user_id', user_ids), initiator=initiator)
+
+    def revoke_by_audit_ids(self, audit_ids, initiator=None):
+        return self.revoke_events(
+            self._build_events('audit_id', audit_ids), initiator=initiator)
+
+    @staticmethod
+    def _build_events(attribute, values):
+        # events revoked together share the same revocation time
+        revoked_at = timeutils.utcnow().replace(microsecond=0)
+        return [revoke_model.RevokeEvent(revoked_at=revoked_at,
+                                         **{attribute: value})
+                for value in values]
+
+    def compact_events(self):
+        """Delete the revocation events subsumed by broader events.
+
+        An event is subsumed by another one if the other one revokes every
+        token it revokes, and will be kept at least as long, see
+        :func:`keystone.models.revoke_model.subsumes`. Events revoking a
+        user, a project or a token are also compacted as they are recorded,
+        this catches up with the other events, with the events recorded
+        before that, or by other drivers.
+
+        :returns: a tuple of the number of events before compaction and the
+                  number of events deleted
+
+        """
+        total, removed = self.driver.compact_events()
+        if removed:
+            REVOKE_REGION.invalidate()
+        LOG.info('Deleted %(removed)d of %(total)d revocation events, which '
+                 'were subsumed by other events.',
+                 {'removed': removed, 'total': total})
+        return total, removed
+
+    def export_events(self, path):
+        """Write a snapshot of the active revocation events to a file.
+
+        Expired events are left out and the remaining events are compacted,
+        see :meth:`compact_events`. The snapshot records the latest
+        ``revoked_at`` of the events read as its high-water mark, every event
+        revoked until then is accounted for.
+
+        :param path: the file to write the snapshot to, it is replaced
+                     atomically
+        :returns: a tuple of the number of events written and the high-water
+                  mark, which is None if there are no events
+
+        """
+        created_at = timeutils.utcnow()
+        events = self.driver.list_events()
+        high_water_mark = max([event.revoked_at for event in events] or
+                              [None])
+        cutoff = base.revoked_before_cutoff_time()
+        events, subsumed = revoke_model.compact_events(
+            [event for event in events if event.revoked_at >= cutoff])
+        events.sort(key=lambda event: event.revoked_at)
+
+        snapshot.write(path, snapshot.dumps(events, high_water_mark,
+                                            created_at))
+        LOG.info('Exported %(count)d revocation events to %(path)s, with a '
+                 'high-water mark of %(high_water_mark)s.',
+                 {'count': len(events), 'path': path,
+                  'high_water_mark': high_water_mark})
+        return len(events), high_water_mark
+
+    def prune_expired_events(self, batch_size=None, batch_delay=None,
+                             progress=None):
+        """Delete the revocation events which can't match a valid token.
+
+        The events are deleted in batches, each in its own transaction, until
+        there are none left. This is safe to run on several keystone nodes at
+        once.
+
+        :param batch_size: the maximum number of events deleted per batch,
+                           defaults to ``[revoke] prune_batch_size``
+        :param batch_delay: the number of seconds to wait between batches,
+                            defaults to ``[revoke] prune_batch_delay``
+        :param progress: a callable called with the total number of deleted
+                         events after every batch which deleted events
+        :returns: the total number of deleted events
+
+        """
+        if batch_size is None:
+            batch_size = CONF.revoke.prune_batch_size
+        if batch_delay is None:
+            batch_delay = CONF.revoke.prune_batch_delay
+        revoked_before = base.revoked_before_cutoff_time()
+
+        total = 0
+        while True:
+            count = self.driver.prune_events(revoked_before, batch_size)
+            if not count:
+                break
+            total += count
+            LOG.debug('Deleted %(count)d expired revocation events, '
+                      '%(total)d so far.', {'count': count, 'total': total})
+            if progress is not None:
+                progress(total)
+            if batch_delay:
+                time.sleep(batch_delay)
+        return total
@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Delete expired revocation events in the background."""
+
+import os
+import random
+import threading
+
+from oslo_log import log
+
+import keystone.conf
+
+
+CONF = keystone.conf.CONF
+LOG = log.getLogger(__name__)
+
+
+class EventPruner(object):
+    """Periodically delete the revocation events which have expired.
+
+    Expired events are deleted by calling ``prune`` every ``[revoke]
+    prune_interval`` seconds from a thread, instead of while tokens are
+    revoked. ``prune`` deletes the events in batches and returns how many it
+    deleted.
+
+    Every keystone process runs its own pruner, so ``prune`` must be safe to
+    run on several processes and nodes at once. The first run is delayed by a
+    random fraction of the interval so that processes started together don't
+    all prune at the same time.
+
+    """
+
+    def __init__(self, prune):
+        self._prune = prune
+        self._lock = threading.Lock()
+        self._pruner = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the pruning thread of this process, unless it's running."""
+        if not CONF.revoke.prune_interval:
+            return
+        # NOTE: Threads don't survive forking, so every keystone process
+        # starts its own pruner the first time it deals with revocations.
+        pid = os.getpid()
+        if self._pruner is not None and self._pruner[0] == pid:
+            return
+        with self._lock:
+            if self._pruner is not None and self._pruner[0] == pid:
+                return
+            thread = threading.Thread(target=self._run,
+                                      name='revocation-event-pruner')
+            thread.daemon = True
+            self._pruner = (pid, thread)
+            thread.start()
+
+    def stop(self):
+        """Stop the pruning thread, if any."""
+        self._stopped.set()
+
+    def _run(self):
+        delay = random.uniform(0, CONF.revoke.prune_interval)
+        while not self._stopped.wait(delay):
+            try:
+                count = self._prune()
+            except Exception:
+                LOG.exception('Unable to delete expired revocation events, '
+                              'will retry.')
+            else:
+                if count:
+                    LOG.info('Deleted %d expired revocation events.', count)
+            delay = CONF.revoke.prune_interval or 1
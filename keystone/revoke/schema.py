@@ -0,0 +1,46 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from keystone.common.validation import parameter_types
+
+# The largest number of events which can be revoked in a single request.
+MAX_REVOKE_EVENTS = 10000
+
+_audit_id_string = {
+    'type': 'string',
+    'minLength': 1,
+    'maxLength': 32,
+    'pattern': '^[a-zA-Z0-9-_]+$'
+}
+
+_revoke_event = {
+    'type': 'object',
+    'properties': {
+        'user_id': parameter_types.id_string,
+        'project_id': parameter_types.id_string,
+        'domain_id': parameter_types.id_string,
+        'trust_id': parameter_types.id_string,
+        'audit_id': _audit_id_string,
+        'audit_chain_id': _audit_id_string
+    },
+    'additionalProperties': False,
+    'minProperties': 1,
+    # a revocation event can't be both project and domain scoped
+    'not': {'required': ['project_id', 'domain_id']}
+}
+
+revoke_events_create = {
+    'type': 'array',
+    'items': _revoke_event,
+    'minItems': 1,
+    'maxItems': MAX_REVOKE_EVENTS
+}
@@ -0,0 +1,165 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Read and write snapshots of revocation events.
+
+A snapshot is a header line followed by a JSON document::
+
+    keystone-revocation-snapshot <version> <sha256 of the document>
+    {"created_at": ..., "events": [...], "fields": [...], ...}
+
+Each event is written as a list of values, in the order of ``fields``, which
+keeps snapshots small. The checksum lets readers detect snapshots that were
+truncated or corrupted while being copied to other nodes.
+
+"""
+
+import collections
+import datetime
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+from keystone.models import revoke_model
+
+
+FORMAT_VERSION = 1
+
+_MAGIC = 'keystone-revocation-snapshot'
+
+# The attributes of the events, in the order they are written in.
+_FIELDS = revoke_model.REVOKE_KEYS
+_TIME_FIELDS = ('expires_at', 'issued_before', 'revoked_at')
+
+# Times are written as microseconds since the epoch, which is shorter and
+# faster to parse than ISO 8601 strings.
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+Snapshot = collections.namedtuple(
+    'Snapshot', ['events', 'high_water_mark', 'created_at', 'checksum'])
+
+
+def _format_time(value):
+    if value is None:
+        return None
+    delta = value - _EPOCH
+    return ((delta.days * 86400 + delta.seconds) * 1000000 +
+            delta.microseconds)
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    return _EPOCH + datetime.timedelta(microseconds=value)
+
+
+def _event_to_row(event):
+    values = dict((name, getattr(event, name)) for name in _FIELDS)
+    # NOTE: RevokeEvent keeps the domain of domain scoped token revocations
+    # in domain_scope_id, and puts it back there when the event is loaded.
+    values['domain_id'] = event.domain_id or event.domain_scope_id
+    for name in _TIME_FIELDS:
+        values[name] = _format_time(values[name])
+    return [values[name] for name in _FIELDS]
+
+
+def _row_to_event(fields, row):
+    values = dict(zip(fields, row))
+    for name in _TIME_FIELDS:
+        values[name] = _parse_time(values.get(name))
+    return revoke_model.RevokeEvent(**values)
+
+
+def dumps(events, high_water_mark, created_at):
+    """Serialize revocation events to a snapshot.
+
+    :param events: a list of RevokeEvent instances
+    :param high_water_mark: the latest ``revoked_at`` of the events the
+                            snapshot was built from, or None
+    :param created_at: the time the events were read at
+    :returns: the snapshot, as bytes
+
+    """
+    document = json.dumps({
+        'version': FORMAT_VERSION,
+        'created_at': _format_time(created_at),
+        'high_water_mark': _format_time(high_water_mark),
+        'fields': _FIELDS,
+        'events': [_event_to_row(event) for event in events],
+    }, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    header = '%s %d %s\n' % (_MAGIC, FORMAT_VERSION,
+                             hashlib.sha256(document).hexdigest())
+    return header.encode('ascii') + document
+
+
+def loads(data):
+    """Deserialize a snapshot.
+
+    :param data: the snapshot, as bytes
+    :returns: a :class:`Snapshot`
+    :raises ValueError: if the data isn't a valid snapshot
+
+    """
+    header, _sep, document = data.partition(b'\n')
+    try:
+        magic, version, checksum = header.decode('ascii').split(' ')
+    except (UnicodeDecodeError, ValueError):
+        raise ValueError('Not a revocation event snapshot.')
+    if magic != _MAGIC:
+        raise ValueError('Not a revocation event snapshot.')
+    if version != str(FORMAT_VERSION):
+        raise ValueError('Unsupported revocation event snapshot version %s.'
+                         % version)
+    if hashlib.sha256(document).hexdigest() != checksum:
+        raise ValueError('The revocation event snapshot does not match its '
+                         'checksum, it may be truncated or corrupted.')
+
+    document = json.loads(document.decode('utf-8'))
+    fields = document['fields']
+    events = [_row_to_event(fields, row) for row in document['events']]
+    return Snapshot(events=events,
+                    high_water_mark=_parse_time(document['high_water_mark']),
+                    created_at=_parse_time(document['created_at']),
+                    checksum=checksum)
+
+
+def write(path, data):
+    """Replace a snapshot file atomically.
+
+    The snapshot is written to a temporary file in the same directory, which
+    is then renamed, so readers see either the previous or the new snapshot
+    in full. The snapshot keeps the mode of the file it replaces, and is only
+    readable by its owner and group otherwise, since it lists the users,
+    projects and tokens of every active revocation event.
+
+    :param path: the path of the snapshot file
+    :param data: the snapshot, as bytes
+
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = 0o640
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.%s.' % filename)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
@@ -19,6 +19,7 @@ from keystone import assignment
 from keystone import auth
 from keystone import catalog
 from keystone.common import cache
+from keystone.common import etag
 from keystone.common import provider_api
 from keystone import credential
 from keystone import endpoint_policy
@@ -47,6 +48,7 @@ def load_backends():
     cache.configure_cache(region=token.provider.TOKENS_REGION)
     cache.configure_cache(region=receipt.provider.RECEIPTS_REGION)
     cache.configure_cache(region=identity.ID_MAPPING_REGION)
+    cache.configure_cache(region=identity.LOCKOUT_REGION, local_caches=False)
     cache.configure_invalidation_region()
 
     managers = [access_rules_config.Manager,
@@ -62,6 +64,7 @@ def load_backends():
                 token.provider.Manager]
 
     drivers = {d._provides_api: d() for d in managers}
+    etag.VersionTracker()
 
     # NOTE(morgan): lock the APIs, these should only ever be instantiated
     # before running keystone.
@@ -27,10 +27,12 @@ from oslo_log import versionutils
 from oslo_serialization import jsonutils
 import six
 from six.moves import http_client
+from six.moves import urllib
 
 from keystone.common import authorization
 from keystone.common import context
 from keystone.common import driver_hints
+from keystone.common import etag
 from keystone.common import json_home
 from keystone.common.rbac_enforcer import enforcer
 from keystone.common import utils
@@ -650,18 +652,27 @@ class ResourceBase(flask_restful.Resource):
                                 class attribute. This is to be used when
                                 wrapping a collection for a different api,
                                 e.g. 'roles' from the 'trust' api.
+
+        If the hints ask for streaming, refs may be any iterable and a
+        response writing the collection as refs is consumed is returned
+        instead, see stream_collection.
         """
+        collection = collection_name or cls.collection_key
+
+        if hints is not None and hints.stream:
+            return cls.stream_collection(refs, hints, collection)
+
         # Check if there are any filters in hints that were not handled by
         # the drivers. The driver will not have paginated or limited the
         # output if it found there were filters it was unable to handle
 
+        refs = list(refs)
         if hints:
             refs = cls.filter_by_attributes(refs, hints)
+            refs = cls.paginate(refs, hints)
 
         list_limited, refs = cls.limit(refs, hints)
 
-        collection = collection_name or cls.collection_key
-
         for ref in refs:
             cls._add_self_referential_link(ref, collection_name=collection)
 
@@ -674,9 +685,115 @@ class ResourceBase(flask_restful.Resource):
         }
         if list_limited:
             container['truncated'] = True
+            if hints.marker is not None and refs:
+                container['links']['next'] = cls.next_page_url(
+                    refs[-1]['id'])
 
         return container
 
+    @classmethod
+    def stream_collection(cls, refs, hints, collection):
+        """Stream a collection, checking for filtering and pagination.
+
+        The members of the collection are filtered, limited and serialized one
+        at a time as refs is consumed, so the drivers may return iterators
+        reading them in batches. The 'links' and 'truncated' attributes of the
+        collection are written last, since whether the drivers truncated the
+        list is only known once it has been read.
+
+        :param refs: an iterable over the members of the collection
+        :param hints: list hints, containing any relevant filters and limit.
+        :param collection: the collection key
+
+        :returns: a streamed response
+
+        """
+        if hints.filters:
+            refs = (ref for ref in refs
+                    if cls.filter_by_attributes([ref], hints))
+        refs = cls.paginate(refs, hints)
+        list_limit = hints.limit['limit'] if hints.limit else None
+        self_url = full_url(flask.request.environ['PATH_INFO'])
+
+        def generate():
+            yield '{"%s": [' % collection
+            count = 0
+            last_ref = None
+            list_limited = False
+            for ref in refs:
+                if count == list_limit:
+                    list_limited = True
+                    break
+                cls._add_self_referential_link(ref, collection_name=collection)
+                yield (', ' if count else '') + jsonutils.dumps(ref)
+                count += 1
+                last_ref = ref
+
+            if hints.limit and hints.limit['truncated']:
+                list_limited = True
+            links = {'next': None, 'self': self_url, 'previous': None}
+            if list_limited and hints.marker is not None and last_ref:
+                links['next'] = cls.next_page_url(last_ref['id'])
+            tail = ['"links": %s' % jsonutils.dumps(links)]
+            if list_limited:
+                tail.append('"truncated": true')
+            yield '], %s}\n' % ', '.join(tail)
+
+        return flask.Response(flask.stream_with_context(generate()),
+                              mimetype='application/json')
+
+    @staticmethod
+    def next_page_url(marker):
+        """Build the URL of the next page of a paginated collection.
+
+        :param marker: the ID of the last entity of the current page
+        :returns: the URL of the current request, with the marker replaced
+
+        """
+        args = [(key, value)
+                for key, value in flask.request.args.items(multi=True)
+                if key != 'marker']
+        args.append(('marker', marker))
+        return '%s?%s' % (base_url(flask.request.environ['PATH_INFO']),
+                          urllib.parse.urlencode(args))
+
+    @staticmethod
+    def check_etag(resource_types, *keys):
+        """Handle a conditional GET of a response built from collections.
+
+        The ETag of the response is computed from the current versions of the
+        collections, the URL requested and the scope of the caller, so this
+        must be called after the request is enforced but before the
+        collections are read. Unless the response is not modified, the ETag
+        is set on it once it is built.
+
+        :param resource_types: the types of the entities the response is
+                               built from
+        :param keys: anything else the response depends on
+        :returns: a ``304 Not Modified`` response if the client already has
+                  the current response, None otherwise
+
+        """
+        versions = etag.get_versions(resource_types)
+        if versions is None:
+            return None
+        ctx = flask.request.environ.get(context.REQUEST_CONTEXT_ENV)
+        value = etag.compute_etag(
+            versions, flask.request.url, ctx.user_id, ctx.project_id,
+            ctx.domain_id, ctx.system_scope, *keys)
+        if flask.request.if_none_match.contains_weak(value):
+            response = flask.Response(status=http_client.NOT_MODIFIED)
+            response.set_etag(value)
+            return response
+
+        @flask.after_this_request
+        def set_etag(response):
+            if response.status_code == http_client.OK:
+                response.set_etag(value)
+            return response
+
+        return None
+
     @classmethod
     def wrap_member(cls, ref, collection_name=None, member_name=None):
         cls._add_self_referential_link(ref, collection_name)
@@ -708,11 +825,14 @@ class ResourceBase(flask_restful.Resource):
 
             We test explicitly for a value that defines it as 'False',
             which also means that the existence of the attribute with
-            no value implies 'True'
+            no value implies 'True'. A list-valued attribute matches if it
+            contains the value, as it does when filtered by the SQL backends.
 
             """
             if type(ref_attr) is bool:
                 return ref_attr == utils.attr_as_boolean(val_attr)
+            elif isinstance(ref_attr, list):
+                return val_attr in ref_attr
             else:
                 return ref_attr == val_attr
 
@@ -813,19 +933,57 @@ class ResourceBase(flask_restful.Resource):
         return flask.request.get_json(silent=True, force=True) or {}
 
     @staticmethod
-    def build_driver_hints(supported_filters):
+    def build_pagination_hints(hints):
+        """Add the pagination directives of the query string to hints.
+
+        Listing is paginated if either a ``marker`` or a ``limit`` is given.
+
+        :param hints: the list hints to add the marker and limit to
+        :raises keystone.exception.ValidationError: if the limit is not a
+                                                    positive integer.
+
+        """
+        marker = flask.request.args.get('marker')
+        limit = flask.request.args.get('limit')
+        if marker is None and limit is None:
+            return
+        hints.set_marker(marker)
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                msg = _('limit must be a positive integer')
+                raise exception.ValidationError(message=msg)
+            hints.set_limit(limit)
+
+    @staticmethod
+    def build_driver_hints(supported_filters, paginate=False, stream=False):
         """Build list hints based on the context query string.
 
         :param supported_filters: list of filters supported, so ignore any
                                   keys in query_dict that are not in this list.
+        :param paginate: whether the ``marker`` and ``limit`` keys are
+                         pagination directives rather than filters.
+        :param stream: whether the caller can stream the collection, which it
+                       then does if ``[DEFAULT] stream_list_responses`` is
+                       set.
 
         """
         hints = driver_hints.Hints()
+        hints.stream = stream and CONF.stream_list_responses
 
         if not flask.request.args:
             return hints
 
+        if paginate:
+            ResourceBase.build_pagination_hints(hints)
+
         for key, value in flask.request.args.items(multi=True):
+            if paginate and key in ('marker', 'limit'):
+                continue
+
             # Check if this is an exact filter
             if supported_filters is None or key in supported_filters:
                 hints.add_filter(key, value)
@@ -861,11 +1019,32 @@ class ResourceBase(flask_restful.Resource):
                                  comparator=comparator,
                                  case_sensitive=case_sensitive)
 
-        # NOTE(henry-nash): If we were to support pagination, we would pull any
-        # pagination directives out of the query_dict here, and add them into
-        # the hints list.
         return hints
 
+    @classmethod
+    def paginate(cls, refs, hints):
+        """Order a list of entities by ID, starting after the marker.
+
+        The underlying driver layer may have already done so for us, in which
+        case the list is left as it is.
+
+        :param refs: the list of members of the collection
+        :param hints: hints, containing, among other things, the marker
+                      requested
+
+        :returns: the list of entities after the marker, in ID order.
+
+        """
+        if hints.marker is None or hints.marker['ordered']:
+            return refs
+
+        refs = sorted(refs, key=lambda ref: ref['id'])
+        marker = hints.marker['marker']
+        if marker is not None:
+            refs = [ref for ref in refs if ref['id'] > marker]
+        hints.marker['ordered'] = True
+        return refs
+
     @classmethod
     def limit(cls, refs, hints):
         """Limit a list of entities.
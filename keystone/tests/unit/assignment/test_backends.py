@@ -589,16 +589,71 @@ class AssignmentTests(AssignmentTestHelperMixin):
             role_id=uuid.uuid4().hex)
         self.assertEqual([], assignment_list)
 
-    def test_list_role_assignments_user_not_found(self):
-        def _user_not_found(value):
-            raise exception.UserNotFound(user_id=value)
+    def test_list_role_assignments_include_names_in_bulk(self):
+        domain = unit.new_domain_ref()
+        PROVIDERS.resource_api.create_domain(domain['id'], domain)
+        role = unit.new_role_ref(domain_id=domain['id'])
+        PROVIDERS.role_api.create_role(role['id'], role)
+        group = PROVIDERS.identity_api.create_group(
+            unit.new_group_ref(domain_id=domain['id']))
+        users = [
+            PROVIDERS.identity_api.create_user(
+                unit.new_user_ref(domain_id=domain['id']))
+            for _ in range(10)]
+        projects = [unit.new_project_ref(domain_id=domain['id'])
+                    for _ in range(5)]
+        for project in projects:
+            PROVIDERS.resource_api.create_project(project['id'], project)
+            for user in users:
+                PROVIDERS.assignment_api.create_grant(
+                    role['id'], user_id=user['id'], project_id=project['id'])
+        PROVIDERS.assignment_api.create_grant(
+            default_fixtures.MEMBER_ROLE_ID, group_id=group['id'],
+            domain_id=domain['id'])
+
+        # The names are resolved without getting the entities one by one.
+        single_getters = []
+        for api, getter in [(PROVIDERS.identity_api, 'get_user'),
+                            (PROVIDERS.identity_api, 'get_group'),
+                            (PROVIDERS.resource_api, 'get_project'),
+                            (PROVIDERS.resource_api, 'get_domain'),
+                            (PROVIDERS.role_api, 'get_role')]:
+            patcher = mock.patch.object(api, getter)
+            single_getters.append(patcher.start())
+            self.addCleanup(patcher.stop)
+        assignments = PROVIDERS.assignment_api.list_role_assignments(
+            include_names=True)
+        for getter in single_getters:
+            getter.assert_not_called()
+
+        user_names = dict((user['id'], user['name']) for user in users)
+        project_names = dict(
+            (project['id'], project['name']) for project in projects)
+        user_assignments = [a for a in assignments
+                            if a.get('user_id') in user_names]
+        self.assertThat(user_assignments, matchers.HasLength(50))
+        for assignment in user_assignments:
+            self.assertEqual(user_names[assignment['user_id']],
+                             assignment['user_name'])
+            self.assertEqual(domain['name'], assignment['user_domain_name'])
+            self.assertEqual(project_names[assignment['project_id']],
+                             assignment['project_name'])
+            self.assertEqual(domain['name'],
+                             assignment['project_domain_name'])
+            self.assertEqual(role['name'], assignment['role_name'])
+            self.assertEqual(domain['name'], assignment['role_domain_name'])
+        group_assignment, = [a for a in assignments
+                             if a.get('group_id') == group['id']]
+        self.assertEqual(group['name'], group_assignment['group_name'])
+        self.assertEqual(domain['name'], group_assignment['domain_name'])
 
-        # Note(knikolla): Patch get_user to return UserNotFound
+    def test_list_role_assignments_user_not_found(self):
+        # Note(knikolla): Patch list_users_from_ids to find no users
         # this simulates the possibility of a user being deleted
         # directly in the backend and still having lingering role
         # assignments.
-        with mock.patch.object(PROVIDERS.identity_api, 'get_user',
-                               _user_not_found):
+        with mock.patch.object(PROVIDERS.identity_api, 'list_users_from_ids',
+                               return_value=[]):
             assignment_list = PROVIDERS.assignment_api.list_role_assignments(
                 include_names=True
             )
@@ -639,11 +694,11 @@ class AssignmentTests(AssignmentTestHelperMixin):
         num_assignments = len(PROVIDERS.assignment_api.list_role_assignments())
         self.assertEqual(1, num_assignments)
 
-        # Patch get_group to return GroupNotFound, allowing us to confirm
-        # that the exception is handled properly when include_names processing
-        # attempts to lookup a group that has been deleted in the backend
-        with mock.patch.object(PROVIDERS.identity_api, 'get_group',
-                               _group_not_found):
+        # Patch list_groups_from_ids to find no groups, allowing us to confirm
+        # that include_names processing handles a group that has been deleted
+        # in the backend
+        with mock.patch.object(PROVIDERS.identity_api, 'list_groups_from_ids',
+                               return_value=[]):
             assignment_list = PROVIDERS.assignment_api.list_role_assignments(
                 include_names=True
             )
@@ -3925,6 +3980,62 @@ class ImpliedRoleTests(AssignmentTestHelperMixin):
         }
         self.execute_assignment_plan(test_plan)
 
+    def _create_roles(self, count):
+        role_ids = []
+        for _ in range(count):
+            role = unit.new_role_ref()
+            PROVIDERS.role_api.create_role(role['id'], role)
+            role_ids.append(role['id'])
+        return role_ids
+
+    def test_deep_implied_roles_for_many_assignments(self):
+        # A chain of 20 roles, each implying the next one, and a user with
+        # the top level role on 300 projects.
+        role_ids = self._create_roles(20)
+        for prior_role_id, implied_role_id in zip(role_ids, role_ids[1:]):
+            PROVIDERS.role_api.create_implied_role(
+                prior_role_id, implied_role_id)
+        user_id = uuid.uuid4().hex
+        refs = [{'user_id': user_id, 'project_id': uuid.uuid4().hex,
+                 'role_id': role_ids[0]} for _ in range(300)]
+
+        driver = PROVIDERS.role_api.driver
+        with mock.patch.object(
+                driver, 'list_role_inference_rules',
+                wraps=driver.list_role_inference_rules) as list_rules:
+            with mock.patch.object(driver, 'list_implied_roles',
+                                   side_effect=AssertionError):
+                results = PROVIDERS.assignment_api.add_implied_roles(refs)
+                PROVIDERS.assignment_api.add_implied_roles(refs)
+
+        # The inference rules are only read once, to build the closure.
+        self.assertEqual(1, list_rules.call_count)
+        self.assertThat(results, matchers.HasLength(300 * 20))
+        self.assertEqual(refs, results[:300])
+        self.assertEqual(
+            {'user_id': user_id, 'project_id': refs[0]['project_id'],
+             'role_id': role_ids[19], 'indirect': {'role_id': role_ids[18]}},
+            results[318])
+        # The refs passed in are left untouched.
+        self.assertNotIn('indirect', refs[0])
+
+    def test_role_inference_closure_is_rebuilt(self):
+        role_ids = self._create_roles(3)
+        refs = [{'user_id': uuid.uuid4().hex,
+                 'project_id': uuid.uuid4().hex,
+                 'role_id': role_ids[0]}]
+
+        def _get_implied_role_ids():
+            results = PROVIDERS.assignment_api.add_implied_roles(refs)
+            return [r['role_id'] for r in results[1:]]
+
+        PROVIDERS.role_api.create_implied_role(role_ids[0], role_ids[1])
+        self.assertEqual([role_ids[1]], _get_implied_role_ids())
+        PROVIDERS.role_api.create_implied_role(role_ids[1], role_ids[2])
+        self.assertEqual(role_ids[1:], _get_implied_role_ids())
+        PROVIDERS.role_api.delete_implied_role(role_ids[0], role_ids[1])
+        self.assertEqual([], _get_implied_role_ids())
+
 
 class SystemAssignmentTests(AssignmentTestHelperMixin):
     def test_create_system_grant_for_user(self):
@@ -10,13 +10,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import uuid
 
 from dogpile.cache import api as dogpile
+from dogpile.cache import region as dogpile_region
 from dogpile.cache.backends import memory
+import freezegun
 from oslo_config import fixture as config_fixture
+from oslo_context import context as oslo_context
 
 from keystone.common import cache
+from keystone.common.cache import _context_cache
+from keystone.common.cache import _local_cache
 import keystone.conf
 from keystone.tests import unit
 
@@ -195,3 +201,245 @@ class TestCacheRegion(unit.BaseTestCase):
         # test invalidation
         cache.CACHE_INVALIDATION_REGION.delete(region_key)
         self.assertIsInstance(self.region0.get(key), dogpile.NoValue)
+
+    def test_tag_ids_are_shared_between_regions(self):
+        tags = [uuid.uuid4().hex, uuid.uuid4().hex]
+        tag_ids = cache.get_tag_ids(self.region0, tags)
+        self.assertEqual(set(tags), set(tag_ids))
+        self.assertEqual(tag_ids, cache.get_tag_ids(self.region1, tags))
+
+    def test_invalidating_a_tag(self):
+        tag, other_tag = uuid.uuid4().hex, uuid.uuid4().hex
+        tag_ids = cache.get_tag_ids(self.region0, [tag, other_tag])
+
+        cache.invalidate_tags(self.region1, [tag])
+        new_tag_ids = cache.get_tag_ids(self.region0, [tag, other_tag])
+        self.assertNotEqual(tag_ids[tag], new_tag_ids[tag])
+        self.assertEqual(tag_ids[other_tag], new_tag_ids[other_tag])
+
+    def test_invalidating_a_tag_keeps_the_region(self):
+        key = uuid.uuid4().hex
+        value = uuid.uuid4().hex
+        self.region0.set(key, value)
+
+        cache.invalidate_tags(self.region0, [uuid.uuid4().hex])
+        self.assertEqual(value, self.region0.get(key))
+
+    def test_tags_are_scoped_to_the_region_name(self):
+        other_region = cache.create_region(uuid.uuid4().hex)
+        cache.configure_cache(region=other_region)
+        tag = uuid.uuid4().hex
+        tag_ids = cache.get_tag_ids(self.region0, [tag])
+
+        cache.invalidate_tags(other_region, [tag])
+        self.assertEqual(tag_ids, cache.get_tag_ids(self.region0, [tag]))
+
+
+class TestResponseCacheProxy(unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestResponseCacheProxy, self).setUp()
+        # A new context is a new request local cache.
+        oslo_context.RequestContext()
+        self.cache_dict = {}
+        self.region = dogpile_region.make_region().configure(
+            'dogpile.cache.memory', arguments={'cache_dict': self.cache_dict})
+        self.region.wrap(_context_cache._ResponseCacheProxy)
+
+    def _get_request_local_value(self, key):
+        ctx = oslo_context.get_current()
+        return getattr(ctx, '_request_cache_%s' % key).payload
+
+    def test_immutable_values_are_shared(self):
+        key = uuid.uuid4().hex
+        value = (key, uuid.uuid4().bytes)
+        self.region.set(key, value)
+        self.assertIs(value, self.region.get(key))
+
+    def test_values_are_copied(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, {'id': key, 'tags': [key]})
+
+        value = self.region.get(key)
+        self.assertEqual({'id': key, 'tags': [key]}, value)
+        self.assertIsNot(value, self.region.get(key))
+        value['id'] = uuid.uuid4().hex
+        value['tags'].append(key)
+        self.assertEqual({'id': key, 'tags': [key]}, self.region.get(key))
+
+    def test_cached_values_are_frozen(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, {'id': key, 'tags': [key]})
+
+        value = self._get_request_local_value(key)
+        self.assertRaises(TypeError, value.update, {'id': None})
+        self.assertRaises(TypeError, value.pop, 'id')
+        self.assertRaises(TypeError, value['tags'].append, key)
+        self.assertEqual({'id': key, 'tags': [key]}, self.region.get(key))
+
+    def test_values_loaded_from_the_backend_are_frozen(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, {'id': key})
+        oslo_context.RequestContext()
+
+        self.assertEqual({'id': key}, self.region.get(key))
+        value = self._get_request_local_value(key)
+        self.assertRaises(TypeError, value.__setitem__, 'id', None)
+
+    def test_other_objects_are_serialized(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, uuid.UUID(key))
+
+        value = self.region.get(key)
+        self.assertEqual(uuid.UUID(key), value)
+        self.assertIsNot(value, self.region.get(key))
+
+    def test_get_multi_fills_the_request_local_cache(self):
+        mapping = {uuid.uuid4().hex: uuid.uuid4().hex for _ in range(2)}
+        keys = list(mapping.keys())
+        self.cache_dict.update(
+            (k, dogpile.CachedValue(v, {'ct': 0, 'v': 1}))
+            for k, v in mapping.items())
+
+        values = [v.payload for v in self.region.backend.get_multi(keys)]
+        self.assertEqual([mapping[k] for k in keys], values)
+        self.cache_dict.clear()
+        values = [v.payload for v in self.region.backend.get_multi(keys)]
+        self.assertEqual([mapping[k] for k in keys], values)
+
+
+class TestLocalCache(unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestLocalCache, self).setUp()
+        self.cache_dict = {}
+        self.region = dogpile_region.make_region().configure(
+            'dogpile.cache.memory', arguments={'cache_dict': self.cache_dict})
+        self.local_cache = _local_cache._LocalCacheProxy(
+            uuid.uuid4().hex, max_size=2, expiration_time=5)
+        self.region.wrap(self.local_cache)
+
+    def test_values_are_served_from_memory(self):
+        key = uuid.uuid4().hex
+        value = uuid.uuid4().hex
+        self.region.set(key, value)
+
+        # Values stay available even if the backend no longer has them.
+        self.cache_dict.clear()
+        self.assertEqual(value, self.region.get(key))
+        self.assertEqual(1, self.local_cache.stats['hits'])
+
+    def test_values_are_loaded_from_the_backend(self):
+        key = uuid.uuid4().hex
+        value = uuid.uuid4().hex
+        self.region.set(key, value)
+        self.local_cache._values.clear()
+
+        self.assertEqual(value, self.region.get(key))
+        self.assertEqual(value, self.region.get(key))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1},
+                         self.local_cache.stats)
+
+    def test_values_expire(self):
+        key = uuid.uuid4().hex
+        now = datetime.datetime.utcnow()
+        with freezegun.freeze_time(now) as frozen_time:
+            self.region.set(key, uuid.uuid4().hex)
+            self.cache_dict.clear()
+            frozen_time.tick(delta=datetime.timedelta(seconds=6))
+            self.assertIsInstance(self.region.get(key), dogpile.NoValue)
+        self.assertEqual(1, self.local_cache.stats['misses'])
+
+    def test_least_recently_used_value_is_evicted(self):
+        keys = [uuid.uuid4().hex for _ in range(3)]
+        self.region.set(keys[0], keys[0])
+        self.region.set(keys[1], keys[1])
+        self.region.get(keys[0])
+        self.region.set(keys[2], keys[2])
+        self.cache_dict.clear()
+
+        self.assertEqual(keys[0], self.region.get(keys[0]))
+        self.assertIsInstance(self.region.get(keys[1]), dogpile.NoValue)
+        self.assertEqual(keys[2], self.region.get(keys[2]))
+        self.assertEqual(1, self.local_cache.stats['evictions'])
+        self.assertEqual(2, self.local_cache.stats['size'])
+
+    def test_values_are_not_shared(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, {'id': key})
+        value = self.region.get(key)
+        value['id'] = uuid.uuid4().hex
+        self.assertEqual({'id': key}, self.region.get(key))
+
+    def test_delete(self):
+        key = uuid.uuid4().hex
+        self.region.set(key, uuid.uuid4().hex)
+        self.region.delete(key)
+        self.assertIsInstance(self.region.get(key), dogpile.NoValue)
+        self.assertEqual(0, self.local_cache.stats['size'])
+
+    def test_multi_methods(self):
+        mapping = {uuid.uuid4().hex: uuid.uuid4().hex for _ in range(2)}
+        keys = list(mapping.keys())
+        self.region.set_multi(mapping)
+        self.local_cache._values.pop(keys[0])
+
+        self.assertEqual([mapping[k] for k in keys],
+                         self.region.get_multi(keys))
+        self.cache_dict.clear()
+        self.assertEqual([mapping[k] for k in keys],
+                         self.region.get_multi(keys))
+
+        self.region.delete_multi(keys)
+        for value in self.region.get_multi(keys):
+            self.assertIsInstance(value, dogpile.NoValue)
+
+
+class TestLocalCacheRegion(unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestLocalCacheRegion, self).setUp()
+        self.config_fixture = self.useFixture(config_fixture.Config(CONF))
+        self.config_fixture.config(group='cache',
+                                   backend='dogpile.cache.memory')
+        self.config_fixture.config(group='local_cache', enabled=True)
+
+        cache.CACHE_INVALIDATION_REGION.configure(
+            backend='dogpile.cache.memory',
+            expiration_time=None,
+            replace_existing_backend=True)
+
+    def _create_region(self, name):
+        region = cache.create_region(name)
+        cache.configure_cache(region=region)
+        return region
+
+    def test_region_invalidation_is_honored(self):
+        # Two regions with the same name sharing a backend behave like the
+        # same region in two processes.
+        name = uuid.uuid4().hex
+        region0 = self._create_region(name)
+        region1 = self._create_region(name)
+        key = uuid.uuid4().hex
+        region0.set(key, uuid.uuid4().hex)
+
+        region1.invalidate()
+        self.assertIsInstance(region0.get(key), dogpile.NoValue)
+
+    def test_stats_are_kept_per_region(self):
+        region = self._create_region(uuid.uuid4().hex)
+        region.get(uuid.uuid4().hex)
+
+        stats = cache.get_local_cache_stats()
+        self.assertEqual({'hits': 0, 'misses': 1, 'evictions': 0, 'size': 0},
+                         stats[region.name])
+
+    def test_only_listed_regions_are_kept_in_memory(self):
+        name = uuid.uuid4().hex
+        self.config_fixture.config(group='local_cache', regions=[name])
+        self._create_region(name)
+        other_region = self._create_region(uuid.uuid4().hex)
+
+        stats = cache.get_local_cache_stats()
+        self.assertIn(name, stats)
+        self.assertNotIn(other_region.name, stats)
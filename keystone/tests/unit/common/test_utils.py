@@ -13,6 +13,7 @@
 
 import datetime
 import fixtures
+import threading
 import uuid
 
 import freezegun
@@ -21,6 +22,7 @@ from oslo_log import log
 import six
 
 from keystone.common import fernet_utils
+from keystone.common import password_hashing
 from keystone.common import utils as common_utils
 import keystone.conf
 from keystone.credential.providers import fernet as credential_fernet
@@ -175,6 +177,109 @@ class UtilsTestCase(unit.BaseTestCase):
         self.assertTrue(common_utils.check_password(password, hashed))
         self.assertFalse(common_utils.check_password(wrong, hashed))
 
+    def _use_hashing_workers(self, **kwargs):
+        self.config_fixture.config(group='identity', **kwargs)
+
+        def shutdown_executor():
+            if password_hashing._EXECUTOR is not None:
+                password_hashing._EXECUTOR.shutdown()
+                password_hashing._EXECUTOR = None
+        self.addCleanup(shutdown_executor)
+
+    def test_hash_in_worker_threads(self):
+        self._use_hashing_workers(password_hash_workers=2)
+        count = password_hashing.get_statistics()['algorithms'].get(
+            'bcrypt', {}).get('count', 0)
+        password = uuid.uuid4().hex
+        hashed = common_utils.hash_password(password)
+        self.assertTrue(common_utils.check_password(password, hashed))
+        self.assertFalse(common_utils.check_password('wrong', hashed))
+
+        stats = password_hashing.get_statistics()
+        self.assertEqual(count + 3, stats['algorithms']['bcrypt']['count'])
+        self.assertGreater(stats['algorithms']['bcrypt']['time'], 0)
+
+    def test_hash_in_worker_processes(self):
+        self._use_hashing_workers(password_hash_workers=1,
+                                  password_hash_worker_type='process',
+                                  password_hash_algorithm='pbkdf2_sha512')
+        password = uuid.uuid4().hex
+        hashed = common_utils.hash_password(password)
+        self.assertTrue(hashed.startswith('$pbkdf2-sha512$'))
+        self.assertTrue(common_utils.check_password(password, hashed))
+        self.assertFalse(common_utils.check_password('wrong', hashed))
+
+    def test_hash_rejected_when_queue_is_full(self):
+        self._use_hashing_workers(password_hash_workers=1,
+                                  password_hash_queue_size=1)
+        password = uuid.uuid4().hex
+        hashed = common_utils.hash_password(password)
+        rejected = password_hashing.get_statistics()['rejected']
+
+        # Keep the worker busy with one password and queue another one.
+        release = threading.Event()
+        verify = password_hashing._verify
+
+        def blocking_verify(*args):
+            release.wait()
+            return verify(*args)
+
+        self.useFixture(fixtures.MockPatchObject(
+            password_hashing, '_verify', blocking_verify))
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(
+                common_utils.check_password(password, hashed)))
+            for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while password_hashing.get_statistics()['backlog'] < 2:
+            release.wait(0.01)
+
+        self.assertRaises(exception.PasswordHashingQueueFull,
+                          common_utils.check_password, password, hashed)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([True, True], results)
+        self.assertEqual(rejected + 1,
+                         password_hashing.get_statistics()['rejected'])
+
+    def test_check_any_password_in_worker_threads(self):
+        self._use_hashing_workers(password_hash_workers=2,
+                                  password_hash_algorithm='pbkdf2_sha512',
+                                  password_hash_rounds=1000)
+        passwords = [uuid.uuid4().hex for _ in range(8)]
+        hashes = [common_utils.hash_password(p) for p in passwords]
+
+        verify = password_hashing._verify
+        verified = []
+
+        def counting_verify(*args):
+            verified.append(args[1])
+            return verify(*args)
+
+        self.useFixture(fixtures.MockPatchObject(
+            password_hashing, '_verify', counting_verify))
+
+        # The hashes left once one matched are never checked.
+        self.assertTrue(password_hashing.check_any_password(passwords[0],
+                                                            hashes))
+        self.assertLessEqual(len(verified), 2)
+
+        del verified[:]
+        self.assertTrue(password_hashing.check_any_password(passwords[7],
+                                                            hashes))
+        self.assertEqual(hashes, sorted(verified, key=hashes.index))
+
+        del verified[:]
+        self.assertFalse(password_hashing.check_any_password('wrong',
+                                                             hashes))
+        self.assertEqual(len(hashes), len(verified))
+        self.assertFalse(password_hashing.check_any_password(None, hashes))
+        self.assertFalse(password_hashing.check_any_password(passwords[0],
+                                                             []))
+
     def test_auth_str_equal(self):
         self.assertTrue(common_utils.auth_str_equal('abc123', 'abc123'))
         self.assertFalse(common_utils.auth_str_equal('a', 'aaaaa'))
@@ -254,6 +254,17 @@ def new_endpoint_ref_with_region(service_id, region, interface='public',
     return ref
 
 
+def new_endpoint_group_ref(filters, **kwargs):
+    ref = {
+        'id': uuid.uuid4().hex,
+        'name': uuid.uuid4().hex,
+        'description': uuid.uuid4().hex,
+        'filters': filters,
+    }
+    ref.update(kwargs)
+    return ref
+
+
 def new_domain_ref(**kwargs):
     ref = {
         'id': uuid.uuid4().hex,
@@ -762,6 +773,9 @@ class TestCase(BaseTestCase):
             group='catalog',
             driver='sql',
             template_file=dirs.tests('default_catalog.templates'))
+        # Expired revocation events are pruned explicitly by the tests which
+        # care about it, not by a thread racing with the test database.
+        self.config_fixture.config(group='revoke', prune_interval=0)
         self.config_fixture.config(
             group='signing', certfile=signing_certfile,
             keyfile=signing_keyfile,
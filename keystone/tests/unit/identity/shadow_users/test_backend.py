@@ -13,6 +13,8 @@
 import datetime
 import uuid
 
+import mock
+
 from keystone.common import provider_api
 from keystone.common import sql
 import keystone.conf
@@ -140,6 +142,72 @@ class ShadowUsersBackendTests(object):
         user_ref = self._get_user_ref(user_auth['id'])
         self.assertIsNone(user_ref.last_active_at)
 
+    def test_set_last_active_at_once_a_day(self):
+        self.config_fixture.config(group='security_compliance',
+                                   disable_user_account_days_inactive=90)
+        password = uuid.uuid4().hex
+        user = self._create_user(password)
+        self._set_last_active_at(user['id'], days_ago=1)
+        with mock.patch.object(
+                PROVIDERS.shadow_users_api.driver,
+                'set_last_active_at_for_users',
+                wraps=PROVIDERS.shadow_users_api.driver.
+                set_last_active_at_for_users) as set_last_active_at:
+            for _ in range(3):
+                with self.make_request():
+                    PROVIDERS.identity_api.authenticate(
+                        user_id=user['id'], password=password)
+        set_last_active_at.assert_called_once_with([user['id']])
+        user_ref = self._get_user_ref(user['id'])
+        self.assertEqual(datetime.datetime.utcnow().date(),
+                         user_ref.last_active_at)
+
+    def test_set_last_active_at_in_batches(self):
+        self.config_fixture.config(group='security_compliance',
+                                   disable_user_account_days_inactive=90,
+                                   last_active_at_flush_interval=3600)
+        self.addCleanup(PROVIDERS.shadow_users_api._activity.stop)
+        password = uuid.uuid4().hex
+        users = [self._create_user(password) for _ in range(3)]
+        for user in users:
+            self._set_last_active_at(user['id'], days_ago=1)
+            with self.make_request():
+                PROVIDERS.identity_api.authenticate(
+                    user_id=user['id'], password=password)
+            self.assertLess(self._get_user_ref(user['id']).last_active_at,
+                            datetime.datetime.utcnow().date())
+
+        with mock.patch.object(
+                PROVIDERS.shadow_users_api.driver,
+                'set_last_active_at_for_users',
+                wraps=PROVIDERS.shadow_users_api.driver.
+                set_last_active_at_for_users) as set_last_active_at:
+            PROVIDERS.shadow_users_api.flush_last_active_at()
+            PROVIDERS.shadow_users_api.flush_last_active_at()
+        set_last_active_at.assert_called_once_with(
+            sorted(user['id'] for user in users))
+        for user in users:
+            self.assertEqual(datetime.datetime.utcnow().date(),
+                             self._get_user_ref(user['id']).last_active_at)
+
+    def test_set_last_active_at_for_users_only_moves_forward(self):
+        self.config_fixture.config(group='security_compliance',
+                                   disable_user_account_days_inactive=90)
+        user = self._create_user(uuid.uuid4().hex)
+        tomorrow = self._set_last_active_at(user['id'], days_ago=-1)
+        PROVIDERS.shadow_users_api.driver.set_last_active_at_for_users(
+            [user['id']])
+        self.assertEqual(tomorrow,
+                         self._get_user_ref(user['id']).last_active_at)
+
+    def _set_last_active_at(self, user_id, days_ago):
+        last_active_at = (datetime.datetime.utcnow().date() -
+                          datetime.timedelta(days=days_ago))
+        with sql.session_for_write() as session:
+            user_ref = session.query(model.User).get(user_id)
+            user_ref.last_active_at = last_active_at
+        return last_active_at
+
     def _add_nonlocal_user(self, nonlocal_user):
         with sql.session_for_write() as session:
             nonlocal_user_ref = model.NonLocalUser.from_dict(nonlocal_user)
@@ -11,8 +11,10 @@
 # under the License.
 
 import datetime
+import threading
 import uuid
 
+import fixtures
 import freezegun
 import passlib.hash
 
@@ -25,6 +27,7 @@ from keystone import exception
 from keystone.identity.backends import base
 from keystone.identity.backends import resource_options as iro
 from keystone.identity.backends import sql_model as model
+from keystone.identity import lockout
 from keystone.tests.unit import test_backend_sql
 
 
@@ -397,6 +400,26 @@ class PasswordHistoryValidationTests(test_backend_sql.SqlTests):
                               original_password=new_password,
                               new_password=password)
 
+    def test_validate_password_history_in_worker_pool(self):
+        self.config_fixture.config(group='identity', password_hash_workers=2)
+        self.addCleanup(setattr, password_hashing, '_EXECUTOR', None)
+        self.addCleanup(password_hashing._get_executor().shutdown)
+        passwords = [uuid.uuid4().hex for _ in range(self.max_cnt + 1)]
+        user = self._create_user(passwords[0])
+        for old_password, new_password in zip(passwords, passwords[1:-1]):
+            self.assertValidChangePassword(user['id'], old_password,
+                                           new_password)
+        # Every password in the history is rejected.
+        for password in passwords[:-1]:
+            with self.make_request():
+                self.assertRaises(exception.PasswordValidationError,
+                                  PROVIDERS.identity_api.change_password,
+                                  user_id=user['id'],
+                                  original_password=passwords[-2],
+                                  new_password=password)
+        self.assertValidChangePassword(user['id'], passwords[-2],
+                                       passwords[-1])
+
     def test_validate_password_history_with_valid_password(self):
         passwords = [uuid.uuid4().hex, uuid.uuid4().hex, uuid.uuid4().hex,
                      uuid.uuid4().hex]
@@ -675,6 +698,223 @@ class LockingOutUserTests(test_backend_sql.SqlTests):
                                   password=wrong_password)
 
 
+class LockoutTrackerTests(LockingOutUserTests):
+    tracker = 'memory'
+
+    def setUp(self):
+        super(LockoutTrackerTests, self).setUp()
+        self.config_fixture.config(
+            group='security_compliance',
+            lockout_tracker=self.tracker)
+
+    def _get_stored_failed_auth(self):
+        with sql.session_for_read() as session:
+            user_ref = PROVIDERS.identity_api._get_user(
+                session, self.user['id'])
+            return (user_ref.local_user.failed_auth_count,
+                    user_ref.local_user.failed_auth_at)
+
+    def test_failed_auth_is_written_back_after_interval(self):
+        stored_failed_auth = self._get_stored_failed_auth()
+        with freezegun.freeze_time(datetime.datetime.utcnow()) as frozen_time:
+            with self.make_request():
+                self.assertRaises(AssertionError,
+                                  PROVIDERS.identity_api.authenticate,
+                                  user_id=self.user['id'],
+                                  password=uuid.uuid4().hex)
+            self.assertEqual(stored_failed_auth,
+                             self._get_stored_failed_auth())
+
+            frozen_time.tick(delta=datetime.timedelta(
+                seconds=CONF.security_compliance.lockout_write_back_interval))
+            with self.make_request():
+                self.assertRaises(AssertionError,
+                                  PROVIDERS.identity_api.authenticate,
+                                  user_id=self.user['id'],
+                                  password=uuid.uuid4().hex)
+            self.assertEqual((2, datetime.datetime.utcnow()),
+                             self._get_stored_failed_auth())
+
+    def test_lockout_is_written_back_immediately(self):
+        self._fail_auth_repeatedly(self.user['id'])
+        count, failed_at = self._get_stored_failed_auth()
+        self.assertEqual(
+            CONF.security_compliance.lockout_failure_attempts, count)
+        self.assertIsNotNone(failed_at)
+
+    def test_concurrent_failed_auth(self):
+        # NOTE: The in-memory sqlite database can't be used from several
+        # threads, so the tracker is hammered directly and writes back to a
+        # list instead.
+        written_back = []
+        tracker = lockout.get_tracker(self.tracker, written_back.append)
+        attempts = CONF.security_compliance.lockout_failure_attempts
+
+        def fail_auth():
+            for _ in range(50):
+                tracker.get_failures(self.user['id'], None, None)
+                tracker.record_failure(self.user['id'], None, None)
+
+        threads = [threading.Thread(target=fail_auth) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Every failure was counted, none was lost to a concurrent update,
+        # and the lockout was written back as soon as it happened.
+        count, failed_at = tracker.get_failures(self.user['id'], None, None)
+        self.assertEqual(1000, count)
+        self.assertEqual(attempts, written_back[0][self.user['id']][0])
+        tracker.write_back(force=True)
+        self.assertEqual((count, failed_at),
+                         written_back[-1][self.user['id']])
+
+    def test_failures_written_back_by_other_processes_are_counted(self):
+        written_back = []
+        tracker = lockout.get_tracker(self.tracker, written_back.append)
+        tracker.record_failure(self.user['id'], None, None)
+        tracker.record_failure(self.user['id'], None, None)
+
+        # Another process wrote back more failures than this one counted.
+        stored_at = datetime.datetime.utcnow()
+        self.assertEqual((4, stored_at),
+                         tracker.get_failures(self.user['id'], 4, stored_at))
+        tracker.record_failure(self.user['id'], 4, stored_at)
+        self.assertEqual(
+            5, tracker.get_failures(self.user['id'], 4, stored_at)[0])
+
+    def test_write_back_does_not_lower_the_stored_count(self):
+        write_back = PROVIDERS.identity_api.driver._write_back_failed_auth
+        failed_at = datetime.datetime.utcnow()
+        write_back({self.user['id']: (5, failed_at)})
+        self.assertEqual((5, failed_at), self._get_stored_failed_auth())
+
+        # A process which counted fewer failures can't lower the count...
+        write_back({self.user['id']: (2, datetime.datetime.utcnow())})
+        self.assertEqual((5, failed_at), self._get_stored_failed_auth())
+
+        # ...but resets are written back.
+        write_back({self.user['id']: (0, None)})
+        self.assertEqual((0, None), self._get_stored_failed_auth())
+
+    def test_reset_by_other_process_drops_tracked_failures(self):
+        driver = PROVIDERS.identity_api.driver
+        attempts = CONF.security_compliance.lockout_failure_attempts
+        with freezegun.freeze_time(datetime.datetime.utcnow()) as frozen_time:
+            # Count failures in this process and write them back...
+            for _ in range(attempts - 2):
+                with self.make_request():
+                    self.assertRaises(AssertionError,
+                                      PROVIDERS.identity_api.authenticate,
+                                      user_id=self.user['id'],
+                                      password=uuid.uuid4().hex)
+            tracker = driver._get_lockout_tracker()
+            tracker.write_back(force=True)
+
+            # ...then let another process, with its own tracker, reset them.
+            frozen_time.tick()
+            driver._lockout_tracker = (self.tracker, lockout.get_tracker(
+                self.tracker, driver._write_back_failed_auth))
+            with self.make_request():
+                PROVIDERS.identity_api.authenticate(
+                    user_id=self.user['id'], password=self.password)
+            driver._lockout_tracker = (self.tracker, tracker)
+
+            # The failures this process counted before the reset are gone.
+            frozen_time.tick()
+            for _ in range(2):
+                with self.make_request():
+                    self.assertRaises(AssertionError,
+                                      PROVIDERS.identity_api.authenticate,
+                                      user_id=self.user['id'],
+                                      password=uuid.uuid4().hex)
+            self.assertEqual(
+                2, driver._get_failed_auth(
+                    self._get_user_ref(self.user['id']))[0])
+
+    def test_write_back_does_not_undo_a_reset(self):
+        write_back = PROVIDERS.identity_api.driver._write_back_failed_auth
+        with freezegun.freeze_time(datetime.datetime.utcnow()) as frozen_time:
+            failed_at = datetime.datetime.utcnow()
+            frozen_time.tick()
+            write_back({self.user['id']: (0, None)})
+
+            # A process which counted failures before the reset can't
+            # restore them.
+            frozen_time.tick()
+            write_back({self.user['id']: (3, failed_at)})
+            self.assertEqual((0, None), self._get_stored_failed_auth())
+
+            failed_at = datetime.datetime.utcnow()
+            write_back({self.user['id']: (1, failed_at)})
+            self.assertEqual((1, failed_at), self._get_stored_failed_auth())
+
+    def _get_user_ref(self, user_id):
+        with sql.session_for_read() as session:
+            return PROVIDERS.identity_api._get_user(session, user_id)
+
+
+class _FakeMemcachedClient(object):
+    """A memcached client which only supports counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value, time=0):
+        self._values[key] = value
+        return True
+
+    def add(self, key, value, time=0):
+        with self._lock:
+            if key in self._values:
+                return False
+            self._values[key] = value
+            return True
+
+    def incr(self, key, delta=1):
+        with self._lock:
+            if key not in self._values:
+                return None
+            self._values[key] = str(int(self._values[key]) + delta)
+            return int(self._values[key])
+
+    def delete(self, key):
+        self._values.pop(key, None)
+
+
+class CacheLockoutTrackerTests(LockoutTrackerTests):
+    tracker = 'cache'
+
+    def test_failures_in_different_processes_are_all_counted(self):
+        client = _FakeMemcachedClient()
+        self.useFixture(fixtures.MockPatchObject(
+            lockout.CacheTracker, '_client', return_value=client))
+        # Trackers in different processes don't share a lock, so only the
+        # cache backend can keep them from losing concurrent updates.
+        trackers = [lockout.get_tracker(self.tracker, lambda failures: None)
+                    for _ in range(4)]
+
+        def fail_auth(tracker):
+            for _ in range(50):
+                tracker.record_failure(self.user['id'], None, None)
+
+        threads = [threading.Thread(target=fail_auth, args=(tracker,))
+                   for tracker in trackers for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for tracker in trackers:
+            self.assertEqual(
+                1000, tracker.get_failures(self.user['id'], None, None)[0])
+
+
 class PasswordExpiresValidationTests(test_backend_sql.SqlTests):
     def setUp(self):
         super(PasswordExpiresValidationTests, self).setUp()
@@ -128,6 +128,26 @@ class IdentityTests(object):
         self.assertIn('options', user_ref)
         self.assertDictEqual(self.user_foo, user_ref)
 
+    def test_list_users_from_ids(self):
+        user_ref = PROVIDERS.identity_api.get_user(self.user_foo['id'])
+        users = PROVIDERS.identity_api.list_users_from_ids(
+            [self.user_foo['id'], uuid.uuid4().hex, self.user_foo['id']])
+        self.assertEqual([user_ref], users)
+        self.assertEqual([], PROVIDERS.identity_api.list_users_from_ids([]))
+
+    def test_list_groups_from_ids(self):
+        domain_id = CONF.identity.default_domain_id
+        groups = [
+            PROVIDERS.identity_api.create_group(
+                unit.new_group_ref(domain_id=domain_id))
+            for _ in range(2)]
+        group_refs = PROVIDERS.identity_api.list_groups_from_ids(
+            [group['id'] for group in groups] + [uuid.uuid4().hex])
+        self.assertItemsEqual(
+            [PROVIDERS.identity_api.get_group(group['id'])
+             for group in groups],
+            group_refs)
+
     def test_get_user_returns_required_attributes(self):
         user_ref = PROVIDERS.identity_api.get_user(self.user_foo['id'])
         self.assertIn('id', user_ref)
@@ -49,3 +49,5 @@ class JWSKeyRepository(fixtures.Fixture):
         private_key_path = os.path.join(private_key_directory, 'private.pem')
         public_key_path = os.path.join(public_key_directory, 'public.pem')
         jwt_utils.create_jws_keypair(private_key_path, public_key_path)
+        self.addCleanup(jwt_utils.reset_key_caches, private_key_path)
+        self.addCleanup(jwt_utils.reset_key_caches, public_key_directory)
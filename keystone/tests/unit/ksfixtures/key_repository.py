@@ -35,3 +35,4 @@ class KeyRepository(fixtures.Fixture):
         )
         fernet_utils.create_key_directory()
         fernet_utils.initialize_key_repository()
+        self.addCleanup(utils.reset_key_rings, directory)
@@ -11,6 +11,7 @@
 #    under the License.
 
 from six.moves import http_client
+from six.moves import urllib
 import uuid
 
 from oslo_serialization import jsonutils
@@ -737,6 +738,35 @@ class _DomainUserTests(object):
             for assignment in actual:
                 self.assertIn(assignment, self.expected)
 
+    def test_user_can_page_through_assignments_in_their_domain(self):
+        other_assignments = self._setup_test_role_assignments()
+        domain_assignments = self._setup_test_role_assignments_for_domain()
+
+        actual = []
+        query = 'limit=1'
+        with self.test_client() as c:
+            while True:
+                r = c.get('/v3/role_assignments?%s' % query,
+                          headers=self.headers)
+                # pages only hold, and continue from, assignments in the
+                # domain, so none of them is empty
+                self.assertEqual(1, len(r.json['role_assignments']))
+                actual += self._extract_role_assignments_from_response_body(r)
+                next_url = r.json['links']['next']
+                if next_url is None:
+                    break
+                query = urllib.parse.urlparse(next_url).query
+                marker = urllib.parse.parse_qs(query)['marker'][0]
+                for entity_id in other_assignments.values():
+                    if entity_id != other_assignments['role_id']:
+                        self.assertNotIn(entity_id, marker)
+
+        self.assertEqual(5, len(actual))
+        for assignment in actual:
+            self.assertIn(assignment.get('domain_id') or
+                          assignment.get('project_id'),
+                          (self.domain_id, domain_assignments['project_id']))
+
     def test_user_can_filter_role_assignments_by_project_in_domain(self):
         self._setup_test_role_assignments()
         domain_assignments = self._setup_test_role_assignments_for_domain()
@@ -14,6 +14,7 @@ import uuid
 
 from oslo_serialization import jsonutils
 from six.moves import http_client
+from six.moves import urllib
 
 from keystone.common.policies import credential as cp
 from keystone.common import provider_api
@@ -238,6 +239,36 @@ class _ProjectUsersTests(object):
             r = c.get(path, headers=self.headers)
             self.assertEqual([], r.json['credentials'])
 
+    def test_user_can_only_page_through_their_credentials(self):
+        user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        )
+        expected_ids = []
+        for user_id in [self.user_id] * 3 + [user['id']] * 6:
+            credential = PROVIDERS.credential_api.create_credential(
+                uuid.uuid4().hex, unit.new_credential_ref(user_id=user_id)
+            )
+            if user_id == self.user_id:
+                expected_ids.append(credential['id'])
+
+        ids = []
+        query = 'limit=1'
+        with self.test_client() as c:
+            while True:
+                r = c.get('/v3/credentials?%s' % query, headers=self.headers)
+                # pages only hold, and continue from, the user's credentials,
+                # so none of them is empty
+                self.assertEqual(1, len(r.json['credentials']))
+                ids += [ref['id'] for ref in r.json['credentials']]
+                next_url = r.json['links']['next']
+                if next_url is None:
+                    break
+                query = urllib.parse.urlparse(next_url).query
+                marker = urllib.parse.parse_qs(query)['marker'][0]
+                self.assertIn(marker, expected_ids)
+
+        self.assertEqual(sorted(expected_ids), ids)
+
     def test_user_cannot_filter_credentials_by_type_for_others(self):
         user = unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
         user_password = user['password']
@@ -353,6 +353,15 @@ class SqlIDMapping(test_backend_sql.SqlTests):
             domain_a_mappings = [m.to_dict() for m in domain_a_mappings]
         self.assertItemsEqual(local_entities[:2], domain_a_mappings)
 
+    def test_list_id_mappings_from_public_ids(self):
+        local_entities = self._prepare_domain_mappings_for_list()
+        public_ids = [e['public_id'] for e in local_entities[1:3]]
+        mappings = PROVIDERS.id_mapping_api.list_id_mappings_from_public_ids(
+            public_ids + [uuid.uuid4().hex])
+        self.assertItemsEqual(local_entities[1:3], mappings)
+        self.assertEqual(
+            [], PROVIDERS.id_mapping_api.list_id_mappings_from_public_ids([]))
+
     def test_get_domain_mapping_list_by_user_entity_type(self):
         local_entities = self._prepare_domain_mappings_for_list()
         # NOTE(notmorgan): Always call to_dict in an active session context to
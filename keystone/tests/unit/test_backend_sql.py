@@ -12,6 +12,8 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import importlib
+import itertools
 import uuid
 
 import mock
@@ -22,6 +24,7 @@ import sqlalchemy
 from sqlalchemy import exc
 from testtools import matchers
 
+from keystone.catalog.backends import sql as catalog_sql
 from keystone.common import driver_hints
 from keystone.common import provider_api
 from keystone.common import sql
@@ -30,6 +33,7 @@ from keystone.credential.providers import fernet as credential_provider
 from keystone import exception
 from keystone.identity.backends import sql_model as identity_sql
 from keystone.resource.backends import base as resource
+from keystone.resource.backends import sql as resource_sql
 from keystone.tests import unit
 from keystone.tests.unit.assignment import test_backends as assignment_tests
 from keystone.tests.unit.catalog import test_backends as catalog_tests
@@ -146,7 +150,8 @@ class SqlModels(SqlTests):
                 ('name', sql.String, 255),
                 ('domain_id', sql.String, 64),
                 ('failed_auth_count', sql.Integer, None),
-                ('failed_auth_at', sql.DateTime, None))
+                ('failed_auth_at', sql.DateTime, None),
+                ('failed_auth_reset_at', sql.DateTime, None))
         self.assertExpectedSchema('local_user', cols)
 
     def test_password_model(self):
@@ -228,6 +233,12 @@ class SqlModels(SqlTests):
                 ('name', sql.Unicode, 255))
         self.assertExpectedSchema('project_tag', cols)
 
+    def test_project_closure_model(self):
+        cols = (('ancestor_id', sql.String, 64),
+                ('descendant_id', sql.String, 64),
+                ('depth', sql.Integer, None))
+        self.assertExpectedSchema('project_closure', cols)
+
 
 class SqlIdentity(SqlTests,
                   identity_tests.IdentityTests,
@@ -745,6 +756,125 @@ class SqlIdentity(SqlTests,
                           PROVIDERS.resource_api.check_project_depth,
                           2)
 
+    def _create_project_chain(self, depth, parent_id=None):
+        parent_id = parent_id or CONF.identity.default_domain_id
+        projects = []
+        for _ in range(depth):
+            project = unit.new_project_ref(
+                domain_id=CONF.identity.default_domain_id,
+                parent_id=parent_id)
+            PROVIDERS.resource_api.create_project(project['id'], project)
+            projects.append(project)
+            parent_id = project['id']
+        return projects
+
+    def test_project_hierarchy_call_count(self):
+        """There should not be a query per level of the hierarchy."""
+        self.config_fixture.config(max_project_tree_depth=12)
+
+        class CallCounter(object):
+            def __init__(self):
+                self.calls = 0
+
+            def reset(self):
+                self.calls = 0
+
+            def query_counter(self, query):
+                self.calls += 1
+
+        counter = CallCounter()
+        sqlalchemy.event.listen(sqlalchemy.orm.query.Query, 'before_compile',
+                                counter.query_counter)
+        self.addCleanup(sqlalchemy.event.remove, sqlalchemy.orm.query.Query,
+                        'before_compile', counter.query_counter)
+        driver = PROVIDERS.resource_api.driver
+
+        shallow = self._create_project_chain(2)
+        deep = self._create_project_chain(10)
+
+        counter.reset()
+        self.assertThat(driver.list_projects_in_subtree(shallow[0]['id']),
+                        matchers.HasLength(1))
+        shallow_calls = counter.calls
+        counter.reset()
+        self.assertThat(driver.list_projects_in_subtree(deep[0]['id']),
+                        matchers.HasLength(9))
+        self.assertEqual(shallow_calls, counter.calls)
+
+        counter.reset()
+        self.assertThat(driver.list_project_parents(shallow[-1]['id']),
+                        matchers.HasLength(2))
+        shallow_calls = counter.calls
+        counter.reset()
+        parents = driver.list_project_parents(deep[-1]['id'])
+        self.assertEqual(shallow_calls, counter.calls)
+        # Parents are listed from the closest one to the domain.
+        self.assertEqual(
+            [p['id'] for p in reversed(deep[:-1])] +
+            [CONF.identity.default_domain_id],
+            [p['id'] for p in parents])
+
+    def test_project_hierarchy_follows_parent_updates(self):
+        # Move project_1 and its child from under project_2 to under
+        # project_3 with the driver, since the manager does not allow it.
+        project_2 = self._create_project_chain(1)[0]
+        project_3 = self._create_project_chain(1)[0]
+        project_1, child = self._create_project_chain(2, project_2['id'])
+        driver = PROVIDERS.resource_api.driver
+
+        project_1['parent_id'] = project_3['id']
+        driver.update_project(project_1['id'], project_1)
+
+        self.assertEqual(
+            [project_1['id'], project_3['id'],
+             CONF.identity.default_domain_id],
+            [p['id'] for p in driver.list_project_parents(child['id'])])
+        self.assertEqual(
+            [project_1['id'], child['id']],
+            [p['id'] for p in driver.list_projects_in_subtree(
+                project_3['id'])])
+        self.assertEqual(
+            [], driver.list_projects_in_subtree(project_2['id']))
+
+    def test_project_hierarchy_with_rolling_upgrade_trigger(self):
+        # Between the expand and contract phases the insert trigger adds the
+        # closure rows of new projects, which the driver must not repeat.
+        expand = importlib.import_module(
+            'keystone.common.sql.expand_repo.versions.'
+            '062_expand_add_project_closure_table')
+        with sql.session_for_write() as session:
+            session.execute(expand.SQLITE_PROJECT_INSERT_TRIGGER)
+        self.addCleanup(
+            self._drop_trigger, 'project_after_insert_trigger')
+
+        project, child = self._create_project_chain(2)
+        driver = PROVIDERS.resource_api.driver
+        self.assertEqual(
+            [project['id'], CONF.identity.default_domain_id],
+            [p['id'] for p in driver.list_project_parents(child['id'])])
+        self.assertEqual(
+            [child['id']],
+            [p['id'] for p in driver.list_projects_in_subtree(
+                project['id'])])
+
+    def _drop_trigger(self, name):
+        with sql.session_for_write() as session:
+            session.execute('DROP TRIGGER IF EXISTS %s' % name)
+
+    def test_project_hierarchy_after_delete(self):
+        project, child = self._create_project_chain(2)
+        PROVIDERS.resource_api.delete_project(child['id'])
+        PROVIDERS.resource_api.delete_project(project['id'])
+
+        with sql.session_for_read() as session:
+            query = session.query(resource_sql.ProjectClosure)
+            query = query.filter(sqlalchemy.or_(
+                resource_sql.ProjectClosure.ancestor_id.in_(
+                    [project['id'], child['id']]),
+                resource_sql.ProjectClosure.descendant_id.in_(
+                    [project['id'], child['id']])))
+            self.assertEqual(0, query.count())
+
 
 class SqlTrust(SqlTests, trust_tests.TrustTests):
 
@@ -777,6 +907,212 @@ class SqlCatalog(SqlTests, catalog_tests.CatalogTests):
                           'fake-user',
                           'fake-project')
 
+    def _create_large_catalog(self, services=200, regions=10):
+        # NOTE: The catalog is written to the database directly, since
+        # creating thousands of endpoints through the API takes too long.
+        interfaces = ['public', 'internal', 'admin']
+        url = 'http://%(region)s.%(type)s.example.com:5000/v1/$(project_id)s'
+        with sql.session_for_write() as session:
+            region_ids = [uuid.uuid4().hex for i in range(regions)]
+            for region_id in region_ids:
+                session.add(catalog_sql.Region.from_dict(
+                    unit.new_region_ref(id=region_id)))
+            for i in range(services):
+                service = unit.new_service_ref()
+                session.add(catalog_sql.Service.from_dict(service))
+                for region_id, interface in itertools.product(region_ids,
+                                                              interfaces):
+                    endpoint = unit.new_endpoint_ref(
+                        service_id=service['id'], region_id=region_id,
+                        interface=interface,
+                        url=url % {'region': region_id,
+                                   'type': service['type']})
+                    session.add(catalog_sql.Endpoint.from_dict(endpoint))
+
+    def test_get_v3_catalog_is_compiled_once(self):
+        self._create_large_catalog()
+        driver = PROVIDERS.catalog_api.driver
+        project_ids = [self.project_bar['id'], self.project_baz['id']]
+
+        with mock.patch.object(driver, '_compile_v3_catalog',
+                               wraps=driver._compile_v3_catalog) as compile:
+            for project_id in project_ids:
+                catalog = driver.get_v3_catalog(self.user_foo['id'],
+                                                project_id)
+                self.assertEqual(200, len(catalog))
+                for service in catalog:
+                    self.assertEqual(30, len(service['endpoints']))
+                    for endpoint in service['endpoints']:
+                        self.assertTrue(endpoint['url'].endswith(
+                            '/v1/' + project_id))
+                        self.assertEqual(endpoint['region_id'],
+                                         endpoint['region'])
+                        self.assertNotIn('service_id', endpoint)
+
+            # Endpoints needing a project are left out without one.
+            catalog = driver.get_v3_catalog(self.user_foo['id'], None)
+            self.assertEqual(200, len(catalog))
+            for service in catalog:
+                self.assertEqual([], service['endpoints'])
+
+        self.assertEqual(1, compile.call_count)
+
+    def test_get_v3_catalog_is_recompiled_after_changes(self):
+        service = unit.new_service_ref()
+        PROVIDERS.catalog_api.create_service(service['id'], service)
+        endpoint = unit.new_endpoint_ref(
+            service_id=service['id'], region_id=None,
+            url='http://example.com/$(user_id)s/$(tenant_id)s')
+        PROVIDERS.catalog_api.create_endpoint(endpoint['id'], endpoint.copy())
+        driver = PROVIDERS.catalog_api.driver
+
+        catalog = driver.get_v3_catalog(self.user_foo['id'],
+                                        self.project_bar['id'])
+        self.assertEqual(
+            'http://example.com/%s/%s' % (self.user_foo['id'],
+                                          self.project_bar['id']),
+            catalog[0]['endpoints'][0]['url'])
+
+        url = 'http://example.com/v2/$(project_id)s'
+        PROVIDERS.catalog_api.update_endpoint(endpoint['id'], {'url': url})
+        catalog = driver.get_v3_catalog(self.user_foo['id'],
+                                        self.project_bar['id'])
+        self.assertEqual(
+            'http://example.com/v2/%s' % self.project_bar['id'],
+            catalog[0]['endpoints'][0]['url'])
+
+        PROVIDERS.catalog_api.update_service(service['id'],
+                                             {'enabled': False})
+        catalog = driver.get_v3_catalog(self.user_foo['id'],
+                                        self.project_bar['id'])
+        self.assertEqual([], catalog)
+
+    def test_get_v3_catalog_filtered_from_index(self):
+        self._create_large_catalog(services=20, regions=5)
+        driver = PROVIDERS.catalog_api.driver
+        endpoints = driver.list_endpoints(driver_hints.Hints())
+        service_ids = sorted(set(ep['service_id'] for ep in endpoints))
+        region_ids = sorted(set(ep['region_id'] for ep in endpoints))
+
+        # 100 endpoint groups and 5000 projects, each associated with two
+        # endpoint groups, one in five also directly with an endpoint.
+        filters = [{'service_id': service_id, 'region_id': region_id}
+                   for service_id, region_id in itertools.product(
+                       service_ids, region_ids)]
+        endpoint_groups = []
+        group_endpoint_ids = {}
+        for group_filters in filters:
+            endpoint_group = unit.new_endpoint_group_ref(group_filters)
+            endpoint_groups.append(endpoint_group)
+            PROVIDERS.catalog_api.create_endpoint_group(endpoint_group['id'],
+                                                        endpoint_group)
+            group_endpoint_ids[endpoint_group['id']] = set(
+                ep['id'] for ep in endpoints
+                if all(ep[k] == v for k, v in group_filters.items()))
+        project_ids = [uuid.uuid4().hex for i in range(5000)]
+        expected = {}
+        with sql.session_for_write() as session:
+            for i, project_id in enumerate(project_ids):
+                expected[project_id] = set()
+                endpoint_group_ids = set([endpoint_groups[i % 100]['id'],
+                                          endpoint_groups[i * 7 % 100]['id']])
+                for endpoint_group_id in endpoint_group_ids:
+                    session.add(catalog_sql.ProjectEndpointGroupMembership(
+                        endpoint_group_id=endpoint_group_id,
+                        project_id=project_id))
+                    expected[project_id].update(
+                        group_endpoint_ids[endpoint_group_id])
+                if not i % 5:
+                    endpoint_id = endpoints[i % len(endpoints)]['id']
+                    session.add(catalog_sql.ProjectEndpoint(
+                        endpoint_id=endpoint_id, project_id=project_id))
+                    expected[project_id].add(endpoint_id)
+        PROVIDERS.catalog_api.add_endpoint_to_project(
+            endpoints[0]['id'], project_ids[1])
+        expected[project_ids[1]].add(endpoints[0]['id'])
+
+        catalog_api = PROVIDERS.catalog_api
+        with mock.patch.object(
+                catalog_api, '_compile_endpoint_filter_index',
+                wraps=catalog_api._compile_endpoint_filter_index) as compile:
+            with mock.patch.object(
+                    driver, 'list_endpoint_groups_for_project') as per_project:
+                for project_id in project_ids[:50]:
+                    catalog = driver.get_v3_catalog(self.user_foo['id'],
+                                                    project_id)
+                    self.assertEqual(
+                        expected[project_id],
+                        set(ep['id'] for service in catalog
+                            for ep in service['endpoints']))
+                self.assertFalse(per_project.called)
+        self.assertEqual(1, compile.call_count)
+
+    def test_get_v3_catalog_after_endpoint_group_changes(self):
+        service = unit.new_service_ref()
+        PROVIDERS.catalog_api.create_service(service['id'], service)
+        public, admin = [
+            unit.new_endpoint_ref(service_id=service['id'], region_id=None,
+                                  interface=interface)
+            for interface in ('public', 'admin')]
+        for endpoint in (public, admin):
+            PROVIDERS.catalog_api.create_endpoint(endpoint['id'],
+                                                  endpoint.copy())
+        endpoint_group = unit.new_endpoint_group_ref({'interface': 'public'})
+        PROVIDERS.catalog_api.create_endpoint_group(endpoint_group['id'],
+                                                    endpoint_group)
+        PROVIDERS.catalog_api.add_endpoint_group_to_project(
+            endpoint_group['id'], self.project_bar['id'])
+
+        def endpoint_ids():
+            catalog = PROVIDERS.catalog_api.driver.get_v3_catalog(
+                self.user_foo['id'], self.project_bar['id'])
+            return [ep['id'] for service in catalog
+                    for ep in service['endpoints']]
+
+        self.assertEqual([public['id']], endpoint_ids())
+
+        PROVIDERS.catalog_api.update_endpoint_group(
+            endpoint_group['id'], {'filters': {'interface': 'admin'}})
+        self.assertEqual([admin['id']], endpoint_ids())
+
+        PROVIDERS.catalog_api.delete_endpoint_group(endpoint_group['id'])
+        self.assertEqual(sorted([public['id'], admin['id']]),
+                         sorted(endpoint_ids()))
+
+    def test_get_v3_catalog_without_caching(self):
+        service = unit.new_service_ref()
+        PROVIDERS.catalog_api.create_service(service['id'], service)
+        public, admin, internal = [
+            unit.new_endpoint_ref(service_id=service['id'], region_id=None,
+                                  interface=interface)
+            for interface in ('public', 'admin', 'internal')]
+        for endpoint in (public, admin, internal):
+            PROVIDERS.catalog_api.create_endpoint(endpoint['id'],
+                                                  endpoint.copy())
+        endpoint_group = unit.new_endpoint_group_ref({'interface': 'public'})
+        PROVIDERS.catalog_api.create_endpoint_group(endpoint_group['id'],
+                                                    endpoint_group)
+        PROVIDERS.catalog_api.add_endpoint_group_to_project(
+            endpoint_group['id'], self.project_bar['id'])
+        PROVIDERS.catalog_api.add_endpoint_to_project(
+            admin['id'], self.project_bar['id'])
+
+        # NOTE: With caching disabled, the invalidation region can't keep the
+        # catalog tag, so every read returns a new one.
+        catalog_api = PROVIDERS.catalog_api
+        with mock.patch.object(catalog_api, 'get_computed_catalog_tag',
+                               side_effect=lambda: uuid.uuid4().hex):
+            with mock.patch.object(
+                    catalog_api, '_compile_endpoint_filter_index') as compile:
+                for _ in range(3):
+                    catalog = catalog_api.driver.get_v3_catalog(
+                        self.user_foo['id'], self.project_bar['id'])
+                    self.assertEqual(
+                        sorted([public['id'], admin['id']]),
+                        sorted(ep['id'] for service in catalog
+                               for ep in service['endpoints']))
+                self.assertFalse(compile.called)
+
     def test_get_v3_catalog_with_empty_public_url(self):
         service = unit.new_service_ref()
         PROVIDERS.catalog_api.create_service(service['id'], service)
@@ -1004,6 +1340,105 @@ class SqlFilterTests(SqlTests, identity_tests.FilterTests):
         groups = PROVIDERS.identity_api.list_groups()
         self.assertGreater(len(groups), 0)
 
+    def test_list_users_case_sensitive_inexact_filtered(self):
+        user_name_data = {
+            0: 'The Ministry',
+            1: 'the ministry',
+            2: 'THE MINISTRY OF',
+        }
+        user_list = self._create_test_data('user', 4,
+                                           name_dict=user_name_data)
+
+        for comparator, value, index in (('contains', 'Ministry', 0),
+                                         ('startswith', 'the', 1),
+                                         ('endswith', 'OF', 2)):
+            hints = driver_hints.Hints()
+            hints.add_filter('name', value, comparator=comparator,
+                             case_sensitive=True)
+            users = PROVIDERS.identity_api.list_users(hints=hints)
+            self.assertEqual([user_list[index]['id']],
+                             [user['id'] for user in users])
+            # Check the driver has satisfied the filter, so that there is
+            # nothing left to filter by the controller
+            self.assertEqual([], hints.filters)
+
+        self._delete_test_data('user', user_list)
+
+    def test_inexact_filter_wildcards_match_literally(self):
+        group_name_data = {
+            0: '50% off',
+            1: '50 off',
+            2: 'a_b',
+            3: 'axb',
+        }
+        group_list = self._create_test_data('group', 4,
+                                            name_dict=group_name_data)
+
+        for case_sensitive in (True, False):
+            for comparator, value, index in (('contains', '%', 0),
+                                             ('startswith', 'a_', 2)):
+                hints = driver_hints.Hints()
+                hints.add_filter('name', value, comparator=comparator,
+                                 case_sensitive=case_sensitive)
+                groups = PROVIDERS.identity_api.list_groups(hints=hints)
+                self.assertEqual([group_list[index]['id']],
+                                 [group['id'] for group in groups])
+                self.assertEqual([], hints.filters)
+
+        self._delete_test_data('group', group_list)
+
+    def test_list_projects_filtered_by_tags(self):
+        project_tags = [['a'], ['a', 'b'], ['b', 'c'], []]
+        projects = []
+        for tags in project_tags:
+            project = unit.new_project_ref(
+                domain_id=CONF.identity.default_domain_id, tags=tags)
+            projects.append(
+                PROVIDERS.resource_api.create_project(project['id'], project))
+
+        for name, value, indexes in (('tags', 'a,b', [1]),
+                                     ('tags-any', 'a,c', [0, 1, 2]),
+                                     ('not-tags', 'a,b', [0, 2, 3]),
+                                     ('not-tags-any', 'a,c', [3])):
+            hints = driver_hints.Hints()
+            hints.add_filter(name, value)
+            refs = PROVIDERS.resource_api.driver.list_projects(hints)
+            expected_ids = [projects[index]['id'] for index in indexes]
+            self.assertEqual(
+                sorted(expected_ids),
+                sorted(ref['id'] for ref in refs
+                       if ref['id'] in [p['id'] for p in projects]))
+            # Check the driver has satisfied the tag filter
+            self.assertEqual([], hints.filters)
+
+        hints = driver_hints.Hints()
+        hints.add_filter('tags', 'b')
+        hints.add_filter('not-tags-any', 'c')
+        refs = PROVIDERS.resource_api.list_projects(hints)
+        self.assertEqual([projects[1]['id']], [ref['id'] for ref in refs])
+
+    def test_list_idps_filtered_by_list_valued_attribute(self):
+        idp_remote_ids = [[uuid.uuid4().hex, uuid.uuid4().hex],
+                          [uuid.uuid4().hex], []]
+        idp_ids = []
+        for remote_ids in idp_remote_ids:
+            idp = {'id': uuid.uuid4().hex, 'enabled': True,
+                   'remote_ids': remote_ids}
+            PROVIDERS.federation_api.create_idp(idp['id'], idp)
+            idp_ids.append(idp['id'])
+
+        # A list-valued attribute matches if it contains the value.
+        for remote_id, expected_ids in ((idp_remote_ids[0][1], idp_ids[:1]),
+                                        (idp_remote_ids[1][0], idp_ids[1:2]),
+                                        (uuid.uuid4().hex, [])):
+            hints = driver_hints.Hints()
+            hints.add_filter('remote_ids', remote_id)
+            idps = PROVIDERS.federation_api.list_idps(hints=hints)
+            self.assertEqual(expected_ids, [idp['id'] for idp in idps])
+            # Check the driver has satisfied the filter, so that there is
+            # nothing left to filter by the controller
+            self.assertEqual([], hints.filters)
+
 
 class SqlLimitTests(SqlTests, identity_tests.LimitTests):
     def setUp(self):
@@ -1697,6 +1697,144 @@ class TestTrustFlush(unit.SQLDriverOverrides, unit.BaseTestCase):
         self.assertRaises(ValueError, trust.main)
 
 
+class TestRevocationFlush(unit.BaseTestCase):
+
+    class FakeConfCommand(object):
+        def __init__(self, parent):
+            self.extension = False
+            self.batch_size = parent.command_batch_size
+            self.batch_delay = parent.command_batch_delay
+
+    def setUp(self):
+        super(TestRevocationFlush, self).setUp()
+        self.config_fixture = self.useFixture(oslo_config.fixture.Config(CONF))
+        self.config_fixture.register_cli_opt(cli.command_opt)
+        self.revoke_api = mock.Mock()
+        self.useFixture(fixtures.MockPatch(
+            'keystone.server.backends.load_backends',
+            return_value={'revoke_api': self.revoke_api}))
+
+    def _main(self, batch_size=None, batch_delay=None):
+        self.command_batch_size = batch_size
+        self.command_batch_delay = batch_delay
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        cli.RevocationFlush.main()
+
+    def test_revocation_flush_reports_progress(self):
+        def fake_prune(batch_size, batch_delay, progress):
+            progress(100)
+            progress(150)
+            return 150
+
+        self.revoke_api.prune_expired_events.side_effect = fake_prune
+        stdout = self.useFixture(fixtures.StringStream('stdout')).stream
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', stdout))
+        self._main(batch_size=100, batch_delay=0.5)
+
+        self.revoke_api.prune_expired_events.assert_called_once_with(
+            batch_size=100, batch_delay=0.5, progress=mock.ANY)
+        stdout.seek(0)
+        self.assertEqual(
+            ['Deleted 100 expired revocation events so far.',
+             'Deleted 150 expired revocation events so far.',
+             'Deleted 150 expired revocation events.'],
+            stdout.read().splitlines())
+
+    def test_revocation_flush_defaults_to_configuration(self):
+        self.revoke_api.prune_expired_events.return_value = 0
+        self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', self.useFixture(
+                fixtures.StringStream('stdout')).stream))
+        self._main()
+        self.revoke_api.prune_expired_events.assert_called_once_with(
+            batch_size=None, batch_delay=None, progress=mock.ANY)
+
+    def test_revocation_flush_with_invalid_batch_options(self):
+        self.assertRaises(SystemExit, self._main, batch_size=0)
+        self.assertRaises(SystemExit, self._main, batch_delay=-1)
+        self.revoke_api.prune_expired_events.assert_not_called()
+
+
+class TestRevocationCompact(unit.BaseTestCase):
+
+    def setUp(self):
+        super(TestRevocationCompact, self).setUp()
+        self.revoke_api = mock.Mock()
+        self.useFixture(fixtures.MockPatch(
+            'keystone.server.backends.load_backends',
+            return_value={'revoke_api': self.revoke_api}))
+        self.stdout = self.useFixture(fixtures.StringStream('stdout')).stream
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', self.stdout))
+
+    def _main(self):
+        cli.RevocationCompact.main()
+        self.stdout.seek(0)
+        return self.stdout.read().splitlines()
+
+    def test_revocation_compact_reports_reduction(self):
+        self.revoke_api.compact_events.return_value = (200, 150)
+        self.assertEqual(['Deleted 150 of 200 revocation events (75.0%).'],
+                         self._main())
+        self.revoke_api.compact_events.assert_called_once_with()
+
+    def test_revocation_compact_without_events(self):
+        self.revoke_api.compact_events.return_value = (0, 0)
+        self.assertEqual(['Deleted 0 of 0 revocation events (0.0%).'],
+                         self._main())
+
+
+class TestRevocationExport(unit.BaseTestCase):
+
+    class FakeConfCommand(object):
+        def __init__(self, parent):
+            self.extension = False
+            self.output = parent.command_output
+
+    def setUp(self):
+        super(TestRevocationExport, self).setUp()
+        self.config_fixture = self.useFixture(oslo_config.fixture.Config(CONF))
+        self.config_fixture.register_cli_opt(cli.command_opt)
+        self.config_fixture.config(group='revoke',
+                                   snapshot_file='/tmp/snapshot')
+        self.revoke_api = mock.Mock()
+        self.useFixture(fixtures.MockPatch(
+            'keystone.server.backends.load_backends',
+            return_value={'revoke_api': self.revoke_api}))
+        self.stdout = self.useFixture(fixtures.StringStream('stdout')).stream
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', self.stdout))
+
+    def _main(self, output=None):
+        self.command_output = output
+        self.useFixture(fixtures.MockPatchObject(
+            CONF, 'command', self.FakeConfCommand(self)))
+        cli.RevocationExport.main()
+        self.stdout.seek(0)
+        return self.stdout.read().splitlines()
+
+    def test_revocation_export(self):
+        self.revoke_api.export_events.return_value = (
+            12, datetime.datetime(2019, 3, 1, 10, 20, 30))
+        self.assertEqual(
+            ['Exported 12 revocation events to /tmp/snapshot, with a '
+             'high-water mark of 2019-03-01T10:20:30.000000Z.'],
+            self._main())
+        self.revoke_api.export_events.assert_called_once_with(
+            '/tmp/snapshot')
+
+    def test_revocation_export_to_another_file(self):
+        self.revoke_api.export_events.return_value = (0, None)
+        self.assertEqual(
+            ['Exported 0 revocation events to /tmp/other, with a '
+             'high-water mark of none.'],
+            self._main(output='/tmp/other'))
+        self.revoke_api.export_events.assert_called_once_with('/tmp/other')
+
+    def test_revocation_export_fails_to_write(self):
+        self.revoke_api.export_events.side_effect = IOError('denied')
+        self.assertRaises(SystemExit, self._main)
+
+
 class TestMappingEngineTester(unit.BaseTestCase):
 
     class FakeConfCommand(object):
@@ -58,3 +58,22 @@ class ListHintsTests(test.TestCase):
         hints.set_limit(10, truncated=True)
         self.assertEqual(10, hints.limit['limit'])
         self.assertTrue(hints.limit['truncated'])
+
+    def test_cap_limit(self):
+        hints = driver_hints.Hints()
+        hints.cap_limit(10)
+        self.assertEqual(10, hints.limit['limit'])
+        hints.cap_limit(20)
+        self.assertEqual(10, hints.limit['limit'])
+        hints.cap_limit(5)
+        self.assertEqual(5, hints.limit['limit'])
+
+    def test_markers(self):
+        hints = driver_hints.Hints()
+        self.assertIsNone(hints.marker)
+        hints.set_marker(None)
+        self.assertIsNone(hints.marker['marker'])
+        self.assertFalse(hints.marker['ordered'])
+        hints.set_marker('id1', ordered=True)
+        self.assertEqual('id1', hints.marker['marker'])
+        self.assertTrue(hints.marker['ordered'])
@@ -12,18 +12,31 @@
 
 
 import datetime
+import os
+import random
+import stat
+import threading
+import time
 import uuid
 
+import fixtures
 import mock
+from oslo_config import fixture as config_fixture
 from oslo_utils import timeutils
 from testtools import matchers
 
+from keystone.common import fernet_utils
 from keystone.common import provider_api
 from keystone.common import utils
 import keystone.conf
 from keystone import exception
 from keystone.models import revoke_model
+from keystone.revoke.backends import base
+from keystone.revoke.backends import snapshot as snapshot_backend
 from keystone.revoke.backends import sql
+from keystone.revoke import core
+from keystone.revoke import pruner
+from keystone.revoke import snapshot
 from keystone.tests import unit
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit import test_backend_sql
@@ -47,6 +60,57 @@ def _sample_blank_token():
     return token_data
 
 
+class _RandomRevocations(object):
+    """Generate random revocation events and tokens.
+
+    Values are drawn from small pools, so that many events overlap and
+    subsume each other, and many tokens match the events.
+
+    """
+
+    ATTRIBUTES = ['user_id', 'project_id', 'domain_id', 'role_id',
+                  'trust_id', 'consumer_id', 'audit_id', 'audit_chain_id',
+                  'expires_at']
+
+    def __init__(self, seed, now, pool_size=2):
+        self.random = random.Random(seed)
+        self.times = [now - datetime.timedelta(minutes=i)
+                      for i in range(4)]
+        self.values = dict(
+            (name, [uuid.uuid4().hex[:32] for _ in range(pool_size)])
+            for name in self.ATTRIBUTES)
+        self.values['expires_at'] = self.times[:pool_size]
+
+    def event(self, attributes=None):
+        attributes = attributes or self.ATTRIBUTES
+        kwargs = dict(
+            (name, self.random.choice(self.values[name]))
+            for name in attributes
+            if self.random.random() < 0.3)
+        issued_before, revoked_at = sorted(
+            self.random.choice(self.times) for _ in range(2))
+        return revoke_model.RevokeEvent(issued_before=issued_before,
+                                        revoked_at=revoked_at, **kwargs)
+
+    def token(self):
+        token_data = revoke_model.blank_token_data(
+            self.random.choice(self.times) -
+            datetime.timedelta(seconds=self.random.choice([-1, 1])))
+        for name in self.ATTRIBUTES + ['trustor_id', 'trustee_id',
+                                       'identity_domain_id',
+                                       'assignment_domain_id']:
+            pool = self.values.get(name)
+            if pool is None:
+                pool = self.values['domain_id' if 'domain' in name
+                                   else 'user_id']
+            # some values are unknown to every event
+            token_data[name] = self.random.choice(pool + [None, 'other'])
+        token_data['roles'] = self.random.sample(
+            self.values['role_id'] + ['other'],
+            self.random.randint(0, len(self.values['role_id']) + 1))
+        return token_data
+
+
 class RevokeTests(object):
 
     def _assertTokenRevoked(self, token_data):
@@ -451,6 +515,768 @@ class RevokeTests(object):
         PROVIDERS.identity_api.delete_group(group2['id'])
         self.assertEqual(2, len(revocation_backend.list_events()))
 
+    def test_check_token_uses_revocation_index(self):
+        token = _sample_blank_token()
+        token['user_id'] = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_user(user_id=token['user_id'])
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver, 'list_events',
+                               wraps=PROVIDERS.revoke_api.driver.list_events
+                               ) as list_events:
+            self._assertTokenRevoked(token)
+            self._assertTokenRevoked(token)
+            self._assertTokenNotRevoked(_sample_blank_token())
+
+            # events are never filtered by token in the backend, and only
+            # the initial load and the first delta reach the backend
+            for call in list_events.call_args_list:
+                self.assertIsNone(call[1].get('token'))
+            self.assertEqual(2, list_events.call_count)
+
+            # revoking a token invalidates the cached delta
+            second_token = _sample_blank_token()
+            second_token['audit_id'] = provider.random_urlsafe_str()
+            PROVIDERS.revoke_api.revoke_by_audit_id(
+                audit_id=second_token['audit_id'])
+            self._assertTokenRevoked(second_token)
+            self.assertEqual(3, list_events.call_count)
+
+    def test_check_token_sees_events_revoked_in_the_same_second(self):
+        revocation_backend = sql.Revoke()
+        now = timeutils.utcnow().replace(microsecond=0)
+        first_token = _sample_blank_token()
+        first_token['user_id'] = uuid.uuid4().hex
+        second_token = _sample_blank_token()
+        second_token['user_id'] = uuid.uuid4().hex
+
+        revocation_backend.revoke(revoke_model.RevokeEvent(
+            user_id=first_token['user_id'], revoked_at=now))
+        self._assertTokenRevoked(first_token)
+        self._assertTokenNotRevoked(second_token)
+
+        revocation_backend.revoke(revoke_model.RevokeEvent(
+            user_id=second_token['user_id'], revoked_at=now))
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self._assertTokenRevoked(second_token)
+
+    def _revoke_users(self, count, revoked_at=None):
+        revocation_backend = sql.Revoke()
+        for _ in range(count):
+            revocation_backend.revoke(revoke_model.RevokeEvent(
+                user_id=uuid.uuid4().hex, revoked_at=revoked_at))
+
+    def _expired_revoked_at(self):
+        cutoff = timeutils.utcnow() - datetime.timedelta(
+            seconds=CONF.token.expiration + CONF.revoke.expiration_buffer)
+        return cutoff.replace(microsecond=0) - datetime.timedelta(minutes=1)
+
+    def test_index_matches_every_event(self):
+        # Compare the decisions of the index with the decisions made from the
+        # events the backend returns for each token, for many combinations
+        # of event and token attributes.
+        now = timeutils.utcnow().replace(microsecond=0)
+        values = dict((name, [uuid.uuid4().hex for _ in range(3)])
+                      for name in ('user', 'project', 'domain', 'audit',
+                                   'role', 'trust', 'consumer'))
+        attributes = [('user_id', 'user'), ('project_id', 'project'),
+                      ('domain_id', 'domain'), ('audit_id', 'audit'),
+                      ('audit_chain_id', 'audit'), ('role_id', 'role'),
+                      ('trust_id', 'trust'), ('consumer_id', 'consumer')]
+
+        events = []
+        for i, (name, kind) in enumerate(attributes * 6):
+            other_name, other_kind = attributes[(i * 5) % len(attributes)]
+            kwargs = {name: values[kind][i % 3],
+                      'revoked_at': now - datetime.timedelta(seconds=i)}
+            if i % 2:
+                kwargs[other_name] = values[other_kind][(i // 2) % 3]
+            if i % 7 == 0:
+                kwargs['expires_at'] = now
+            events.append(revoke_model.RevokeEvent(**kwargs))
+        events.append(revoke_model.RevokeEvent(
+            revoked_at=now - datetime.timedelta(seconds=30)))
+        driver = sql.Revoke()
+        driver.revoke_events(events)
+
+        index = revoke_model.RevokeIndex()
+        index.add_events(driver.list_events())
+
+        for i in range(200):
+            token_data = revoke_model.blank_token_data(
+                now - datetime.timedelta(seconds=i % 60))
+            token_data['user_id'] = values['user'][i % 3]
+            token_data['trustor_id'] = values['user'][(i // 3) % 3]
+            token_data['project_id'] = values['project'][(i // 2) % 3]
+            token_data['identity_domain_id'] = values['domain'][i % 3]
+            token_data['assignment_domain_id'] = values['domain'][
+                (i // 5) % 3]
+            token_data['audit_id'] = values['audit'][(i // 7) % 3]
+            token_data['audit_chain_id'] = values['audit'][(i // 11) % 3]
+            token_data['roles'] = [values['role'][i % 3]]
+            token_data['trust_id'] = values['trust'][(i // 13) % 3]
+            token_data['consumer_id'] = values['consumer'][(i // 17) % 3]
+            token_data['expires_at'] = now if i % 2 else None
+            self.assertEqual(
+                revoke_model.is_revoked(driver.list_events(token=token_data),
+                                        token_data),
+                index.is_revoked(token_data))
+
+    def test_check_token_fetches_events_outside_the_lock(self):
+        token_data = _sample_blank_token()
+        token_data['user_id'] = uuid.uuid4().hex
+        revoke_api = PROVIDERS.revoke_api
+        revoke_api.check_token(token_data)
+        revoke_api.revoke_by_user(user_id=token_data['user_id'])
+
+        def list_events(last_fetch=None):
+            self.assertFalse(revoke_api._index_lock.locked())
+            return revoke_api.driver.list_events(last_fetch=last_fetch)
+
+        with mock.patch.object(revoke_api, 'list_events',
+                               side_effect=list_events) as fetch:
+            self.assertRaises(exception.TokenNotFound,
+                              revoke_api.check_token, token_data)
+        self.assertEqual(1, fetch.call_count)
+
+    def test_revoke_does_not_prune_expired_events(self):
+        self._revoke_users(3, revoked_at=self._expired_revoked_at())
+        PROVIDERS.revoke_api.revoke_by_user(user_id=uuid.uuid4().hex)
+        self.assertEqual(4, len(sql.Revoke().list_events()))
+
+    def test_prune_expired_events_in_batches(self):
+        self._revoke_users(25, revoked_at=self._expired_revoked_at())
+        self._revoke_users(3)
+
+        progress = mock.Mock()
+        with mock.patch.object(PROVIDERS.revoke_api.driver, 'prune_events',
+                               wraps=PROVIDERS.revoke_api.driver.prune_events
+                               ) as prune_events:
+            self.assertEqual(
+                25, PROVIDERS.revoke_api.prune_expired_events(
+                    batch_size=10, batch_delay=0, progress=progress))
+        self.assertEqual([10, 10, 10, 10], [
+            call[0][1] for call in prune_events.call_args_list])
+        self.assertEqual([mock.call(10), mock.call(20), mock.call(25)],
+                         progress.call_args_list)
+        self.assertEqual(3, len(sql.Revoke().list_events()))
+
+        # there is nothing left to prune
+        self.assertEqual(0, PROVIDERS.revoke_api.prune_expired_events())
+
+    def test_prune_expired_events_defaults_to_configuration(self):
+        self.config_fixture.config(group='revoke', prune_batch_size=2,
+                                   prune_batch_delay=0.5)
+        self._revoke_users(3, revoked_at=self._expired_revoked_at())
+        with mock.patch.object(core.time, 'sleep') as sleep:
+            self.assertEqual(3, PROVIDERS.revoke_api.prune_expired_events())
+        # the database layer yields with sleep(0) on its own
+        self.assertEqual([mock.call(0.5), mock.call(0.5)],
+                         [call for call in sleep.call_args_list
+                          if call != mock.call(0)])
+
+    def test_revoke_events_in_one_transaction(self):
+        tokens = [_sample_blank_token() for _ in range(3)]
+        for token in tokens:
+            token['user_id'] = uuid.uuid4().hex
+        audit_token = _sample_blank_token()
+        audit_token['audit_id'] = provider.random_urlsafe_str()
+        self._assertTokenNotRevoked(tokens[0])
+
+        driver = PROVIDERS.revoke_api.driver
+        with mock.patch.object(driver, 'revoke') as revoke, \
+                mock.patch.object(driver, 'revoke_events',
+                                  wraps=driver.revoke_events
+                                  ) as revoke_events, \
+                mock.patch.object(core.REVOKE_REGION,
+                                  'invalidate') as invalidate, \
+                mock.patch.object(core.notifications.Audit,
+                                  'created') as created:
+            events = PROVIDERS.revoke_api.revoke_by_users(
+                [token['user_id'] for token in tokens])
+        revoke.assert_not_called()
+        revoke_events.assert_called_once_with(events)
+        invalidate.assert_called_once_with()
+        created.assert_called_once_with('revocation_batch', mock.ANY, None)
+        self.assertEqual(1, len(set(event.revoked_at for event in events)))
+
+        PROVIDERS.revoke_api.revoke_by_audit_ids([audit_token['audit_id']])
+        for token in tokens + [audit_token]:
+            self._assertTokenRevoked(token)
+        self._assertTokenNotRevoked(_sample_blank_token())
+
+    def test_revoke_no_events(self):
+        with mock.patch.object(PROVIDERS.revoke_api.driver,
+                               'revoke_events') as revoke_events:
+            self.assertEqual([], PROVIDERS.revoke_api.revoke_events([]))
+        revoke_events.assert_not_called()
+
+    def test_revoke_events_rejects_domain_and_project_scoped_event(self):
+        events = [revoke_model.RevokeEvent(user_id=uuid.uuid4().hex),
+                  revoke_model.RevokeEvent(project_id=uuid.uuid4().hex,
+                                           domain_id=uuid.uuid4().hex)]
+        self.assertRaises(exception.UnexpectedError,
+                          PROVIDERS.revoke_api.revoke_events, events)
+        self.assertEqual([], sql.Revoke().list_events())
+
+    def test_revoke_deletes_subsumed_events(self):
+        user_id = uuid.uuid4().hex
+        other_user_id = uuid.uuid4().hex
+        audit_ids = [provider.random_urlsafe_str() for _ in range(3)]
+        for audit_id, uid in zip(audit_ids,
+                                 (user_id, user_id, other_user_id)):
+            PROVIDERS.revoke_api.revoke_by_audit_id(audit_id, user_id=uid)
+        PROVIDERS.revoke_api.revoke_by_user(user_id=user_id)
+        PROVIDERS.revoke_api.revoke_by_user(user_id=user_id)
+
+        events = sql.Revoke().list_events()
+        self.assertEqual({(user_id, None), (other_user_id, audit_ids[2])},
+                         set((e.user_id, e.audit_id) for e in events))
+        self.assertEqual(2, len(events))
+
+    def test_revoke_leaves_unindexed_subsumed_events_to_compaction(self):
+        user_id = uuid.uuid4().hex
+        project_id = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_audit_id(
+            provider.random_urlsafe_str(), user_id=user_id)
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=user_id, project_id=project_id,
+            role_id=uuid.uuid4().hex))
+        # neither event is constrained by a single indexed column, so the
+        # events they subsume are kept until the events are compacted
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=user_id, project_id=project_id))
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=user_id, project_id=project_id))
+        self.assertEqual(4, len(sql.Revoke().list_events()))
+
+        self.assertEqual((4, 2), PROVIDERS.revoke_api.compact_events())
+        self.assertEqual(2, len(sql.Revoke().list_events()))
+
+    def test_revoke_keeps_events_revoking_later_tokens(self):
+        now = timeutils.utcnow().replace(microsecond=0)
+        user_id = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke_by_audit_id(
+            provider.random_urlsafe_str(), user_id=user_id)
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=user_id, issued_before=now - datetime.timedelta(hours=1),
+            revoked_at=now + datetime.timedelta(seconds=1)))
+        self.assertEqual(2, len(sql.Revoke().list_events()))
+
+    def test_revoke_events_keeps_revocation_decisions(self):
+        # Record random batches of events, which are compacted as they are
+        # recorded, and compare the decisions made from the recorded events
+        # with the decisions made from every event.
+        # Every attribute has a single value, so that most events recorded
+        # later subsume or are subsumed by events recorded earlier.
+        generator = _RandomRevocations(
+            seed=24, now=timeutils.utcnow().replace(microsecond=0),
+            pool_size=1)
+        # NOTE: Events can't be both domain and project scoped, and the SQL
+        # backend doesn't store domain scoped token revocations, so events
+        # don't revoke domains.
+        attributes = [name for name in generator.ATTRIBUTES
+                      if name != 'domain_id']
+        events = []
+        for _ in range(30):
+            batch = [generator.event(attributes)
+                     for _ in range(generator.random.randint(1, 6))]
+            PROVIDERS.revoke_api.revoke_events(batch)
+            events.extend(batch)
+
+        recorded = sql.Revoke().list_events()
+        self.assertLess(len(recorded), len(events))
+        index = revoke_model.RevokeIndex()
+        index.add_events(recorded)
+        for _ in range(500):
+            token_data = generator.token()
+            self.assertEqual(
+                any(revoke_model._matches_token(event, token_data)
+                    for event in events),
+                index.is_revoked(token_data))
+
+    def _record_events(self, events):
+        # Record events without compacting them, as older releases did.
+        with sql.sql.session_for_write() as session:
+            for event in events:
+                session.add(sql.RevocationEvent(
+                    **sql.Revoke._to_record(event)))
+
+    def test_compact_events(self):
+        now = timeutils.utcnow().replace(microsecond=0)
+        user_id = uuid.uuid4().hex
+        events = [revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex,
+                                           user_id=user_id, revoked_at=now)
+                  for _ in range(3)]
+        events.append(revoke_model.RevokeEvent(user_id=user_id,
+                                               revoked_at=now))
+        events.append(revoke_model.RevokeEvent(user_id=user_id,
+                                               revoked_at=now))
+        events.append(revoke_model.RevokeEvent(user_id=uuid.uuid4().hex,
+                                               revoked_at=now))
+        self._record_events(events)
+        self.config_fixture.config(group='revoke', prune_batch_size=2)
+
+        with mock.patch.object(core.REVOKE_REGION,
+                               'invalidate') as invalidate:
+            self.assertEqual((6, 4), PROVIDERS.revoke_api.compact_events())
+        invalidate.assert_called_once_with()
+        self.assertEqual(2, len(sql.Revoke().list_events()))
+
+        # the events are already compact
+        with mock.patch.object(core.REVOKE_REGION,
+                               'invalidate') as invalidate:
+            self.assertEqual((2, 0), PROVIDERS.revoke_api.compact_events())
+        invalidate.assert_not_called()
+
+    def test_compact_events_falls_back_to_not_compacting(self):
+        driver = mock.Mock()
+        driver.list_events.return_value = [mock.Mock(), mock.Mock()]
+        self.assertEqual((2, 0), base.RevokeDriverBase.compact_events(driver))
+
+    def test_export_events(self):
+        now = timeutils.utcnow().replace(microsecond=0)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'snapshot')
+        self._revoke_users(2, revoked_at=self._expired_revoked_at())
+        user_id = uuid.uuid4().hex
+        project_id = uuid.uuid4().hex
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=user_id, revoked_at=now - datetime.timedelta(seconds=1)))
+        # recorded after the user event, so it isn't compacted on insert
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            audit_id=uuid.uuid4().hex, user_id=user_id,
+            revoked_at=now - datetime.timedelta(seconds=2)))
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            project_id=project_id, revoked_at=now))
+        self.assertEqual(5, len(sql.Revoke().list_events()))
+
+        self.assertEqual((2, now), PROVIDERS.revoke_api.export_events(path))
+        with open(path, 'rb') as f:
+            exported = snapshot.loads(f.read())
+        self.assertEqual(now, exported.high_water_mark)
+        # expired events are left out, and the audit event is subsumed
+        self.assertEqual([(user_id, None), (None, project_id)],
+                         [(e.user_id, e.project_id)
+                          for e in exported.events])
+
+    def test_export_no_events(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'snapshot')
+        self.assertEqual((0, None), PROVIDERS.revoke_api.export_events(path))
+        with open(path, 'rb') as f:
+            exported = snapshot.loads(f.read())
+        self.assertEqual([], exported.events)
+        self.assertIsNone(exported.high_water_mark)
+
+    def test_revoke_events_falls_back_to_single_revocations(self):
+        events = [revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)
+                  for _ in range(2)]
+        driver = mock.Mock()
+        base.RevokeDriverBase.revoke_events(driver, events)
+        self.assertEqual([mock.call(event) for event in events],
+                         driver.revoke.call_args_list)
+
+
+class RevokeIndexTests(unit.BaseTestCase):
+
+    def _matches_any(self, events, token_data):
+        return any(revoke_model._matches_token(e, token_data)
+                   for e in events)
+
+    def test_duplicate_events_are_ignored(self):
+        index = revoke_model.RevokeIndex()
+        event = revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)
+        duplicate = revoke_model.RevokeEvent(**event.__dict__)
+        self.assertEqual(1, index.add_events([event, duplicate]))
+        self.assertEqual(1, len(index))
+
+    def test_last_revoked_at(self):
+        index = revoke_model.RevokeIndex()
+        self.assertIsNone(index.last_revoked_at)
+        now = timeutils.utcnow().replace(microsecond=0)
+        earlier = now - datetime.timedelta(seconds=10)
+        index.add_event(revoke_model.RevokeEvent(audit_id='a',
+                                                 revoked_at=now))
+        index.add_event(revoke_model.RevokeEvent(audit_id='b',
+                                                 revoked_at=earlier))
+        self.assertEqual(now, index.last_revoked_at)
+
+    def test_prune(self):
+        index = revoke_model.RevokeIndex()
+        now = timeutils.utcnow().replace(microsecond=0)
+        old_event = revoke_model.RevokeEvent(
+            user_id=uuid.uuid4().hex,
+            revoked_at=now - datetime.timedelta(hours=3))
+        new_event = revoke_model.RevokeEvent(user_id=uuid.uuid4().hex,
+                                             revoked_at=now)
+        index.add_events([old_event, new_event])
+
+        self.assertEqual(0, index.prune(now - datetime.timedelta(hours=4)))
+        self.assertEqual(1, index.prune(now - datetime.timedelta(hours=1)))
+        self.assertEqual(1, len(index))
+
+        token_data = revoke_model.blank_token_data(
+            now - datetime.timedelta(hours=4))
+        token_data['user_id'] = old_event.user_id
+        self.assertFalse(index.is_revoked(token_data))
+        token_data['user_id'] = new_event.user_id
+        self.assertTrue(index.is_revoked(token_data))
+
+    def test_is_revoked_only_checks_related_events(self):
+        index = revoke_model.RevokeIndex()
+        index.add_events([
+            revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex)
+            for _ in range(10000)])
+        token_data = _sample_blank_token()
+        token_data['user_id'] = uuid.uuid4().hex
+        token_data['audit_id'] = uuid.uuid4().hex
+        index.add_event(revoke_model.RevokeEvent(
+            audit_id=token_data['audit_id']))
+
+        with mock.patch.object(revoke_model, '_matches_token',
+                               wraps=revoke_model._matches_token
+                               ) as matches_token:
+            self.assertTrue(index.is_revoked(token_data))
+        self.assertEqual(1, matches_token.call_count)
+
+
+class CompactEventsTests(unit.BaseTestCase):
+
+    def setUp(self):
+        super(CompactEventsTests, self).setUp()
+        self.now = timeutils.utcnow().replace(microsecond=0)
+        self.earlier = self.now - datetime.timedelta(minutes=1)
+
+    def test_subsumes(self):
+        user_event = revoke_model.RevokeEvent(user_id='u',
+                                              revoked_at=self.now)
+        audit_event = revoke_model.RevokeEvent(user_id='u', audit_id='a',
+                                               revoked_at=self.earlier)
+        self.assertTrue(revoke_model.subsumes(user_event, audit_event))
+        self.assertFalse(revoke_model.subsumes(audit_event, user_event))
+        self.assertTrue(revoke_model.subsumes(user_event, user_event))
+
+        # another user
+        self.assertFalse(revoke_model.subsumes(
+            revoke_model.RevokeEvent(user_id='v', revoked_at=self.now),
+            audit_event))
+        # tokens issued after the broader event are revoked by the other one
+        self.assertFalse(revoke_model.subsumes(
+            revoke_model.RevokeEvent(user_id='u', revoked_at=self.now,
+                                     issued_before=self.earlier -
+                                     datetime.timedelta(seconds=1)),
+            audit_event))
+        # the broader event would be pruned first
+        self.assertFalse(revoke_model.subsumes(
+            revoke_model.RevokeEvent(user_id='u', revoked_at=self.earlier,
+                                     issued_before=self.earlier),
+            revoke_model.RevokeEvent(user_id='u', audit_id='a',
+                                     revoked_at=self.now,
+                                     issued_before=self.earlier)))
+
+    def test_compact_events(self):
+        user_event = revoke_model.RevokeEvent(user_id='u',
+                                              revoked_at=self.now)
+        duplicate = revoke_model.RevokeEvent(**user_event.__dict__)
+        audit_event = revoke_model.RevokeEvent(user_id='u', audit_id='a',
+                                               revoked_at=self.earlier)
+        other_event = revoke_model.RevokeEvent(user_id='v', audit_id='b',
+                                               revoked_at=self.earlier)
+        kept, subsumed = revoke_model.compact_events(
+            [audit_event, duplicate, other_event, user_event])
+        self.assertEqual(2, len(kept))
+        self.assertIn(other_event, kept)
+        self.assertEqual(2, len(subsumed))
+        self.assertIn(audit_event, subsumed)
+
+        self.assertEqual(([], []), revoke_model.compact_events([]))
+
+    def test_compaction_keeps_revocation_decisions(self):
+        # Compare the decisions made from random events before and after
+        # compaction, as events are pruned.
+        for seed in range(20):
+            generator = _RandomRevocations(seed, self.now)
+            events = [generator.event() for _ in range(60)]
+            kept, subsumed = revoke_model.compact_events(events)
+            self.assertEqual(len(events), len(kept) + len(subsumed))
+            self.assertTrue(subsumed)
+
+            for cutoff in sorted(generator.times):
+                before = [e for e in events if e.revoked_at >= cutoff]
+                after = [e for e in kept if e.revoked_at >= cutoff]
+                index = revoke_model.RevokeIndex()
+                index.add_events(after)
+                for _ in range(100):
+                    token_data = generator.token()
+                    self.assertEqual(
+                        any(revoke_model._matches_token(e, token_data)
+                            for e in before),
+                        index.is_revoked(token_data))
+
+
+class SnapshotTests(unit.BaseTestCase):
+
+    def setUp(self):
+        super(SnapshotTests, self).setUp()
+        self.now = timeutils.utcnow()
+        self.events = [
+            revoke_model.RevokeEvent(user_id=uuid.uuid4().hex,
+                                     revoked_at=self.now),
+            revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex,
+                                     issued_before=self.now,
+                                     revoked_at=self.now),
+            revoke_model.RevokeEvent(domain_id=uuid.uuid4().hex,
+                                     expires_at=self.now,
+                                     revoked_at=self.now),
+            revoke_model.RevokeEvent(trust_id=uuid.uuid4().hex,
+                                     role_id=uuid.uuid4().hex,
+                                     consumer_id=uuid.uuid4().hex,
+                                     access_token_id=uuid.uuid4().hex,
+                                     audit_chain_id=uuid.uuid4().hex,
+                                     project_id=uuid.uuid4().hex),
+        ]
+
+    def test_round_trip(self):
+        data = snapshot.dumps(self.events, self.now, self.now)
+        loaded = snapshot.loads(data)
+        self.assertEqual(self.now, loaded.high_water_mark)
+        self.assertEqual(self.now, loaded.created_at)
+        self.assertEqual([e.__dict__ for e in self.events],
+                         [e.__dict__ for e in loaded.events])
+        self.assertIsNotNone(loaded.events[2].domain_scope_id)
+
+        self.assertEqual(loaded.checksum, snapshot.loads(data).checksum)
+        self.assertNotEqual(
+            loaded.checksum,
+            snapshot.loads(snapshot.dumps(self.events[1:], self.now,
+                                          self.now)).checksum)
+
+    def test_invalid_snapshots(self):
+        data = snapshot.dumps(self.events, self.now, self.now)
+        header, document = data.split(b'\n', 1)
+        for invalid in (data[:-1],
+                        data.replace(b'revoked_at', b'revoked_on'),
+                        b'',
+                        b'{"events": []}',
+                        header.replace(b' 1 ', b' 2 ') + b'\n' + document):
+            self.assertRaises(ValueError, snapshot.loads, invalid)
+
+    def test_write(self):
+        directory = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(directory, 'snapshot')
+        snapshot.write(path, b'first')
+        snapshot.write(path, b'second')
+        with open(path, 'rb') as f:
+            self.assertEqual(b'second', f.read())
+        self.assertEqual(['snapshot'], os.listdir(directory))
+
+        with mock.patch.object(snapshot.os, 'rename', side_effect=OSError):
+            self.assertRaises(OSError, snapshot.write, path, b'third')
+        self.assertEqual(['snapshot'], os.listdir(directory))
+
+    def test_write_keeps_snapshot_private(self):
+        directory = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(directory, 'snapshot')
+        snapshot.write(path, b'first')
+        self.assertEqual(0o640, stat.S_IMODE(os.stat(path).st_mode))
+
+        # The mode of the snapshot being replaced is kept.
+        os.chmod(path, 0o600)
+        snapshot.write(path, b'second')
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+
+class SnapshotDriverTests(unit.BaseTestCase):
+
+    def setUp(self):
+        super(SnapshotDriverTests, self).setUp()
+        self.config_fixture = self.useFixture(
+            config_fixture.Config(CONF))
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'snapshot')
+        self.config_fixture.config(group='revoke', snapshot_file=self.path)
+        self.now = timeutils.utcnow().replace(microsecond=0)
+        self.driver = snapshot_backend.Revoke()
+
+    def _export(self, events):
+        snapshot.write(self.path, snapshot.dumps(
+            events, max([e.revoked_at for e in events] or [None]),
+            self.now))
+
+    def test_list_events(self):
+        earlier = self.now - datetime.timedelta(minutes=1)
+        user_event = revoke_model.RevokeEvent(user_id=uuid.uuid4().hex,
+                                              revoked_at=earlier)
+        audit_event = revoke_model.RevokeEvent(audit_id=uuid.uuid4().hex,
+                                               revoked_at=self.now)
+        self._export([user_event, audit_event])
+
+        self.assertEqual(2, len(self.driver.list_events()))
+        self.assertEqual(
+            [audit_event.audit_id],
+            [e.audit_id for e in self.driver.list_events(last_fetch=earlier)])
+
+        token_data = revoke_model.blank_token_data(
+            earlier - datetime.timedelta(seconds=1))
+        token_data['trustee_id'] = user_event.user_id
+        self.assertEqual(
+            [user_event.user_id],
+            [e.user_id for e in self.driver.list_events(token=token_data)])
+        token_data['audit_id'] = audit_event.audit_id
+        self.assertEqual(2, len(self.driver.list_events(token=token_data)))
+        token_data['issued_at'] = self.now
+        self.assertEqual(
+            [audit_event.audit_id],
+            [e.audit_id for e in self.driver.list_events(token=token_data)])
+
+    def test_reloads_when_the_file_changes(self):
+        self._export([revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)])
+        self.assertEqual(1, len(self.driver.list_events()))
+        self._export([revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)
+                      for _ in range(2)])
+        self.assertEqual(2, len(self.driver.list_events()))
+        self.assertEqual(2, self.driver.reloads)
+
+    def test_does_not_reread_an_unchanged_file(self):
+        self._export([revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)])
+        self.assertEqual(1, len(self.driver.list_events()))
+        with mock.patch.object(fernet_utils, 'get_stamp',
+                               return_value=self.driver._stamp), \
+                mock.patch.object(self.driver, '_loaded_at',
+                                  self.driver._stamp[1] / 1e9 + 10), \
+                mock.patch.object(snapshot, 'loads') as loads:
+            self.assertEqual(1, len(self.driver.list_events()))
+        loads.assert_not_called()
+
+    def test_stamp_without_nanosecond_modification_times(self):
+        # Python 2 doesn't report modification times in nanoseconds.
+        self._export([revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)])
+        mtime = time.time() - 60
+        os.utime(self.path, (mtime, mtime))
+        stat = os.stat
+
+        def py27_stat(path):
+            result = stat(path)
+            return mock.Mock(spec=['st_ino', 'st_mtime', 'st_mode'],
+                             st_ino=result.st_ino,
+                             st_mtime=result.st_mtime,
+                             st_mode=result.st_mode)
+
+        with mock.patch.object(fernet_utils.os, 'stat',
+                               side_effect=py27_stat), \
+                mock.patch.object(snapshot, 'loads',
+                                  side_effect=snapshot.loads) as loads:
+            for _ in range(3):
+                self.assertEqual(1, len(self.driver.list_events()))
+        self.assertEqual(1, loads.call_count)
+
+    def test_keeps_the_last_valid_snapshot(self):
+        event = revoke_model.RevokeEvent(user_id=uuid.uuid4().hex)
+        self._export([event])
+        self.assertEqual(1, len(self.driver.list_events()))
+
+        snapshot.write(self.path, b'garbage')
+        self.assertEqual([event.user_id],
+                         [e.user_id for e in self.driver.list_events()])
+        os.remove(self.path)
+        self.assertEqual([event.user_id],
+                         [e.user_id for e in self.driver.list_events()])
+        self.assertEqual(1, self.driver.reloads)
+
+    def test_fails_without_a_snapshot(self):
+        self.assertRaises(exception.UnexpectedError,
+                          self.driver.list_events)
+        snapshot.write(self.path, b'garbage')
+        self.assertRaises(exception.UnexpectedError,
+                          self.driver.list_events)
+
+    def test_cannot_revoke(self):
+        self.assertRaises(exception.NotImplemented, self.driver.revoke,
+                          revoke_model.RevokeEvent(user_id=uuid.uuid4().hex))
+
+
+class SnapshotRevokeTests(test_backend_sql.SqlTests):
+
+    def config_overrides(self):
+        super(SnapshotRevokeTests, self).config_overrides()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'snapshot')
+        self.config_fixture.config(group='revoke', driver='snapshot',
+                                   snapshot_file=self.path)
+
+    def _export(self):
+        # export the events recorded in the database, as a node with access
+        # to it would
+        with mock.patch.object(PROVIDERS.revoke_api, 'driver',
+                               self.sql_driver):
+            PROVIDERS.revoke_api.export_events(self.path)
+
+    def _check_token(self, token_data):
+        with mock.patch.object(sql.sql, 'session_for_read') as session:
+            try:
+                PROVIDERS.revoke_api.check_token(token_data)
+            finally:
+                session.assert_not_called()
+
+    def test_check_token_uses_the_snapshot(self):
+        self.sql_driver = sql.Revoke()
+        token_data = _sample_blank_token()
+        token_data['user_id'] = uuid.uuid4().hex
+        self._export()
+        self._check_token(token_data)
+
+        self.sql_driver.revoke(
+            revoke_model.RevokeEvent(user_id=token_data['user_id']))
+        # the snapshot wasn't updated yet
+        self._check_token(token_data)
+
+        self._export()
+        self.assertRaises(exception.TokenNotFound, self._check_token,
+                          token_data)
+
+
+class EventPrunerTests(unit.TestCase):
+
+    def test_disabled_pruner_does_not_start(self):
+        self.config_fixture.config(group='revoke', prune_interval=0)
+        event_pruner = pruner.EventPruner(mock.Mock())
+        with mock.patch.object(pruner.threading, 'Thread') as thread:
+            event_pruner.start()
+        thread.assert_not_called()
+
+    def test_pruner_starts_once_per_process(self):
+        self.config_fixture.config(group='revoke', prune_interval=300)
+        event_pruner = pruner.EventPruner(mock.Mock())
+        with mock.patch.object(pruner.threading, 'Thread') as thread:
+            event_pruner.start()
+            event_pruner.start()
+            self.assertEqual(1, thread.call_count)
+
+            # the thread of the parent process doesn't run in a fork
+            with mock.patch.object(pruner.os, 'getpid',
+                                   return_value=os.getpid() + 1):
+                event_pruner.start()
+            self.assertEqual(2, thread.call_count)
+
+    def test_pruner_keeps_running_after_errors(self):
+        self.config_fixture.config(group='revoke', prune_interval=1)
+        pruned = threading.Event()
+        prune = mock.Mock(side_effect=[Exception(), 10, 0])
+
+        def fake_prune():
+            try:
+                return prune()
+            finally:
+                if prune.call_count == 3:
+                    pruned.set()
+
+        event_pruner = pruner.EventPruner(fake_prune)
+        self.addCleanup(event_pruner.stop)
+        with mock.patch.object(pruner.random, 'uniform', return_value=0):
+            event_pruner.start()
+            self.assertTrue(pruned.wait(10))
+        self.assertEqual(3, prune.call_count)
+
 
 class FernetSqlRevokeTests(test_backend_sql.SqlTests, RevokeTests):
     def config_overrides(self):
@@ -3283,6 +3283,107 @@ class FullMigration(SqlMigrateBase, unit.TestCase):
         app_cred_access_rule_table.insert().values(
             app_cred_access_rule_rel).execute()
 
+    def test_migration_062_add_project_closure_table(self):
+        self.expand(61)
+        self.migrate(61)
+        self.contract(61)
+
+        self.assertTableDoesNotExist('project_closure')
+
+        # Add a domain with a project and a subproject.
+        session = self.sessionmaker()
+        parent_id = None
+        project_ids = []
+        for _ in range(3):
+            project = {
+                'id': uuid.uuid4().hex,
+                'name': uuid.uuid4().hex,
+                'enabled': True,
+                'domain_id': resource_base.NULL_DOMAIN_ID,
+                'parent_id': parent_id,
+                'is_domain': parent_id is None
+            }
+            self.insert_dict(session, 'project', project)
+            project_ids.append(project['id'])
+            parent_id = project['id']
+        session.close()
+
+        self.expand(62)
+        self.migrate(62)
+
+        self.assertTableColumns(
+            'project_closure', ['ancestor_id', 'descendant_id', 'depth'])
+        closure_table = sqlalchemy.Table(
+            'project_closure', self.metadata, autoload=True)
+
+        def closure():
+            rows = closure_table.select().execute().fetchall()
+            return sorted((r.ancestor_id, r.descendant_id, r.depth)
+                          for r in rows)
+
+        self.assertEqual(
+            sorted([(project_ids[0], project_ids[1], 1),
+                    (project_ids[0], project_ids[2], 2),
+                    (project_ids[1], project_ids[2], 1)]),
+            closure())
+
+        # Nodes still running the previous release create projects without
+        # maintaining the closure table, the insert trigger does it for them.
+        session = self.sessionmaker()
+        project = {
+            'id': uuid.uuid4().hex,
+            'name': uuid.uuid4().hex,
+            'enabled': True,
+            'domain_id': resource_base.NULL_DOMAIN_ID,
+            'parent_id': project_ids[2],
+            'is_domain': False
+        }
+        self.insert_dict(session, 'project', project)
+        project_ids.append(project['id'])
+        session.close()
+        self.assertEqual(
+            sorted([(project_ids[0], project_ids[1], 1),
+                    (project_ids[0], project_ids[2], 2),
+                    (project_ids[0], project_ids[3], 3),
+                    (project_ids[1], project_ids[2], 1),
+                    (project_ids[1], project_ids[3], 2),
+                    (project_ids[2], project_ids[3], 1)]),
+            closure())
+
+        # Any other write to the hierarchy is caught up with by the contract
+        # phase.
+        session = self.sessionmaker()
+        project_table = sqlalchemy.Table('project', self.metadata,
+                                         autoload=True)
+        project_table.update().where(
+            project_table.c.id == project_ids[2]).values(
+                parent_id=project_ids[0]).execute()
+        session.close()
+
+        self.contract(62)
+        self.assertEqual(
+            sorted([(project_ids[0], project_ids[1], 1),
+                    (project_ids[0], project_ids[2], 1),
+                    (project_ids[0], project_ids[3], 2),
+                    (project_ids[2], project_ids[3], 1)]),
+            closure())
+
+    def test_migration_063_add_failed_auth_reset_at_to_local_user(self):
+        self.expand(62)
+        self.migrate(62)
+        self.contract(62)
+
+        local_user_columns = ['id', 'user_id', 'domain_id', 'name',
+                              'failed_auth_count', 'failed_auth_at']
+        self.assertTableColumns('local_user', local_user_columns)
+
+        self.expand(63)
+        self.migrate(63)
+        self.contract(63)
+
+        self.assertTableColumns(
+            'local_user', local_user_columns + ['failed_auth_reset_at'])
+
 
 class MySQLOpportunisticFullMigration(FullMigration):
     FIXTURE = db_fixtures.MySQLOpportunisticFixture
@@ -13,16 +13,22 @@
 # under the License.
 
 import datetime
+import uuid
 
+import fixtures
+import mock
 from oslo_utils import timeutils
 from six.moves import urllib
+import sqlalchemy
 
 from keystone.common import provider_api
 from keystone.common import utils
 import keystone.conf
 from keystone import exception
 from keystone.models import token_model
+from keystone import notifications
 from keystone.tests import unit
+from keystone.tests.unit import default_fixtures
 from keystone.tests.unit import ksfixtures
 from keystone.tests.unit.ksfixtures import database
 from keystone import token
@@ -78,3 +84,265 @@ class TestTokenProvider(unit.TestCase):
             exception.TokenNotFound,
             PROVIDERS.token_provider_api.validate_token,
             None)
+
+
+class TestTokenModelResolution(unit.TestCase):
+    def setUp(self):
+        super(TestTokenModelResolution, self).setUp()
+        self.useFixture(database.Database())
+        self.useFixture(
+            ksfixtures.KeyRepository(
+                self.config_fixture,
+                'fernet_tokens',
+                CONF.fernet_tokens.max_active_keys
+            )
+        )
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+        domain_id = CONF.identity.default_domain_id
+        self.user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=domain_id)
+        )
+        self.project = unit.new_project_ref(domain_id=domain_id)
+        PROVIDERS.resource_api.create_project(self.project['id'], self.project)
+        self.role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(self.role['id'], self.role)
+        PROVIDERS.assignment_api.create_grant(
+            self.role['id'], user_id=self.user['id'],
+            project_id=self.project['id']
+        )
+
+        self.token_id = PROVIDERS.token_provider_api.issue_token(
+            self.user['id'], ['password'], project_id=self.project['id']
+        ).id
+
+    def _role_ids(self, token):
+        return sorted(role['id'] for role in token.roles)
+
+    def test_roles_are_resolved_once(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        with mock.patch.object(
+                PROVIDERS.assignment_api, 'get_roles_for_user_and_project',
+                side_effect=AssertionError):
+            self.assertEqual([self.role['id']], self._role_ids(token))
+            self.assertEqual([self.role['id']], self._role_ids(token))
+
+    def test_roles_returned_are_copies(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        token.roles[0]['name'] = uuid.uuid4().hex
+        self.assertEqual(self.role['name'], token.roles[0]['name'])
+
+    def test_warm_validation_does_not_query_backends(self):
+        # Warm up the caches, including the revocation index which is loaded
+        # on the first validation and refreshed from the cache afterwards.
+        for i in range(2):
+            token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+            self.assertTrue(token.roles)
+            self.assertIsNotNone(token.catalog)
+
+        class CallCounter(object):
+            def __init__(self):
+                self.calls = 0
+
+            def query_counter(self, query):
+                self.calls += 1
+
+        counter = CallCounter()
+        sqlalchemy.event.listen(sqlalchemy.orm.query.Query, 'before_compile',
+                                counter.query_counter)
+        self.addCleanup(sqlalchemy.event.remove, sqlalchemy.orm.query.Query,
+                        'before_compile', counter.query_counter)
+
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual([self.role['id']], self._role_ids(token))
+        self.assertEqual(self.project['id'], token.project['id'])
+        self.assertEqual(
+            CONF.identity.default_domain_id, token.project_domain['id']
+        )
+        self.assertEqual(self.user['id'], token.user['id'])
+        self.assertIsNotNone(token.catalog)
+        self.assertEqual(0, counter.calls)
+
+    def test_roles_are_resolved_again_after_assignment_changes(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual([self.role['id']], self._role_ids(token))
+
+        other_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(other_role['id'], other_role)
+        PROVIDERS.assignment_api.create_grant(
+            other_role['id'], user_id=self.user['id'],
+            project_id=self.project['id']
+        )
+
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual(
+            sorted([self.role['id'], other_role['id']]),
+            self._role_ids(token)
+        )
+
+    def test_roles_are_resolved_again_after_role_update(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual(self.role['name'], token.roles[0]['name'])
+
+        new_name = uuid.uuid4().hex
+        PROVIDERS.role_api.update_role(self.role['id'], {'name': new_name})
+
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual(new_name, token.roles[0]['name'])
+
+    def test_catalog_is_resolved_again_after_catalog_changes(self):
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual([], token.catalog)
+
+        service = unit.new_service_ref()
+        PROVIDERS.catalog_api.create_service(service['id'], service)
+        endpoint = unit.new_endpoint_ref(
+            service_id=service['id'], region_id=None
+        )
+        PROVIDERS.catalog_api.create_endpoint(endpoint['id'], endpoint)
+
+        token = PROVIDERS.token_provider_api.validate_token(self.token_id)
+        self.assertEqual(
+            [service['id']], [entry['id'] for entry in token.catalog]
+        )
+
+
+class TestTokenCacheInvalidation(unit.TestCase):
+    def setUp(self):
+        super(TestTokenCacheInvalidation, self).setUp()
+        self.useFixture(database.Database())
+        self.useFixture(
+            ksfixtures.KeyRepository(
+                self.config_fixture,
+                'fernet_tokens',
+                CONF.fernet_tokens.max_active_keys
+            )
+        )
+        self.load_backends()
+        self.load_fixtures(default_fixtures)
+
+        domain_id = CONF.identity.default_domain_id
+        self.project = unit.new_project_ref(domain_id=domain_id)
+        PROVIDERS.resource_api.create_project(self.project['id'], self.project)
+        self.role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(self.role['id'], self.role)
+
+        self.users = []
+        self.token_ids = {}
+        for i in range(5):
+            user = PROVIDERS.identity_api.create_user(
+                unit.new_user_ref(domain_id=domain_id)
+            )
+            PROVIDERS.assignment_api.create_grant(
+                self.role['id'], user_id=user['id'],
+                project_id=self.project['id']
+            )
+            self.users.append(user)
+            self.token_ids[user['id']] = (
+                PROVIDERS.token_provider_api.issue_token(
+                    user['id'], ['password'], project_id=self.project['id']
+                ).id
+            )
+
+        driver = PROVIDERS.token_provider_api.driver
+        self.validate_mock = self.useFixture(fixtures.MockPatchObject(
+            driver, 'validate_token', wraps=driver.validate_token)).mock
+
+    def _validate_all(self):
+        for token_id in self.token_ids.values():
+            PROVIDERS.token_provider_api.validate_token(token_id)
+
+    def _validate_all_ignoring_errors(self):
+        for token_id in self.token_ids.values():
+            try:
+                PROVIDERS.token_provider_api.validate_token(token_id)
+            except exception.Error:  # nosec: only cache misses are counted
+                pass
+
+    def _validated_token_ids(self):
+        return set(c[0][0] for c in self.validate_mock.call_args_list)
+
+    def test_hit_rate_under_unrelated_assignment_changes(self):
+        other_project = unit.new_project_ref(
+            domain_id=CONF.identity.default_domain_id
+        )
+        PROVIDERS.resource_api.create_project(
+            other_project['id'], other_project
+        )
+        other_user = PROVIDERS.identity_api.create_user(
+            unit.new_user_ref(domain_id=CONF.identity.default_domain_id)
+        )
+
+        validations = 0
+        for i in range(20):
+            PROVIDERS.assignment_api.create_grant(
+                self.role['id'], user_id=other_user['id'],
+                project_id=other_project['id']
+            )
+            PROVIDERS.assignment_api.delete_grant(
+                self.role['id'], user_id=other_user['id'],
+                project_id=other_project['id']
+            )
+            self._validate_all()
+            validations += len(self.token_ids)
+
+        # Every validation is served from the cache, where invalidating the
+        # whole token cache on each change would have made every one of them
+        # a miss.
+        self.assertEqual(100, validations)
+        self.assertEqual(0, self.validate_mock.call_count)
+
+    def test_removing_an_assignment_only_drops_tokens_of_the_user(self):
+        user = self.users[0]
+        PROVIDERS.assignment_api.delete_grant(
+            self.role['id'], user_id=user['id'], project_id=self.project['id']
+        )
+        for other_user in self.users[1:]:
+            PROVIDERS.token_provider_api.validate_token(
+                self.token_ids[other_user['id']]
+            )
+        self.assertEqual(0, self.validate_mock.call_count)
+
+        self.assertRaises(
+            exception.TokenNotFound,
+            PROVIDERS.token_provider_api.validate_token,
+            self.token_ids[user['id']]
+        )
+        self.assertEqual(
+            set([self.token_ids[user['id']]]), self._validated_token_ids()
+        )
+
+    def test_disabling_a_user_only_drops_tokens_of_the_user(self):
+        user = self.users[0]
+        PROVIDERS.identity_api.update_user(user['id'], {'enabled': False})
+        self._validate_all_ignoring_errors()
+        self.assertEqual(
+            set([self.token_ids[user['id']]]), self._validated_token_ids()
+        )
+
+    def test_deleting_a_role_drops_tokens_with_the_role(self):
+        other_role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(other_role['id'], other_role)
+        PROVIDERS.role_api.delete_role(other_role['id'])
+        self._validate_all()
+        self.assertEqual(0, self.validate_mock.call_count)
+
+        PROVIDERS.role_api.delete_role(self.role['id'])
+        self._validate_all_ignoring_errors()
+        self.assertEqual(set(self.token_ids.values()),
+                         self._validated_token_ids())
+
+    def test_disabling_a_project_drops_tokens_of_the_project(self):
+        PROVIDERS.resource_api.update_project(
+            self.project['id'], {'enabled': False}
+        )
+        self._validate_all_ignoring_errors()
+        self.assertEqual(set(self.token_ids.values()),
+                         self._validated_token_ids())
+
+    def test_untagged_invalidation_drops_every_token(self):
+        notifications.invalidate_token_cache_notification('testing')
+        self._validate_all()
+        self.assertEqual(set(self.token_ids.values()),
+                         self._validated_token_ids())
@@ -3214,6 +3214,18 @@ class DomainSpecificRoleTests(test_v3.RestfulTestCase, unit.TestCase):
         self.assertValidRoleListResponse(r, expected_length=1)
         self.assertRoleInListResponse(r, self.domainA_role2)
 
+    def test_conditional_list_domain_specific_roles(self):
+        url = '/roles?domain_id=%s' % self.domainA['id']
+        etag = self.get(url).headers['ETag']
+        self.get(url, headers={'If-None-Match': etag},
+                 expected_status=http_client.NOT_MODIFIED)
+
+        self.delete('/roles/%(role_id)s' % {
+            'role_id': self.domainA_role1['id']})
+        r = self.get(url, headers={'If-None-Match': etag})
+        self.assertNotEqual(etag, r.headers['ETag'])
+        self.assertValidRoleListResponse(r, expected_length=1)
+
     def test_same_domain_assignment(self):
         user = unit.create_user(PROVIDERS.identity_api,
                                 domain_id=self.domainA['id'])
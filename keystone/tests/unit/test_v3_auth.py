@@ -1942,6 +1942,77 @@ class TokenAPITests(object):
             headers={'X-Subject-Token': v3_token})
         self.assertValidProjectScopedTokenResponse(r, require_catalog=False)
 
+    def _validate_tokens(self, token_ids, expected_status=http_client.OK,
+                         query=''):
+        return self.post('/auth/tokens/validate%s' % query,
+                         body={'tokens': token_ids},
+                         expected_status=expected_status)
+
+    def test_validate_tokens(self):
+        project_token = self._get_project_scoped_token()
+        invalid_token = uuid.uuid4().hex
+        r = self._validate_tokens(
+            [self.v3_token, invalid_token, project_token, self.v3_token])
+
+        results = r.result['tokens']
+        self.assertEqual(4, len(results))
+        for result in (results[0], results[3]):
+            self.assertEqual(self.v3_token_data['token']['audit_ids'],
+                             result['token']['audit_ids'])
+        self.assertEqual(http_client.NOT_FOUND, results[1]['error']['code'])
+        self.assertNotIn('token', results[1])
+        self.assertEqual(self.project_id,
+                         results[2]['token']['project']['id'])
+        self.assertIn('catalog', results[2]['token'])
+
+    def test_validate_tokens_nocatalog(self):
+        project_token = self._get_project_scoped_token()
+        r = self._validate_tokens([project_token], query='?nocatalog')
+        self.assertNotIn('catalog', r.result['tokens'][0]['token'])
+
+    def test_validate_tokens_shares_catalog(self):
+        # NOTE: The tokens are scoped to another project than the token making
+        # the request, whose catalog is built by the auth middleware.
+        project = unit.new_project_ref(domain_id=self.domain_id)
+        PROVIDERS.resource_api.create_project(project['id'], project)
+        PROVIDERS.assignment_api.create_grant(
+            self.role_id, user_id=self.user['id'], project_id=project['id'])
+        auth_data = self.build_authentication_request(
+            user_id=self.user['id'],
+            password=self.user['password'],
+            project_id=project['id'])
+        project_tokens = [
+            self.v3_create_token(auth_data).headers['X-Subject-Token']
+            for _ in range(3)]
+        with mock.patch.object(
+                PROVIDERS.catalog_api, 'get_v3_catalog',
+                wraps=PROVIDERS.catalog_api.get_v3_catalog) as get_catalog:
+            r = self._validate_tokens(project_tokens)
+        self.assertEqual(
+            1, get_catalog.call_args_list.count(
+                mock.call(self.user['id'], project['id'])))
+        for result in r.result['tokens']:
+            self.assertEqual(project['id'], result['token']['project']['id'])
+
+    def test_validate_tokens_revoked(self):
+        project_token = self._get_project_scoped_token()
+        self._revoke_token(project_token)
+        r = self._validate_tokens([self.v3_token, project_token])
+        results = r.result['tokens']
+        self.assertEqual(self.v3_token_data['token']['audit_ids'],
+                         results[0]['token']['audit_ids'])
+        self.assertEqual(http_client.NOT_FOUND, results[1]['error']['code'])
+
+    def test_validate_tokens_too_many(self):
+        self.config_fixture.config(group='token', max_validation_batch_size=2)
+        self._validate_tokens([self.v3_token] * 3,
+                              expected_status=http_client.BAD_REQUEST)
+
+    def test_validate_tokens_invalid_request(self):
+        self._validate_tokens([], expected_status=http_client.BAD_REQUEST)
+        self.post('/auth/tokens/validate', body={'token': self.v3_token},
+                  expected_status=http_client.BAD_REQUEST)
+
     def test_is_admin_token_by_ids(self):
         self.config_fixture.config(
             group='resource',
@@ -3727,7 +3798,8 @@ class TestTokenRevokeApi(TestTokenRevokeById):
                   expected_status=http_client.NOT_FOUND)
         events_response = self.get('/OS-REVOKE/events').json_body
         self.assertValidRevokedTokenResponse(events_response,
-                                             audit_id=response['audit_ids'][0])
+                                             audit_id=response['audit_ids'][0],
+                                             user_id=response['user']['id'])
 
     def test_get_revoke_by_id_false_returns_gone(self):
         self.get('/auth/tokens/OS-PKI/revoked',
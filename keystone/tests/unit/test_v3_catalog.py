@@ -16,9 +16,11 @@ import copy
 import uuid
 
 from six.moves import http_client
+import sqlalchemy
 from testtools import matchers
 
 from keystone.common import provider_api
+from keystone.common import sql
 from keystone.tests import unit
 from keystone.tests.unit import default_fixtures
 from keystone.tests.unit.ksfixtures import database
@@ -1024,3 +1026,101 @@ class TestCatalogAPITemplatedProject(test_v3.RestfulTestCase):
         self.delete(
             '/projects/%(project_id)s' % {
                 'project_id': self.project_id})
+
+
+class CatalogETagTestCase(test_v3.RestfulTestCase):
+    """Test conditional GETs of the catalog."""
+
+    def _get_etag(self, path, **kwargs):
+        r = self.get(path, **kwargs)
+        self.assertIsNotNone(r.headers.get('ETag'))
+        return r.headers['ETag']
+
+    def _assert_not_modified(self, path, etag, **kwargs):
+        r = self.get(path, headers={'If-None-Match': etag},
+                     expected_status=http_client.NOT_MODIFIED, **kwargs)
+        self.assertEqual(etag, r.headers['ETag'])
+        self.assertEqual(b'', r.body)
+
+    def _assert_modified(self, path, etag, **kwargs):
+        r = self.get(path, headers={'If-None-Match': etag}, **kwargs)
+        self.assertNotEqual(etag, r.headers['ETag'])
+        return r
+
+    def test_conditional_list_regions(self):
+        etag = self._get_etag('/regions')
+        self._assert_not_modified('/regions', etag)
+
+        region = self.post('/regions',
+                           body={'region': unit.new_region_ref()})
+        r = self._assert_modified('/regions', etag)
+        self.assertIn(region.json_body['region']['id'],
+                      [ref['id'] for ref in r.json_body['regions']])
+
+    def test_conditional_list_services(self):
+        etag = self._get_etag('/services')
+        self._assert_not_modified('/services', etag)
+
+        self.patch('/services/%s' % self.service_id,
+                   body={'service': {'description': uuid.uuid4().hex}})
+        self._assert_modified('/services', etag)
+
+    def test_conditional_list_endpoints_after_deleting_service(self):
+        etag = self._get_etag('/endpoints')
+        self._assert_not_modified('/endpoints', etag)
+
+        self.delete('/services/%s' % self.service_id)
+        r = self._assert_modified('/endpoints', etag)
+        self.assertEqual([], r.json_body['endpoints'])
+
+    def test_conditional_get_catalog(self):
+        etag = self._get_etag('/auth/catalog')
+        self._assert_not_modified('/auth/catalog', etag)
+
+        self.patch('/endpoints/%s' % self.endpoint_id,
+                   body={'endpoint': {'url': 'http://%s' % uuid.uuid4().hex}})
+        etag = self._assert_modified('/auth/catalog', etag).headers['ETag']
+
+        # Associating an endpoint with a project changes the catalog without
+        # emitting a notification.
+        PROVIDERS.catalog_api.add_endpoint_to_project(
+            self.endpoint_id, self.project_id)
+        self._assert_modified('/auth/catalog', etag)
+
+    def test_etag_depends_on_query_and_caller(self):
+        etag = self._get_etag('/services')
+        self._assert_modified('/services?type=identity', etag)
+        PROVIDERS.assignment_api.create_system_grant_for_user(
+            self.user_id, self.role_id)
+        self._assert_modified('/services', etag,
+                              token=self.get_system_scoped_token())
+
+    def test_revalidation_does_not_query_the_catalog(self):
+        token = self.get_scoped_token()
+        etag = self._get_etag('/regions', token=token)
+
+        statements = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        def catalog_queries():
+            # NOTE: Validating the token still reads the revocation events.
+            return [s for s in statements if 'FROM region' in s]
+
+        with sql.session_for_read() as session:
+            engine = session.get_bind()
+        sqlalchemy.event.listen(engine, 'before_cursor_execute',
+                                record_statement)
+        self.addCleanup(sqlalchemy.event.remove, engine,
+                        'before_cursor_execute', record_statement)
+        self._assert_not_modified('/regions', etag, token=token)
+        self.assertEqual([], catalog_queries())
+
+        self.get('/regions', token=token)
+        self.assertNotEqual([], catalog_queries())
+
+    def test_no_etag_without_cache(self):
+        self.config_fixture.config(group='cache', enabled=False)
+        r = self.get('/regions')
+        self.assertIsNone(r.headers.get('ETag'))
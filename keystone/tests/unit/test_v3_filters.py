@@ -15,13 +15,16 @@
 
 import datetime
 
+import fixtures
 import freezegun
 from oslo_config import fixture as config_fixture
 from oslo_serialization import jsonutils
 from six.moves import http_client
 from six.moves import range
+from six.moves import urllib
 
 from keystone.common import provider_api
+from keystone.common import sql
 import keystone.conf
 from keystone.tests import unit
 from keystone.tests.unit import filtering
@@ -297,8 +300,10 @@ class IdentityTestFilteredCase(filtering.FilterTests,
         url_by_name = '/users?name__iendswith=OF'
         r = self.get(url_by_name, auth=self.auth)
         self.assertEqual(2, len(r.result.get('users')))
-        self.assertEqual(user_list[7]['id'], r.result.get('users')[0]['id'])
-        self.assertEqual(user_list[10]['id'], r.result.get('users')[1]['id'])
+        # Streamed lists are ordered by ID rather than by creation.
+        self.assertEqual(
+            sorted([user_list[7]['id'], user_list[10]['id']]),
+            sorted(user['id'] for user in r.result.get('users')))
 
         self._delete_test_data('user', user_list)
 
@@ -849,3 +854,113 @@ class IdentityTestListLimitCase(IdentityTestFilteredCase):
         r = self.get('/services', auth=self.auth)
         self.assertEqual(10, len(r.result.get('services')))
         self.assertNotIn('truncated', r.result)
+
+    def _list_pages(self, path, collection, limit):
+        """Follow the next links of a paginated list, returning its pages."""
+        pages = []
+        query = 'limit=%d' % limit
+        while True:
+            r = self.get('%s?%s' % (path, query), auth=self.auth)
+            pages.append(r.result[collection])
+            next_url = r.result['links']['next']
+            if next_url is None:
+                self.assertNotIn('truncated', r.result)
+                return pages
+            self.assertIs(r.result.get('truncated'), True)
+            query = urllib.parse.urlparse(next_url).query
+
+    def _test_entity_list_pagination(self, entity):
+        """GET /<entities>?limit=3, then the next pages.
+
+        Test Plan:
+
+        - Follow the next links of the list of entities paginated by 3
+        - Check that every entity is listed exactly once, in ID order
+
+        """
+        plural = '%ss' % entity
+        self._set_policy({"identity:list_%s" % plural: []})
+        r = self.get('/%s' % plural, auth=self.auth)
+        expected_ids = sorted(ref['id'] for ref in r.result[plural])
+
+        pages = self._list_pages('/%s' % plural, plural, 3)
+        for page in pages:
+            self.assertLessEqual(len(page), 3)
+        ids = [ref['id'] for page in pages for ref in page]
+        self.assertEqual(expected_ids, ids)
+
+    def test_users_list_pagination(self):
+        self._test_entity_list_pagination('user')
+
+    def test_groups_list_pagination(self):
+        self._test_entity_list_pagination('group')
+
+    def test_projects_list_pagination(self):
+        self._test_entity_list_pagination('project')
+
+    def test_credentials_list_pagination(self):
+        for _ in range(7):
+            credential = unit.new_credential_ref(user_id=self.user1['id'])
+            PROVIDERS.credential_api.create_credential(
+                credential['id'], credential)
+        self._test_entity_list_pagination('credential')
+
+    def test_role_assignments_list_pagination(self):
+        self._set_policy({"identity:list_role_assignments": []})
+        role = unit.new_role_ref()
+        PROVIDERS.role_api.create_role(role['id'], role)
+        for user in self.entity_lists['user']:
+            PROVIDERS.assignment_api.create_grant(
+                role['id'], user_id=user['id'], domain_id=self.domainA['id'])
+        r = self.get('/role_assignments', auth=self.auth)
+        expected = sorted(ref['links']['assignment']
+                          for ref in r.result['role_assignments'])
+
+        pages = self._list_pages('/role_assignments', 'role_assignments', 3)
+        for page in pages:
+            self.assertLessEqual(len(page), 3)
+        assignments = [ref['links']['assignment']
+                       for page in pages for ref in page]
+        self.assertEqual(expected, sorted(assignments))
+
+    def test_pagination_limit_capped_by_list_limit(self):
+        self._set_policy({"identity:list_users": []})
+        self.config_fixture.config(group='identity', list_limit=2)
+        r = self.get('/users?limit=5', auth=self.auth)
+        self.assertEqual(2, len(r.result['users']))
+        self.assertIs(r.result.get('truncated'), True)
+        self.assertIsNotNone(r.result['links']['next'])
+
+    def test_pagination_with_invalid_limit(self):
+        self._set_policy({"identity:list_users": []})
+        for limit in ('0', '-1', 'ten'):
+            self.get('/users?limit=%s' % limit, auth=self.auth,
+                     expected_status=http_client.BAD_REQUEST)
+
+
+class IdentityTestStreamedListCase(IdentityTestListLimitCase):
+    """Test filtering, limits and pagination of streamed lists."""
+
+    def setUp(self):
+        super(IdentityTestStreamedListCase, self).setUp()
+        self.config_fixture.config(stream_list_responses=True)
+        # Read the entities in small batches, so that lists span several
+        # of them
+        self.useFixture(fixtures.MockPatchObject(sql, 'STREAM_BATCH_SIZE', 3))
+
+    def test_streamed_list_matches_list(self):
+        self._set_policy({"identity:list_users": []})
+        stream_query = self.useFixture(fixtures.MockPatchObject(
+            sql, 'stream_query', side_effect=sql.stream_query)).mock
+        r = self.get('/users', auth=self.auth)
+        self.assertEqual(1, stream_query.call_count)
+        self.assertEqual('application/json', r.headers['Content-Type'])
+        streamed_ids = [user['id'] for user in r.result['users']]
+        self.assertEqual(sorted(streamed_ids), streamed_ids)
+        self.assertIsNone(r.result['links']['next'])
+        self.assertNotIn('truncated', r.result)
+
+        self.config_fixture.config(stream_list_responses=False)
+        r = self.get('/users', auth=self.auth)
+        self.assertEqual(sorted(streamed_ids),
+                         sorted(user['id'] for user in r.result['users']))
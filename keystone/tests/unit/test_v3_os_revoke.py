@@ -23,9 +23,11 @@ from testtools import matchers
 
 from keystone.common import provider_api
 from keystone.common import utils
+import keystone.conf
 from keystone.models import revoke_model
 from keystone.tests.unit import test_v3
 
+CONF = keystone.conf.CONF
 PROVIDERS = provider_api.ProviderAPIs
 
 
@@ -172,6 +174,13 @@ class OSRevokeTests(test_v3.RestfulTestCase, test_v3.JsonHomeTestMixin):
         self.assertNotIn('OS-OAUTH1:access_token_id', event)
 
     def test_retries_on_deadlock(self):
+        # expired events are deleted when they are pruned, not on revocation
+        expired_at = timeutils.utcnow() - datetime.timedelta(
+            seconds=(CONF.token.expiration + CONF.revoke.expiration_buffer +
+                     60))
+        PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
+            user_id=uuid.uuid4().hex, revoked_at=expired_at))
+
         patcher = mock.patch('sqlalchemy.orm.query.Query.delete',
                              autospec=True)
 
@@ -197,14 +206,81 @@ class OSRevokeTests(test_v3.RestfulTestCase, test_v3.JsonHomeTestMixin):
         sql_delete_mock.side_effect = side_effect
 
         try:
-            PROVIDERS.revoke_api.revoke(revoke_model.RevokeEvent(
-                user_id=uuid.uuid4().hex))
+            self.assertEqual(
+                1, PROVIDERS.revoke_api.prune_expired_events(batch_delay=0))
         finally:
             if side_effect.patched:
                 patcher.stop()
 
         call_count = sql_delete_mock.call_count
 
-        # initial attempt + 1 retry
+        # initial attempt + 1 retry, the next batch has nothing to delete
         revoke_attempt_count = 2
         self.assertEqual(call_count, revoke_attempt_count)
+
+    def _revoke_events(self, events, **kwargs):
+        PROVIDERS.assignment_api.create_system_grant_for_user(
+            self.user_id, self.role_id)
+        kwargs.setdefault('token', self.get_system_scoped_token())
+        return self.post('/OS-REVOKE/events', body={'events': events},
+                         **kwargs)
+
+    def test_revoke_events_in_bulk(self):
+        user_ids = [uuid.uuid4().hex for _ in range(3)]
+        audit_ids = [uuid.uuid4().hex[:22] for _ in range(2)]
+        events = ([{'user_id': user_id} for user_id in user_ids] +
+                  [{'audit_id': audit_id} for audit_id in audit_ids] +
+                  [{'audit_chain_id': audit_ids[0],
+                    'project_id': self.project_id}])
+
+        with mock.patch.object(PROVIDERS.revoke_api.driver,
+                               'revoke') as revoke:
+            resp = self._revoke_events(events)
+        revoke.assert_not_called()
+
+        recorded = resp.json_body['events']
+        self.assertEqual(len(events), len(recorded))
+        self.assertEqual(1, len(set((event['revoked_at'], event[
+            'issued_before']) for event in recorded)))
+        for event in recorded:
+            del event['revoked_at']
+            del event['issued_before']
+        self.assertEqual(events, recorded)
+
+        listed = self.get('/OS-REVOKE/events').json_body['events']
+        for event in listed:
+            del event['revoked_at']
+            del event['issued_before']
+        for event in events:
+            self.assertIn(event, listed)
+
+    def test_revoke_events_in_bulk_revokes_tokens(self):
+        token = self.get_scoped_token()
+        token_data = self.get('/auth/tokens',
+                              headers={'X-Subject-Token': token})
+        audit_id = token_data.json_body['token']['audit_ids'][0]
+
+        self._revoke_events([{'audit_id': audit_id},
+                             {'user_id': uuid.uuid4().hex}])
+        self.head('/auth/tokens', headers={'X-Subject-Token': token},
+                  expected_status=http_client.NOT_FOUND)
+
+    def test_revoke_events_in_bulk_is_validated(self):
+        for events in ([],
+                       [{}],
+                       [{'role_id': uuid.uuid4().hex}],
+                       [{'user_id': uuid.uuid4().hex,
+                         'issued_before': _future_time_string()}],
+                       [{'project_id': uuid.uuid4().hex,
+                         'domain_id': uuid.uuid4().hex}],
+                       [{'audit_id': 'a' * 33}],
+                       'not a list'):
+            self._revoke_events(events,
+                                expected_status=http_client.BAD_REQUEST)
+        self.assertEqual(
+            [], self.get('/OS-REVOKE/events').json_body['events'])
+
+    def test_revoke_events_in_bulk_requires_system_admin(self):
+        self._revoke_events([{'user_id': uuid.uuid4().hex}],
+                            token=self.get_scoped_token(),
+                            expected_status=http_client.FORBIDDEN)
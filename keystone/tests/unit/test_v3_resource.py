@@ -163,6 +163,17 @@ class ResourceTestCase(test_v3.RestfulTestCase,
             domain_list = response.json_body['domains']
             self.assertEqual(expected_length, len(domain_list))
 
+    def test_conditional_list_domains(self):
+        etag = self.get('/domains').headers['ETag']
+        self.get('/domains', headers={'If-None-Match': etag},
+                 expected_status=http_client.NOT_MODIFIED)
+
+        self.patch('/domains/%(domain_id)s' % {
+            'domain_id': self.domain_id},
+            body={'domain': {'description': uuid.uuid4().hex}})
+        r = self.get('/domains', headers={'If-None-Match': etag})
+        self.assertNotEqual(etag, r.headers['ETag'])
+
     def test_get_head_domain(self):
         """Call ``GET /domains/{domain_id}``."""
         resource_url = '/domains/%(domain_id)s' % {
@@ -148,6 +148,8 @@ APPLICATION_CREDENTIAL_RELATION = (
 V3_JSON_HOME_RESOURCES = {
     json_home.build_v3_resource_relation('auth_tokens'): {
         'href': '/auth/tokens'},
+    json_home.build_v3_resource_relation('auth_tokens_validate'): {
+        'href': '/auth/tokens/validate'},
     json_home.build_v3_resource_relation('auth_catalog'): {
         'href': '/auth/catalog'},
     json_home.build_v3_resource_relation('auth_projects'): {
@@ -15,12 +15,14 @@ import datetime
 import hashlib
 import mock
 import os
+import time
 import uuid
 
 from oslo_utils import timeutils
 import six
 
 from keystone import auth
+from keystone.cmd import cli
 from keystone.common import fernet_utils
 from keystone.common import provider_api
 from keystone.common import utils
@@ -222,6 +224,135 @@ class TestTokenFormatter(unit.TestCase):
             self.assertEqual(encoded_string, encoded_str_with_padding_restored)
 
 
+class TestFernetKeyRing(unit.TestCase):
+
+    def setUp(self):
+        super(TestFernetKeyRing, self).setUp()
+        self.formatter = token_formatters.TokenFormatter()
+        self.key_ring = fernet_utils.get_key_ring(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        )
+
+    def _age_key_repository(self, seconds):
+        # Pretend the key repository was last modified a while ago, so that
+        # the key ring trusts its stamp.
+        mtime = time.time() - seconds
+        os.utime(CONF.fernet_tokens.key_repository, (mtime, mtime))
+
+    def _rotate_out_of_process(self):
+        # Rotating keys from another process (keystone-manage fernet_rotate)
+        # can't reset the key rings of this process.
+        with mock.patch.object(fernet_utils, 'reset_key_rings'):
+            cli.FernetRotate.rotate_fernet_repository(
+                None, None, 'fernet_tokens')
+
+    def test_key_ring_is_shared(self):
+        self.assertIs(
+            self.key_ring,
+            fernet_utils.get_key_ring(CONF.fernet_tokens.key_repository,
+                                      CONF.fernet_tokens.max_active_keys,
+                                      'fernet_tokens'))
+
+    def test_keys_are_loaded_once(self):
+        self._age_key_repository(60)
+        with mock.patch.object(fernet_utils.FernetUtils, 'load_keys',
+                               autospec=True,
+                               side_effect=fernet_utils.FernetUtils.load_keys
+                               ) as load_keys:
+            for _ in range(10):
+                token = self.formatter.pack(b'payload')
+                self.assertEqual(b'payload', self.formatter.unpack(token))
+        self.assertEqual(1, load_keys.call_count)
+        self.assertEqual(1, self.key_ring.reloads)
+        self.assertEqual(19, self.key_ring.hits)
+
+    def test_recently_modified_repository_is_reloaded(self):
+        # The key repository was just initialized, so its stamp could be
+        # racing with changes made within the timestamp granularity.
+        self.formatter.pack(b'payload')
+        self.formatter.pack(b'payload')
+        self.assertEqual(2, self.key_ring.reloads)
+
+        self._age_key_repository(60)
+        self.formatter.pack(b'payload')
+        self.formatter.pack(b'payload')
+        self.assertEqual(3, self.key_ring.reloads)
+
+    def test_out_of_process_rotation_is_picked_up(self):
+        self._age_key_repository(60)
+        old_token = self.formatter.pack(b'payload')
+        self.assertEqual(1, self.key_ring.reloads)
+
+        self._rotate_out_of_process()
+        new_token = self.formatter.pack(b'payload')
+        self.assertEqual(2, self.key_ring.reloads)
+
+        # the new token is encrypted with the new primary key
+        primary_key = fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        ).load_keys()[0]
+        new_token_bytes = token_formatters.TokenFormatter.restore_padding(
+            new_token).encode('utf-8')
+        self.assertEqual(
+            b'payload',
+            fernet_utils.fernet.Fernet(primary_key).decrypt(new_token_bytes))
+
+        self.assertEqual(b'payload', self.formatter.unpack(old_token))
+        self.assertEqual(b'payload', self.formatter.unpack(new_token))
+
+    def test_rotation_in_process_resets_key_ring(self):
+        self._age_key_repository(60)
+        self.formatter.pack(b'payload')
+        self.assertEqual(1, self.key_ring.reloads)
+
+        cli.FernetRotate.rotate_fernet_repository(None, None, 'fernet_tokens')
+        self._age_key_repository(30)
+        self.formatter.pack(b'payload')
+        self.assertEqual(2, self.key_ring.reloads)
+
+    def test_stamp_without_nanosecond_modification_times(self):
+        # Python 2 doesn't report modification times in nanoseconds.
+        self._age_key_repository(60)
+        stat = os.stat
+        stat_info = stat(CONF.fernet_tokens.key_repository)
+
+        def py27_stat(path):
+            result = stat(path)
+            return mock.Mock(spec=['st_ino', 'st_mtime', 'st_mode'],
+                             st_ino=result.st_ino,
+                             st_mtime=result.st_mtime,
+                             st_mode=result.st_mode)
+
+        with mock.patch.object(fernet_utils.os, 'stat',
+                               side_effect=py27_stat):
+            self.assertEqual(
+                (stat_info.st_ino, int(stat_info.st_mtime * 1e9)),
+                fernet_utils.get_stamp(CONF.fernet_tokens.key_repository))
+            for _ in range(3):
+                token = self.formatter.pack(b'payload')
+                self.assertEqual(b'payload', self.formatter.unpack(token))
+        self.assertEqual(1, self.key_ring.reloads)
+
+    def test_empty_key_repository_is_not_cached(self):
+        for filename in os.listdir(CONF.fernet_tokens.key_repository):
+            os.remove(os.path.join(CONF.fernet_tokens.key_repository,
+                                   filename))
+        self.assertRaises(exception.KeysNotFound,
+                          self.formatter.pack, b'payload')
+
+        fernet_utils.FernetUtils(
+            CONF.fernet_tokens.key_repository,
+            CONF.fernet_tokens.max_active_keys,
+            'fernet_tokens'
+        ).initialize_key_repository()
+        token = self.formatter.pack(b'payload')
+        self.assertEqual(b'payload', self.formatter.unpack(token))
+
+
 class TestPayloads(unit.TestCase):
     def assertTimestampsEqual(self, expected, actual):
         # The timestamp that we get back when parsing the payload may not
@@ -10,9 +10,17 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
 import os
+import time
 import uuid
 
+import fixtures
+import jwt
+import mock
+from oslo_serialization import jsonutils
+
+from keystone.common import fernet_utils
 from keystone.common import jwt_utils
 from keystone.common import provider_api
 from keystone.common import utils
@@ -124,3 +132,248 @@ class TestJWSProvider(unit.TestCase):
         # make sure we iterate through all public keys on disk and we can still
         # validate the token
         self.provider.validate_token(token_id)
+
+
+class TestJWSKeyCache(unit.TestCase):
+
+    def setUp(self):
+        super(TestJWSKeyCache, self).setUp()
+        self.config_fixture.config(group='token', provider='jws')
+        self.useFixture(ksfixtures.JWSKeyRepository(self.config_fixture))
+        self.provider = jws.Provider()
+        self.private_key_cache = jwt_utils.get_private_key_cache(
+            os.path.join(CONF.jwt_tokens.jws_private_key_repository,
+                         'private.pem'))
+        self.public_key_cache = jwt_utils.get_public_key_cache(
+            CONF.jwt_tokens.jws_public_key_repository)
+
+    def _age_key_repositories(self, seconds):
+        # Pretend the keys were last modified a while ago, so that the key
+        # caches trust their stamps.
+        mtime = time.time() - seconds
+        public_key_repository = self.public_key_cache.path
+        for path in ([self.private_key_cache.path, public_key_repository] +
+                     [os.path.join(public_key_repository, filename)
+                      for filename in os.listdir(public_key_repository)]):
+            os.utime(path, (mtime, mtime))
+
+    def _add_public_keys(self, count):
+        for _ in range(count):
+            private_key_path = os.path.join(
+                CONF.jwt_tokens.jws_private_key_repository,
+                uuid.uuid4().hex
+            )
+            pub_key_path = os.path.join(
+                CONF.jwt_tokens.jws_public_key_repository,
+                uuid.uuid4().hex
+            )
+            jwt_utils.create_jws_keypair(private_key_path, pub_key_path)
+
+    def _create_token(self):
+        token = token_model.TokenModel()
+        token.methods = ['password']
+        token.user_id = uuid.uuid4().hex
+        token.audit_id = provider.random_urlsafe_str()
+        token.expires_at = utils.isotime(
+            provider.default_expire_time(), subsecond=True
+        )
+        token_id, issued_at = self.provider.generate_id_and_issued_at(token)
+        return token_id
+
+    def test_token_header_carries_key_id(self):
+        token_id = self._create_token()
+        key_id, private_key = self.private_key_cache.keys
+        self.assertEqual(key_id, jwt.get_unverified_header(token_id)['kid'])
+        self.assertEqual([key_id], list(self.public_key_cache.keys))
+        self.assertEqual(
+            key_id, jwt_utils.get_key_id(private_key.public_key()))
+
+    def test_keys_are_parsed_once(self):
+        self._add_public_keys(4)
+        self._age_key_repositories(60)
+        with mock.patch.object(
+                jwt_utils.serialization, 'load_pem_public_key',
+                side_effect=jwt_utils.serialization.load_pem_public_key
+        ) as load_public_key:
+            for _ in range(10):
+                self.provider.validate_token(self._create_token())
+        self.assertEqual(5, load_public_key.call_count)
+        self.assertEqual(1, self.private_key_cache.reloads)
+        self.assertEqual(9, self.private_key_cache.hits)
+        self.assertEqual(1, self.public_key_cache.reloads)
+        self.assertEqual(9, self.public_key_cache.hits)
+
+    def test_only_the_matching_public_key_is_tried(self):
+        self._add_public_keys(19)
+        self._age_key_repositories(60)
+        token_id = self._create_token()
+        with mock.patch.object(jws.core.jwt, 'decode',
+                               side_effect=jwt.decode) as decode:
+            self.provider.validate_token(token_id)
+        decode.assert_called_once_with(
+            token_id,
+            self.public_key_cache.keys[
+                jwt.get_unverified_header(token_id)['kid']],
+            algorithms=jws.JWSFormatter.algorithm)
+
+    def _encode_token(self, private_key, headers=None):
+        now = int(time.time())
+        return jwt.encode(
+            {'sub': uuid.uuid4().hex,
+             'iat': now,
+             'exp': now + 3600,
+             'openstack_methods': ['password'],
+             'openstack_audit_ids': [provider.random_urlsafe_str()]},
+            private_key,
+            algorithm=jws.JWSFormatter.algorithm,
+            headers=headers
+        )
+
+    def test_verify_token_without_key_id(self):
+        # tokens issued before the key ID was added to their header are
+        # validated by trying every public key
+        self._add_public_keys(2)
+        key_id, private_key = self.private_key_cache.keys
+        token_id = self._encode_token(private_key)
+        self.assertNotIn('kid', jwt.get_unverified_header(token_id))
+        self.provider.validate_token(token_id)
+
+    def test_unknown_or_malformed_key_id_raises_token_not_found(self):
+        key_id, private_key = self.private_key_cache.keys
+        self.provider.validate_token(
+            self._encode_token(private_key, headers={'kid': key_id}))
+        self.assertRaises(
+            exception.TokenNotFound,
+            self.provider.validate_token,
+            self._encode_token(private_key,
+                               headers={'kid': uuid.uuid4().hex}))
+
+        token_id = self._encode_token(private_key)
+        signing_input, signature = token_id.rsplit('.', 1)
+        for kid in (['list'], {'dict': 1}, 1):
+            header = {'alg': jws.JWSFormatter.algorithm, 'kid': kid}
+            forged_header = base64.urlsafe_b64encode(
+                jsonutils.dump_as_bytes(header)).rstrip(b'=').decode('ascii')
+            forged_token_id = '.'.join(
+                [forged_header, signing_input.split('.')[1], signature])
+            self.assertRaises(exception.TokenNotFound,
+                              self.provider.validate_token,
+                              forged_token_id)
+
+    def test_added_public_keys_are_picked_up(self):
+        self._age_key_repositories(60)
+        self.provider.validate_token(self._create_token())
+        self.assertEqual(1, self.public_key_cache.reloads)
+        self.provider.validate_token(self._create_token())
+        self.assertEqual(1, self.public_key_cache.reloads)
+
+        # another server's key is distributed out of process
+        private_key_path = os.path.join(self.useFixture(
+            fixtures.TempDir()).path, 'private.pem')
+        public_key_path = os.path.join(
+            CONF.jwt_tokens.jws_public_key_repository, uuid.uuid4().hex)
+        with mock.patch.object(jwt_utils, 'reset_key_caches'):
+            jwt_utils.create_jws_keypair(private_key_path, public_key_path)
+        self._age_key_repositories(30)
+        other_formatter = jws.JWSFormatter()
+        with mock.patch.object(
+                jws.JWSFormatter, 'private_key',
+                new_callable=mock.PropertyMock,
+                return_value=jwt_utils.get_private_key_cache(
+                    private_key_path).keys):
+            token_id, _ = other_formatter.create_token(
+                uuid.uuid4().hex, utils.isotime(
+                    provider.default_expire_time(), subsecond=True),
+                [provider.random_urlsafe_str()], ['password'])
+        self.provider.validate_token(token_id)
+        self.assertEqual(2, self.public_key_cache.reloads)
+
+    def test_rewritten_private_key_is_picked_up(self):
+        self._age_key_repositories(60)
+        old_key_id = jwt.get_unverified_header(self._create_token())['kid']
+
+        # keystone-manage create_jws_keypair --force overwrites the private
+        # key in place, from another process
+        public_key_path = os.path.join(
+            CONF.jwt_tokens.jws_public_key_repository, uuid.uuid4().hex)
+        with mock.patch.object(jwt_utils, 'reset_key_caches'):
+            jwt_utils.create_jws_keypair(self.private_key_cache.path,
+                                         public_key_path)
+        self._age_key_repositories(30)
+
+        token_id = self._create_token()
+        new_key_id = jwt.get_unverified_header(token_id)['kid']
+        self.assertNotEqual(old_key_id, new_key_id)
+        self.assertEqual(2, self.private_key_cache.reloads)
+        self.provider.validate_token(token_id)
+
+    def test_rewritten_public_key_is_picked_up(self):
+        other_key_directory = self.useFixture(fixtures.TempDir()).path
+        other_private_key_path = os.path.join(other_key_directory,
+                                              'private.pem')
+        public_key_path = os.path.join(
+            CONF.jwt_tokens.jws_public_key_repository, 'other.pem')
+        jwt_utils.create_jws_keypair(other_private_key_path, public_key_path)
+        self._age_key_repositories(60)
+        self.provider.validate_token(self._create_token())
+        self.assertEqual(1, self.public_key_cache.reloads)
+
+        # the other server's key pair is replaced, and its public key is
+        # rewritten in place from another process, which doesn't update the
+        # public key repository itself
+        with mock.patch.object(jwt_utils, 'reset_key_caches'):
+            jwt_utils.create_jws_keypair(other_private_key_path,
+                                         public_key_path)
+        mtime = time.time() - 30
+        os.utime(public_key_path, (mtime, mtime))
+
+        other_formatter = jws.JWSFormatter()
+        with mock.patch.object(
+                jws.JWSFormatter, 'private_key',
+                new_callable=mock.PropertyMock,
+                return_value=jwt_utils.get_private_key_cache(
+                    other_private_key_path).keys):
+            token_id, _ = other_formatter.create_token(
+                uuid.uuid4().hex, utils.isotime(
+                    provider.default_expire_time(), subsecond=True),
+                [provider.random_urlsafe_str()], ['password'])
+        self.provider.validate_token(token_id)
+        self.assertEqual(2, self.public_key_cache.reloads)
+
+    def test_stamp_without_nanosecond_modification_times(self):
+        # Python 2 doesn't report modification times in nanoseconds.
+        self._add_public_keys(2)
+        self._age_key_repositories(60)
+        stat = os.stat
+
+        def py27_stat(path):
+            result = stat(path)
+            return mock.Mock(spec=['st_ino', 'st_mtime', 'st_mode'],
+                             st_ino=result.st_ino,
+                             st_mtime=result.st_mtime,
+                             st_mode=result.st_mode)
+
+        with mock.patch.object(fernet_utils.os, 'stat',
+                               side_effect=py27_stat):
+            for _ in range(3):
+                self.provider.validate_token(self._create_token())
+        self.assertEqual(1, self.private_key_cache.reloads)
+        self.assertEqual(1, self.public_key_cache.reloads)
+
+    def test_validation_with_many_public_keys(self):
+        # With 1, 5 and 20 public keys in the repository, a token is verified
+        # against its own key only and no key is parsed again.
+        added = 0
+        for count in (1, 5, 20):
+            self._add_public_keys(count - 1 - added)
+            added = count - 1
+            self._age_key_repositories(60)
+            token_ids = [self._create_token() for _ in range(50)]
+            self.assertEqual(count, len(self.public_key_cache.keys))
+            reloads = self.public_key_cache.reloads
+            with mock.patch.object(jws.core.jwt, 'decode',
+                                   side_effect=jwt.decode) as decode:
+                for token_id in token_ids:
+                    self.provider.validate_token(token_id)
+            self.assertEqual(len(token_ids), decode.call_count)
+            self.assertEqual(reloads, self.public_key_cache.reloads)
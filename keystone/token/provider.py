@@ -65,6 +65,10 @@ def default_expire_time():
     return expires_at.replace(microsecond=0)
 
 
+def _format_cache_tag(tag_type, tag_id):
+    return '%s:%s' % (tag_type, tag_id)
+
+
 def random_urlsafe_str():
     """Generate a random URL-safe string.
 
@@ -89,6 +93,15 @@ class Manager(manager.Manager):
     V3 = V3
     VERSIONS = VERSIONS
 
+    # The cache tag type used for each kind of resource the token cache is
+    # notified about.
+    _CACHE_TAG_TYPES = {
+        'OS-TRUST:trust': 'trust',
+        'user': 'user',
+        'domain': 'domain',
+        'project': 'project',
+    }
+
     def __init__(self):
         super(Manager, self).__init__(CONF.token.provider)
         self._register_callback_listeners()
@@ -119,15 +132,109 @@ class Manager(manager.Manager):
                                                       callback_fns)
 
     def _drop_token_cache(self, service, resource_type, operation, payload):
-        """Invalidate the entire token cache.
+        """Invalidate the cached tokens affected by a change.
 
         This is a handy private utility method that should be used when
         consuming notifications that signal invalidating the token cache.
+        Only the tokens tagged with the changed resource are invalidated,
+        unless the notification doesn't say which tokens are affected, in
+        which case the entire token cache is invalidated.
 
         """
-        if CONF.token.cache_on_issue or CONF.token.caching:
+        if not (CONF.token.cache_on_issue or CONF.token.caching):
+            return
+        if resource_type == notifications.INVALIDATE_TOKEN_CACHE:
+            tags = payload.get('resource_info')
+        else:
+            tags = [(self._CACHE_TAG_TYPES[resource_type],
+                     payload['resource_info'])]
+        if tags and self._caching_tokens():
+            cache.invalidate_tags(
+                TOKENS_REGION, [_format_cache_tag(*tag) for tag in tags]
+            )
+        else:
+            # Tokens are only tagged while the cache is enabled, so anything
+            # cached otherwise can only be dropped along with the region.
             TOKENS_REGION.invalidate()
 
+    def _caching_tokens(self):
+        return CONF.cache.enabled and (
+            CONF.token.cache_on_issue or CONF.token.caching
+        )
+
+    def _get_cache_tag_ids(self, tags, tag_ids=None):
+        """Return the current ids of cache tags.
+
+        :param tags: an iterable of formatted tags
+        :param tag_ids: ids already looked up for some of the tags, which are
+                        kept as they are
+        :returns: a dictionary mapping each tag to its id
+
+        """
+        tag_ids = dict(tag_ids or {})
+        missing = [tag for tag in tags if tag not in tag_ids]
+        if missing:
+            tag_ids.update(cache.get_tag_ids(TOKENS_REGION, missing) or {})
+        return tag_ids
+
+    def _get_scope_cache_tags(self, user_id, project_id=None, domain_id=None,
+                              trust_id=None):
+        tags = [_format_cache_tag('user', user_id)]
+        if project_id:
+            tags.append(_format_cache_tag('project', project_id))
+        if domain_id:
+            tags.append(_format_cache_tag('domain', domain_id))
+        if trust_id:
+            tags.append(_format_cache_tag('trust', trust_id))
+        return tags
+
+    def _get_cache_tags(self, token):
+        """Return the tags describing what a cached token depends on.
+
+        A cached token is invalidated when any of the users, projects,
+        domains, roles, trusts, identity providers or access tokens it was
+        built from are invalidated.
+
+        """
+        tags = set(self._get_scope_cache_tags(
+            token.user_id, token.project_id, token.domain_id, token.trust_id))
+        users = [token.user]
+        if token.trust_scoped:
+            users.extend([token.trustor, token.trustee])
+            if token.trust.get('redelegated_trust_id'):
+                # A redelegated trust stays valid only as long as every trust
+                # and user up the chain it was delegated from does.
+                for trust in PROVIDERS.trust_api.get_trust_pedigree(
+                        token.trust_id):
+                    tags.add(_format_cache_tag('trust', trust['id']))
+                    for user_id in (trust['trustor_user_id'],
+                                    trust['trustee_user_id']):
+                        tags.add(_format_cache_tag('user', user_id))
+        for user in users:
+            tags.add(_format_cache_tag('user', user['id']))
+            tags.add(_format_cache_tag('domain', user['domain_id']))
+        if token.project_scoped:
+            tags.add(_format_cache_tag('domain', token.project['domain_id']))
+        if token.is_federated:
+            tags.add(_format_cache_tag(
+                'identity_provider', token.identity_provider_id))
+        if token.oauth_scoped:
+            tags.add(_format_cache_tag('access_token', token.access_token_id))
+        for role in token.roles:
+            tags.add(_format_cache_tag('role', role['id']))
+        return sorted(tags)
+
+    def _set_cache_tags(self, token, tag_ids=None):
+        if self._caching_tokens():
+            token.cache_tags = self._get_cache_tag_ids(
+                self._get_cache_tags(token), tag_ids)
+
+    def _cache_tags_are_current(self, token):
+        if not token.cache_tags:
+            return True
+        tag_ids = cache.get_tag_ids(TOKENS_REGION, token.cache_tags)
+        return tag_ids is None or tag_ids == token.cache_tags
+
     def check_revocation_v3(self, token):
         token_values = self.revoke_api.model.build_token_values(token)
         PROVIDERS.revoke_api.check_token(token_values)
@@ -141,12 +248,39 @@ class Manager(manager.Manager):
 
         try:
             token = self._validate_token(token_id)
+            if not self._cache_tags_are_current(token):
+                self._validate_token.invalidate(self, token_id)
+                token = self._validate_token(token_id)
             self._is_valid_token(token, window_seconds=window_seconds)
             return token
         except exception.Unauthorized as e:
             LOG.debug('Unable to validate token: %s', e)
             raise exception.TokenNotFound(token_id=token_id)
 
+    def validate_tokens(self, token_ids, window_seconds=0):
+        """Validate several tokens at once.
+
+        Each distinct token is only validated once, no matter how many times
+        it appears in ``token_ids``.
+
+        :param token_ids: a list of token IDs to validate
+        :param window_seconds: the number of seconds after expiration a token
+                               is still considered valid
+        :returns: a dictionary mapping each token ID to either the validated
+                  token or the exception explaining why it is not valid
+
+        """
+        results = {}
+        for token_id in token_ids:
+            if token_id in results:
+                continue
+            try:
+                results[token_id] = self.validate_token(
+                    token_id, window_seconds=window_seconds)
+            except (exception.TokenNotFound, exception.ValidationError) as e:
+                results[token_id] = e
+        return results
+
     @MEMOIZE_TOKENS
     def _validate_token(self, token_id):
         (user_id, methods, audit_ids, system, domain_id,
@@ -154,6 +288,14 @@ class Manager(manager.Manager):
             protocol_id, access_token_id, app_cred_id, issued_at,
             expires_at) = self.driver.validate_token(token_id)
 
+        # Look up the ids of the tags that are already known before building
+        # the token, so that changes made while it is being built invalidate
+        # it once it's cached.
+        tag_ids = None
+        if self._caching_tokens():
+            tag_ids = self._get_cache_tag_ids(self._get_scope_cache_tags(
+                user_id, project_id, domain_id, trust_id))
+
         token = token_model.TokenModel()
         token.user_id = user_id
         token.methods = methods
@@ -174,6 +316,7 @@ class Manager(manager.Manager):
             token.federated_groups = federated_group_ids
 
         token.mint(token_id, issued_at)
+        self._set_cache_tags(token, tag_ids)
         return token
 
     def _is_valid_token(self, token, window_seconds=0):
@@ -237,6 +380,11 @@ class Manager(manager.Manager):
         if not token.user_id:
             token.user_id = user_id
 
+        tag_ids = None
+        if self._caching_tokens():
+            tag_ids = self._get_cache_tag_ids(self._get_scope_cache_tags(
+                token.user_id, project_id, domain_id, trust_id))
+
         token.user_domain_id = token.user['domain_id']
 
         if isinstance(expires_at, datetime.datetime):
@@ -253,6 +401,7 @@ class Manager(manager.Manager):
 
         # cache the token object and with ID
         if CONF.token.cache_on_issue or CONF.token.caching:
+            self._set_cache_tags(token, tag_ids)
             # NOTE(amakarov): here and above TOKENS_REGION is to be passed
             # to serve as required positional "self" argument. It's ignored,
             # so I've put it here for convenience - any placeholder is fine.
@@ -284,7 +433,8 @@ class Manager(manager.Manager):
                 domain_id=domain_id
             )
         else:
-            PROVIDERS.revoke_api.revoke_by_audit_id(token.audit_id)
+            PROVIDERS.revoke_api.revoke_by_audit_id(token.audit_id,
+                                                    user_id=token.user_id)
 
         # FIXME(morganfainberg): Does this cache actually need to be
         # invalidated? We maintain a cached revocation list, which should be
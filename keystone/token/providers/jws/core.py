@@ -15,7 +15,9 @@ import os
 
 import jwt
 from oslo_utils import timeutils
+import six
 
+from keystone.common import jwt_utils
 from keystone.common import utils
 import keystone.conf
 from keystone import exception
@@ -86,21 +88,18 @@ class JWSFormatter(object):
 
     @property
     def private_key(self):
+        """Return the key ID and the parsed private key used for signing."""
         private_key_path = os.path.join(
             CONF.jwt_tokens.jws_private_key_repository, 'private.pem'
         )
-        with open(private_key_path, 'r') as f:
-            key = f.read()
-        return key
+        return jwt_utils.get_private_key_cache(private_key_path).keys
 
     @property
     def public_keys(self):
-        keys = []
-        key_repo = CONF.jwt_tokens.jws_public_key_repository
-        for keyfile in os.listdir(key_repo):
-            with open(os.path.join(key_repo, keyfile), 'r') as f:
-                keys.append(f.read())
-        return keys
+        """Return the parsed public keys used for validation, by key ID."""
+        return jwt_utils.get_public_key_cache(
+            CONF.jwt_tokens.jws_public_key_repository
+        ).keys
 
     def create_token(self, user_id, expires_at, audit_ids, methods,
                      system=None, domain_id=None, project_id=None,
@@ -139,10 +138,12 @@ class JWSFormatter(object):
             if v is None:
                 payload.pop(k)
 
+        key_id, private_key = self.private_key
         token_id = jwt.encode(
             payload,
-            self.private_key,
-            algorithm=JWSFormatter.algorithm
+            private_key,
+            algorithm=JWSFormatter.algorithm,
+            headers={'kid': key_id}
         )
         return token_id, issued_at
 
@@ -175,7 +176,24 @@ class JWSFormatter(object):
         )
 
     def _decode_token_from_id(self, token_id):
-        for public_key in self.public_keys:
+        try:
+            key_id = jwt.get_unverified_header(token_id).get('kid')
+        except jwt.InvalidTokenError:
+            raise exception.TokenNotFound(token_id=token_id)
+        if key_id is not None and not isinstance(key_id, six.string_types):
+            raise exception.TokenNotFound(token_id=token_id)
+
+        public_keys = self.public_keys
+        if key_id is not None:
+            # NOTE: The key ID is the fingerprint of the public key the token
+            # was signed with, so there is only one key worth trying.
+            public_key = public_keys.get(key_id)
+            public_keys = [public_key] if public_key is not None else []
+        else:
+            # tokens issued before key IDs were added to their header
+            public_keys = public_keys.values()
+
+        for public_key in public_keys:
             try:
                 return jwt.decode(
                     token_id, public_key, algorithms=JWSFormatter.algorithm
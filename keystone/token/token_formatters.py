@@ -54,19 +54,16 @@ class TokenFormatter(object):
         This @property just needs to return an object that implements
         ``encrypt(plaintext)`` and ``decrypt(ciphertext)``.
 
+        The keys are loaded from the key repository once per process and are
+        only reloaded when the key repository changes.
+
         """
-        fernet_utils = utils.FernetUtils(
+        key_ring = utils.get_key_ring(
             CONF.fernet_tokens.key_repository,
             CONF.fernet_tokens.max_active_keys,
             'fernet_tokens'
         )
-        keys = fernet_utils.load_keys()
-
-        if not keys:
-            raise exception.KeysNotFound()
-
-        fernet_instances = [fernet.Fernet(key) for key in keys]
-        return fernet.MultiFernet(fernet_instances)
+        return key_ring.crypto
 
     def pack(self, payload):
         """Pack a payload for transport as a token.